@@ -2,6 +2,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 from urllib.parse import urlparse
+from corsheaders.defaults import default_headers
 
 load_dotenv()
 
@@ -17,6 +18,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+  "core.timing.RequestTimingMiddleware",
   "corsheaders.middleware.CorsMiddleware",
   "django.middleware.security.SecurityMiddleware",
   "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -26,6 +28,7 @@ MIDDLEWARE = [
   "django.contrib.auth.middleware.AuthenticationMiddleware",
   "django.contrib.messages.middleware.MessageMiddleware",
   "django.middleware.clickjacking.XFrameOptionsMiddleware",
+  "core.audit.AuditBufferMiddleware",
 ]
 
 ROOT_URLCONF = "accredcheck.urls"
@@ -74,8 +77,27 @@ STORAGES = {
 }
 DEFAULT_AUTO_FIELD="django.db.models.BigAutoField"
 
+# Process-local memory by default. Behind several workers, point this at a shared
+# backend (e.g. django.core.cache.backends.redis.RedisCache) so cache invalidation
+# reaches every worker.
+CACHES = {"default":{
+  "BACKEND":os.getenv("DJANGO_CACHE_BACKEND","django.core.cache.backends.locmem.LocMemCache"),
+  "LOCATION":os.getenv("DJANGO_CACHE_LOCATION",""),
+}}
+# Whether every worker sees the same cache entries. Caches that must not serve a
+# stale answer after a write in another worker stay off by default when it does not.
+CACHE_IS_SHARED = CACHES["default"]["BACKEND"] not in (
+  "django.core.cache.backends.locmem.LocMemCache",
+  "django.core.cache.backends.dummy.DummyCache",
+)
+
 MEDIA_URL="/media/"
 MEDIA_ROOT=os.getenv("MEDIA_ROOT", str(BASE_DIR/"media"))
+# Django's default handlers, hashing each upload as it streams in (core.blobs).
+FILE_UPLOAD_HANDLERS=[
+  "core.blobs.HashingMemoryFileUploadHandler",
+  "core.blobs.HashingTemporaryFileUploadHandler",
+]
 
 CORS_ALLOWED_ORIGINS=[o.strip() for o in os.getenv("CORS_ALLOWED_ORIGINS","").split(",") if o.strip()]
 if DEBUG:
@@ -83,6 +105,8 @@ if DEBUG:
 else:
   CSRF_TRUSTED_ORIGINS=[o.replace("http://","https://") for o in CORS_ALLOWED_ORIGINS]
 CORS_ALLOW_CREDENTIALS = True
+# Chunked evidence uploads send each chunk's checksum in X-Chunk-SHA256 (core.uploads).
+CORS_ALLOW_HEADERS = (*default_headers, "x-chunk-sha256")
 
 REST_FRAMEWORK = {
   "DEFAULT_AUTHENTICATION_CLASSES":[
@@ -93,3 +117,70 @@ REST_FRAMEWORK = {
     "rest_framework.permissions.IsAuthenticated",
   ],
 }
+# Default page size for the keyset-paginated list endpoints (core.pagination);
+# clients may ask for ?page_size= up to API_MAX_PAGE_SIZE.
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", "50"))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "200"))
+AUDIT_LOG_COUNT_CACHE_SECONDS = int(os.getenv("AUDIT_LOG_COUNT_CACHE_SECONDS", "60"))
+# Audit entries buffered per request before falling back to a synchronous write.
+AUDIT_BUFFER_MAX_ENTRIES = int(os.getenv("AUDIT_BUFFER_MAX_ENTRIES", "100"))
+# How long a user's group names are cached between requests (core.permissions);
+# 0 disables the cross-request cache. Role changes only invalidate the cache the
+# workers share, so it defaults to off with a per-process cache: a demoted user
+# would otherwise keep their roles on the other workers until the entry expires.
+RBAC_ROLE_CACHE_SECONDS = int(os.getenv("RBAC_ROLE_CACHE_SECONDS", "60" if CACHE_IS_SHARED else "0"))
+# Upper bound on how long a compliance snapshot payload is cached (core.snapshots);
+# writes invalidate entries earlier.
+SNAPSHOT_CACHE_SECONDS = int(os.getenv("SNAPSHOT_CACHE_SECONDS", "900"))
+# Indicator searches matching more rows than this are listed in index order
+# instead of by rank, which keeps search-as-you-type latency bounded (core.search).
+SEARCH_RANK_MAX_MATCHES = int(os.getenv("SEARCH_RANK_MAX_MATCHES", "2000"))
+# Audit log searches matching more rows than this skip the SQLite trigram index and
+# scan newest-first instead, which finds a page of a common word sooner (core.audit_search).
+AUDIT_SEARCH_INDEX_MAX_MATCHES = int(os.getenv("AUDIT_SEARCH_INDEX_MAX_MATCHES", "5000"))
+# Audit retention (core.audit_archive, `manage.py archive_audit`): default age at
+# which rows move to archived segments, rows per segment file, the most segments
+# an exact /logs/count/ decompresses before falling back to an estimate, and how
+# many monthly partitions are kept created ahead on PostgreSQL.
+AUDIT_ARCHIVE_AFTER_DAYS = int(os.getenv("AUDIT_ARCHIVE_AFTER_DAYS", "365"))
+AUDIT_ARCHIVE_SEGMENT_ROWS = int(os.getenv("AUDIT_ARCHIVE_SEGMENT_ROWS", "50000"))
+AUDIT_ARCHIVE_COUNT_MAX_SEGMENTS = int(os.getenv("AUDIT_ARCHIVE_COUNT_MAX_SEGMENTS", "12"))
+AUDIT_PARTITION_MONTHS_AHEAD = int(os.getenv("AUDIT_PARTITION_MONTHS_AHEAD", "3"))
+# Background snapshot exports (core.exports, `manage.py run_export_jobs`): how long
+# finished artifacts are kept and reused, and when a silent worker's job is retaken.
+EXPORT_ARTIFACT_TTL_SECONDS = int(os.getenv("EXPORT_ARTIFACT_TTL_SECONDS", "86400"))
+EXPORT_JOB_STALE_SECONDS = int(os.getenv("EXPORT_JOB_STALE_SECONDS", "600"))
+EXPORT_JOB_MAX_ATTEMPTS = int(os.getenv("EXPORT_JOB_MAX_ATTEMPTS", "3"))
+# Chunked evidence uploads (core.uploads, /api/evidence-uploads/): largest file, largest
+# (and default) chunk, how long an idle session is kept before `purge_upload_sessions`
+# removes it, where chunks are written (default <MEDIA_ROOT>/upload-sessions; it must
+# be shared by every worker and survive restarts), and after how long a finalise whose
+# worker died (timeout or OOM kill) may be taken over. Plain multipart uploads stay at 10 MB.
+EVIDENCE_UPLOAD_MAX_SIZE = int(os.getenv("EVIDENCE_UPLOAD_MAX_SIZE", str(200 * 1024 * 1024)))
+EVIDENCE_UPLOAD_CHUNK_SIZE = int(os.getenv("EVIDENCE_UPLOAD_CHUNK_SIZE", str(4 * 1024 * 1024)))
+EVIDENCE_UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("EVIDENCE_UPLOAD_SESSION_TTL_SECONDS", "86400"))
+EVIDENCE_UPLOAD_DIR = os.getenv("EVIDENCE_UPLOAD_DIR", "")
+EVIDENCE_UPLOAD_ASSEMBLY_STALE_SECONDS = int(os.getenv("EVIDENCE_UPLOAD_ASSEMBLY_STALE_SECONDS", "600"))
+# Threads per worker process that make evidence thumbnails and previews after an
+# upload (core.derivatives); 0 makes them inline, before the upload response.
+EVIDENCE_DERIVATIVE_WORKERS = int(os.getenv("EVIDENCE_DERIVATIVE_WORKERS", "2"))
+# Per-request SQL/serialization timing (core.timing): Server-Timing headers and one
+# "core.timing" log line per request, at WARNING when one statement repeats this often.
+REQUEST_TIMING_ENABLED = os.getenv("REQUEST_TIMING_ENABLED", "1") == "1"
+REQUEST_TIMING_REPEATED_QUERIES = int(os.getenv("REQUEST_TIMING_REPEATED_QUERIES", "10"))
+# Prometheus metrics at /api/metrics/ (core.metrics). Each worker writes its totals to
+# METRICS_DIR (default: <tmp>/accredcheck-metrics, shared by the workers of one host)
+# at most every METRICS_FLUSH_SECONDS; only METRICS_ALLOWED_IPS (addresses or CIDRs,
+# matched against REMOTE_ADDR) may scrape.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+METRICS_ALLOWED_IPS = [a.strip() for a in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if a.strip()]
+LOGGING = {
+  "version": 1,
+  "disable_existing_loggers": False,
+  "handlers": {"console": {"class": "logging.StreamHandler"}},
+  "loggers": {
+    "core.timing": {"handlers": ["console"], "level": os.getenv("REQUEST_TIMING_LOG_LEVEL", "INFO")},
+  },
+}
@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Indicator, ComplianceRecord, EvidenceItem, AuditLog, Project
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.utils.text import smart_split, unescape_string_literal
+from .audit_search import audit_search_q
+from .models import Indicator, ComplianceRecord, EvidenceItem, EvidenceBlob, AuditLog, AuditArchiveSegment, Project, SnapshotExportJob
 
 @admin.register(Indicator)
 class IndicatorAdmin(admin.ModelAdmin):
@@ -23,8 +27,35 @@ class AuditLogAdmin(admin.ModelAdmin):
   list_filter=("action","entity_type","timestamp")
   search_fields=("summary","entity_id","actor__username")
 
+  def get_search_results(self, request, queryset, search_term):
+    # Same semantics as search_fields (every term must match one of the fields),
+    # but summary/entity_id go through the trigram index and usernames are
+    # resolved on the small user table first.
+    for term in smart_split(search_term):
+      if term.startswith(('"', "'")) and term[0] == term[-1]:
+        term = unescape_string_literal(term)
+      actors = User.objects.filter(username__icontains=term).values("pk")
+      queryset = queryset.filter(audit_search_q(term, ("summary","entity_id"), queryset.db) | Q(actor__in=actors))
+    return queryset, False
+
 @admin.register(Project)
 class ProjectAdmin(admin.ModelAdmin):
   list_display=("name","status","updated_at","created_at")
   list_filter=("status","created_at","updated_at")
   search_fields=("name","description")
+
+@admin.register(EvidenceBlob)
+class EvidenceBlobAdmin(admin.ModelAdmin):
+  list_display=("sha256","size","ref_count","created_at")
+  search_fields=("sha256",)
+  readonly_fields=("sha256","file","size","ref_count","created_at")
+
+@admin.register(SnapshotExportJob)
+class SnapshotExportJobAdmin(admin.ModelAdmin):
+  list_display=("created_at","format","status","progress","requested_by","expires_at")
+  list_filter=("status","format")
+
+@admin.register(AuditArchiveSegment)
+class AuditArchiveSegmentAdmin(admin.ModelAdmin):
+  list_display=("start_at","end_at","row_count","file","created_at")
+  readonly_fields=("file","start_at","end_at","row_count","actor_ids","actions","entity_types","sha256","created_at")
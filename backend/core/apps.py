@@ -1,4 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 class CoreConfig(AppConfig):
   default_auto_field = "django.db.models.BigAutoField"
   name = "core"
+
+  def ready(self):
+    from . import signals  # noqa: F401
+    from .audit_archive import ensure_audit_partitions
+    from . import audit_search, search  # noqa: F401 (register their full-text indexes)
+    from .db import ensure_fulltext_indexes
+    post_migrate.connect(ensure_fulltext_indexes, sender=self)
+    post_migrate.connect(ensure_audit_partitions, sender=self)
@@ -2,13 +2,21 @@ from __future__ import annotations
 
 import datetime
 import decimal
+import logging
+import threading
+import time
 import uuid
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
 
+from . import metrics
 from .models import AuditLog
 
+logger = logging.getLogger(__name__)
+
 SENSITIVE_KEYS = {
     "password",
     "token",
@@ -52,6 +60,110 @@ def extract_request_meta(request) -> Dict[str, Optional[str]]:
     return {"ip_address": ip, "user_agent": user_agent}
 
 
+class AuditSink:
+    """Collects AuditLog rows and writes them with bulk_create.
+
+    - Inside a transaction an entry is only accepted once that transaction commits
+      (transaction.on_commit), so audit rows never outlive rolled-back changes.
+    - During a request (see AuditBufferMiddleware) accepted entries are buffered and
+      written in one bulk insert when the view returns, in the order they were logged.
+    - Without a request buffer, or when the buffer reaches AUDIT_BUFFER_MAX_ENTRIES,
+      entries are written synchronously.
+
+    Buffered entries are written after the data they describe has committed, in a
+    separate transaction: a worker killed in between loses that request's entries
+    (see docs/DATAMODEL.md, "Audit writes").
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"queued": 0, "flushed": 0, "sync_writes": 0, "dropped": 0, "flushes": 0, "flush_seconds": 0.0}
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                self._stats[key] += value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+    @property
+    def max_entries(self) -> int:
+        return getattr(settings, "AUDIT_BUFFER_MAX_ENTRIES", 100)
+
+    def begin(self):
+        self._local.buffer = []
+
+    def end(self):
+        buffer = getattr(self._local, "buffer", None)
+        self._local.buffer = None
+        if buffer:
+            self._write(buffer)
+
+    def add(self, entry: AuditLog):
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self._accept(entry))
+        else:
+            self._accept(entry)
+
+    def _accept(self, entry: AuditLog):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None:
+            self._write([entry], sync=True)
+            return
+        self._count(queued=1)
+        buffer.append(entry)
+        if len(buffer) >= self.max_entries:
+            self._local.buffer = []
+            self._write(buffer, sync=True)
+
+    def _write(self, entries: List[AuditLog], sync: bool = False):
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                AuditLog.objects.bulk_create(entries)
+            written, dropped = len(entries), 0
+        except Exception:
+            logger.exception("Bulk audit write failed; retrying %d entries one by one", len(entries))
+            written = dropped = 0
+            for entry in entries:
+                try:
+                    entry.save(force_insert=True)
+                    written += 1
+                except Exception:
+                    logger.exception("Dropping audit entry %s %s %s", entry.action, entry.entity_type, entry.entity_id)
+                    dropped += 1
+        elapsed = time.perf_counter() - started
+        mode = {"mode": "sync" if sync else "buffered"}
+        metrics.inc("audit_rows_written_total", mode, written)
+        if dropped:
+            metrics.inc("audit_rows_dropped_total", value=dropped)
+        metrics.observe("audit_write_seconds", elapsed, mode)
+        if sync:
+            self._count(sync_writes=written, dropped=dropped, flushes=1, flush_seconds=elapsed)
+        else:
+            self._count(flushed=written, dropped=dropped, flushes=1, flush_seconds=elapsed)
+
+
+audit_sink = AuditSink()
+
+
+class AuditBufferMiddleware:
+    """Buffers the audit entries of a request and flushes them before the response leaves."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        audit_sink.begin()
+        try:
+            return self.get_response(request)
+        finally:
+            audit_sink.end()
+
+
 def log_audit(
     *,
     actor,
@@ -65,7 +177,7 @@ def log_audit(
     request=None,
 ) -> AuditLog:
     meta = extract_request_meta(request)
-    return AuditLog.objects.create(
+    entry = AuditLog(
         actor=actor,
         action=action,
         entity_type=entity_type,
@@ -78,3 +190,5 @@ def log_audit(
         metadata=sanitize_payload(metadata or {}),
         timestamp=timezone.now(),
     )
+    audit_sink.add(entry)
+    return entry
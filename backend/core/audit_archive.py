@@ -0,0 +1,525 @@
+"""Audit log retention: monthly partitions on PostgreSQL and archived segments.
+
+On PostgreSQL core_auditlog can be range-partitioned by month on "timestamp"
+(`manage.py partition_audit_table`, run once in a maintenance window), so recent
+months stay small and a month emptied by archiving is dropped rather than
+vacuumed. Partitions are then created AUDIT_PARTITION_MONTHS_AHEAD months ahead
+after every migrate and every `archive_audit` run; a DEFAULT partition catches
+anything else. Unpartitioned tables are archived the same way, by deletes.
+
+`archive_audit` moves rows older than a cutoff into gzip JSONL segment files
+(AuditArchiveSegment), one UTC month at most per segment. The logs endpoint
+and the CSV export merge archived rows back in keyset order, so clients see
+one history; segments are only opened when a page reaches past the table's
+rows, and the segment index (time range, actors, actions, entity types) skips
+the ones a filter cannot match.
+"""
+import gzip
+import hashlib
+import heapq
+import itertools
+import json
+import tempfile
+import uuid
+import zlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from operator import itemgetter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .db import is_partitioned
+from .models import AuditArchiveSegment, AuditLog
+
+TABLE = "core_auditlog"
+DEFAULT_PARTITION = "core_auditlog_default"
+UNPARTITIONED = "core_auditlog_unpartitioned"
+DELETE_BATCH = 1000
+# Rows per gzip member in a segment file: the unit a reader can seek to.
+SEGMENT_BLOCK_ROWS = 1000
+
+
+# --- PostgreSQL partitions ---------------------------------------------------
+
+def utc_stamp(value):
+  """Fixed-width UTC timestamp text: sorts like the datetimes it stands for."""
+  return value.astimezone(dt_timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+
+def month_start(value):
+  value = value.astimezone(dt_timezone.utc)
+  return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(start):
+  return (start + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(start):
+  return f"{TABLE}_p{start:%Y%m}"
+
+
+def _partitions(connection):
+  with connection.cursor() as cursor:
+    cursor.execute(
+      "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+      "WHERE i.inhparent = %s::regclass", [TABLE],
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _attach_partition(connection, start):
+  name, end = partition_name(start), next_month(start)
+  bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+  # Built standalone and attached, taking over any rows the DEFAULT partition
+  # already holds for the month (ATTACH refuses the range otherwise).
+  with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+    cursor.execute(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cursor.execute(
+      f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+      f"WHERE \"timestamp\" >= %s AND \"timestamp\" < %s RETURNING *) "
+      f"INSERT INTO {name} SELECT * FROM moved", [start, end],
+    )
+    cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}")
+  return name
+
+
+def ensure_partitions(connection, since=None, months_ahead=None):
+  """Create the monthly partitions from `since` (default: this month) to months_ahead past now.
+
+  Returns the names created; a no-op unless core_auditlog is partitioned.
+  """
+  if not is_partitioned(connection, TABLE):
+    return []
+  if months_ahead is None:
+    months_ahead = settings.AUDIT_PARTITION_MONTHS_AHEAD
+  month, last = month_start(since or timezone.now()), month_start(timezone.now())
+  for _ in range(months_ahead):
+    last = next_month(last)
+  existing = _partitions(connection)
+  created = []
+  while month <= last:
+    if partition_name(month) not in existing:
+      created.append(_attach_partition(connection, month))
+    month = next_month(month)
+  return created
+
+
+def ensure_audit_partitions(sender, using="default", **kwargs):
+  """post_migrate hook: keep partitions created ahead of the current month."""
+  ensure_partitions(connections[using])
+
+
+def drop_empty_partitions(connection, before):
+  """Detach and drop monthly partitions that end by `before` and hold no rows. Returns their names."""
+  if not is_partitioned(connection, TABLE):
+    return []
+  dropped = []
+  for name in sorted(_partitions(connection)):
+    if name == DEFAULT_PARTITION:
+      continue
+    start = datetime.strptime(name[len(TABLE) + 2:], "%Y%m").replace(tzinfo=dt_timezone.utc)
+    if next_month(start) > before:
+      continue
+    with connection.cursor() as cursor:
+      cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {name})")
+      if cursor.fetchone()[0]:
+        continue
+      cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+      cursor.execute(f"DROP TABLE {name}")
+    dropped.append(name)
+  return dropped
+
+
+def _table_ddl(connection, table):
+  """(index definitions, foreign key (name, definition) pairs) of `table`, primary key excluded."""
+  with connection.cursor() as cursor:
+    cursor.execute(
+      "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s",
+      [table],
+    )
+    indexes = [definition for name, definition in cursor.fetchall() if not name.endswith("_pkey")]
+    cursor.execute(
+      "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+      [table],
+    )
+    return indexes, cursor.fetchall()
+
+
+def _replace_table(connection, create_sql, primary_key):
+  """Rebuild core_auditlog from `create_sql`, copying its rows, indexes and foreign keys."""
+  indexes, foreign_keys = _table_ddl(connection, TABLE)
+  with connection.cursor() as cursor:
+    cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {UNPARTITIONED}")
+    cursor.execute(f"ALTER TABLE {UNPARTITIONED} RENAME CONSTRAINT {TABLE}_pkey TO {UNPARTITIONED}_pkey")
+    cursor.execute(create_sql.format(table=TABLE, source=UNPARTITIONED))
+    cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY ({primary_key})")
+    if is_partitioned(connection, TABLE):
+      cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+      cursor.execute(f'SELECT min("timestamp") FROM {UNPARTITIONED}')
+      ensure_partitions(connection, since=cursor.fetchone()[0])
+    cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {UNPARTITIONED}")
+    # Dropping the old table frees its index names for the definitions read above.
+    cursor.execute(f"DROP TABLE {UNPARTITIONED}")
+    for definition in indexes:
+      cursor.execute(definition)
+    for name, definition in foreign_keys:
+      cursor.execute(f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+
+
+def partition_audit_table(connection):
+  """Convert core_auditlog into a table range-partitioned by month (PostgreSQL). Returns True if converted.
+
+  The copy holds an exclusive lock on the table for its whole duration, so
+  this is not a migration: `manage.py partition_audit_table` runs it when the
+  operator chooses.
+  """
+  if connection.vendor != "postgresql" or is_partitioned(connection, TABLE):
+    return False
+  # The primary key of a partitioned table has to include the partition key.
+  _replace_table(
+    connection,
+    "CREATE TABLE {table} (LIKE {source} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (\"timestamp\")",
+    'id, "timestamp"',
+  )
+  return True
+
+
+def unpartition_audit_table(connection):
+  if not is_partitioned(connection, TABLE):
+    return False
+  _replace_table(connection, "CREATE TABLE {table} (LIKE {source} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)", "id")
+  return True
+
+
+# --- Writing segments ----------------------------------------------------------
+
+ARCHIVE_FIELDS = (
+  "id", "timestamp", "actor_id", "actor__username", "action", "entity_type", "entity_id",
+  "summary", "ip_address", "user_agent", "before", "after", "metadata",
+)
+
+
+def _segment_record(values):
+  record = dict(values)
+  record["id"] = record["id"].hex
+  record["actor"] = record.pop("actor_id")
+  record["actor_username"] = record.pop("actor__username")
+  record["timestamp"] = utc_stamp(values["timestamp"])
+  return record
+
+
+def _write_segment(rows):
+  """Write `rows` (newest first) to a gzip JSONL temp file; returns (file, ids, segment fields).
+
+  Every SEGMENT_BLOCK_ROWS rows start a new gzip member. The concatenation is
+  still one gzip file to any reader; `blocks` records where each member starts.
+  """
+  encoder = DjangoJSONEncoder(separators=(",", ":"))
+  ids, actors, actions, entity_types, blocks = [], set(), set(), set(), []
+  start = end = out = None
+  fh = tempfile.TemporaryFile()
+  for values in rows:
+    if len(ids) % SEGMENT_BLOCK_ROWS == 0:
+      if out is not None:
+        out.close()
+      blocks.append([fh.tell(), utc_stamp(values["timestamp"])])
+      # mtime=0 keeps the output, and so the checksum, a function of the rows alone.
+      out = gzip.GzipFile(fileobj=fh, mode="wb", mtime=0)
+    ids.append(values["id"])
+    actors.add(values["actor_id"])
+    actions.add(values["action"])
+    entity_types.add(values["entity_type"])
+    end = end or values["timestamp"]
+    start = values["timestamp"]
+    out.write(encoder.encode(_segment_record(values)).encode("utf-8") + b"\n")
+  if out is not None:
+    out.close()
+  fh.seek(0)
+  digest = hashlib.sha256()
+  for chunk in iter(lambda: fh.read(1 << 20), b""):
+    digest.update(chunk)
+  fh.seek(0)
+  fields = {
+    "start_at": start, "end_at": end, "row_count": len(ids), "sha256": digest.hexdigest(),
+    "actor_ids": sorted(actors, key=lambda pk: (pk is not None, pk or 0)),
+    "actions": sorted(actions), "entity_types": sorted(entity_types), "blocks": blocks,
+  }
+  return fh, ids, fields
+
+
+def _archive_range(start, end, limit):
+  """Archive the oldest `limit` rows with start <= timestamp < end into one segment."""
+  rows = AuditLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+  newest = rows.order_by("timestamp", "id").values_list("timestamp", "id")[limit - 1:limit].first()
+  if newest is not None:
+    rows = rows.filter(Q(timestamp__lt=newest[0]) | Q(timestamp=newest[0], id__lte=newest[1]))
+  rows = rows.order_by("-timestamp", "-id").values(*ARCHIVE_FIELDS)
+
+  fh, ids, fields = _write_segment(rows.iterator(chunk_size=2000))
+  with fh:
+    segment = AuditArchiveSegment(**fields)
+    segment.file.save(f"{start:%Y%m}-{segment.id}.jsonl.gz", File(fh), save=False)
+  try:
+    # Rows are deleted by id, so a row written into the range meanwhile is left alone.
+    with transaction.atomic():
+      segment.save()
+      for i in range(0, len(ids), DELETE_BATCH):
+        AuditLog.objects.filter(pk__in=ids[i:i + DELETE_BATCH]).delete()
+  except Exception:
+    segment.file.delete(save=False)
+    raise
+  return segment
+
+
+def archive_before(cutoff, segment_rows=None):
+  """Move audit rows older than `cutoff` into segments; returns the segments written, oldest first."""
+  segment_rows = segment_rows or settings.AUDIT_ARCHIVE_SEGMENT_ROWS
+  segments = []
+  while True:
+    oldest = AuditLog.objects.filter(timestamp__lt=cutoff).order_by("timestamp", "id").values_list("timestamp", flat=True).first()
+    if oldest is None:
+      break
+    start = month_start(oldest)
+    segments.append(_archive_range(start, min(next_month(start), cutoff), segment_rows))
+  drop_empty_partitions(connections[AuditLog.objects.db], cutoff)
+  return segments
+
+
+def verify_segment(segment):
+  """True when the segment file still matches its recorded checksum."""
+  digest = hashlib.sha256()
+  with segment.file.open("rb") as fh:
+    for chunk in iter(lambda: fh.read(1 << 20), b""):
+      digest.update(chunk)
+  return digest.hexdigest() == segment.sha256
+
+
+# --- Reading segments ----------------------------------------------------------
+# Keys are (utc_stamp, id hex) pairs, so archived rows are ordered and bounded
+# without parsing their timestamps; only rows handed out are parsed.
+
+def row_key(timestamp, pk):
+  """Keyset position of a row under the ("-timestamp", "-id") audit ordering."""
+  if isinstance(timestamp, str):
+    timestamp = parse_datetime(timestamp)
+  return utc_stamp(timestamp), (pk.hex if isinstance(pk, uuid.UUID) else uuid.UUID(str(pk)).hex)
+
+
+class _Newest:
+  """Heap entry ordering larger keys first."""
+  __slots__ = ("key",)
+
+  def __init__(self, key):
+    self.key = key
+
+  def __lt__(self, other):
+    return self.key > other.key
+
+
+def _local_day_start(value):
+  day = parse_date(value or "")
+  return utc_stamp(timezone.make_aware(datetime.combine(day, time.min))) if day else None
+
+
+class _RecordFilter:
+  """The audit log filters applied to archived records."""
+
+  def __init__(self, filters):
+    self.actor = str(filters["actor"]) if filters.get("actor") else None
+    self.action = filters.get("action")
+    self.entity_type = filters.get("entity_type")
+    self.q = filters["q"].casefold() if filters.get("q") else None
+    # start_date/end_date are local days, as for timestamp__date on the table.
+    self.since = _local_day_start(filters.get("start_date"))
+    end = parse_date(filters.get("end_date") or "")
+    self.before = _local_day_start((end + timedelta(days=1)).isoformat()) if end else None
+
+  def __call__(self, record):
+    return not (
+      (self.actor and str(record["actor"]) != self.actor)
+      or (self.action and record["action"] != self.action)
+      or (self.entity_type and record["entity_type"] != self.entity_type)
+      or (self.q and self.q not in record["summary"].casefold())
+      or (self.since and record["timestamp"] < self.since)
+      or (self.before and record["timestamp"] >= self.before)
+    )
+
+
+def _segment_matches(segment, filters):
+  if filters.get("actor") and str(filters["actor"]) not in {str(pk) for pk in segment.actor_ids}:
+    return False
+  if filters.get("action") and filters["action"] not in segment.actions:
+    return False
+  if filters.get("entity_type") and filters["entity_type"] not in segment.entity_types:
+    return False
+  return True
+
+
+def candidate_segments(filters, after=None, until=None, descending=True):
+  """Segments that can hold rows for `filters` between the keys `after` and `until` (both exclusive)."""
+  segments = AuditArchiveSegment.objects.all()
+  if filters.get("start_date"):
+    segments = segments.filter(end_at__date__gte=filters["start_date"])
+  if filters.get("end_date"):
+    segments = segments.filter(start_at__date__lte=filters["end_date"])
+  newer, older = (after, until) if descending else (until, after)
+  if newer is not None:
+    segments = segments.filter(start_at__lte=parse_datetime(newer[0]))
+  if older is not None:
+    segments = segments.filter(end_at__gte=parse_datetime(older[0]))
+  segments = segments.order_by("-end_at") if descending else segments.order_by("start_at")
+  return [segment for segment in segments if _segment_matches(segment, filters)]
+
+
+def _read_block(raw, offset):
+  """The lines of the gzip member starting at `offset` of the open file `raw`."""
+  raw.seek(offset)
+  inflate = zlib.decompressobj(zlib.MAX_WBITS | 16)
+  pending = b""
+  while not inflate.eof:
+    chunk = raw.read(1 << 16)
+    if not chunk:
+      break
+    *lines, pending = (pending + inflate.decompress(chunk)).split(b"\n")
+    yield from lines
+
+
+def _read_segment(segment, newer=None, older=None, descending=True):
+  """Records of `segment` newest first (oldest first if not `descending`).
+
+  Only the blocks that can hold timestamps between the stamps `newer` and
+  `older` (inclusive) are decompressed. Files are newest first, so an oldest
+  first read, which "previous" pages need, reverses one block at a time.
+  """
+  # Segments written before blocks were recorded are a single gzip member.
+  blocks = segment.blocks or [[0, utc_stamp(segment.end_at)]]
+  # A block's rows run from its own newest stamp down to the next block's.
+  wanted = [
+    offset for i, (offset, newest) in enumerate(blocks)
+    if (older is None or newest >= older)
+    and (newer is None or i + 1 == len(blocks) or blocks[i + 1][1] <= newer)
+  ]
+  with segment.file.open("rb") as raw:
+    for offset in wanted if descending else reversed(wanted):
+      lines = _read_block(raw, offset)
+      for line in lines if descending else reversed(list(lines)):
+        yield json.loads(line)
+
+
+def _segment_rows(segment, matches, after, until, descending):
+  newer, older = (after, until) if descending else (until, after)
+  records = _read_segment(segment, newer and newer[0], older and older[0], descending)
+  for record in records:
+    key = (record["timestamp"], record["id"])
+    if after is not None and (key >= after if descending else key <= after):
+      continue
+    if until is not None and (key < until if descending else key > until):
+      return
+    if matches(record):
+      yield key, record
+
+
+def iter_archived(filters, after=None, until=None, descending=True):
+  """(key, record) for archived rows matching `filters`, in ("-timestamp", "-id") order (reversed if not descending).
+
+  `after` is the keyset position to continue from and `until` the position
+  past which no rows are wanted; both are exclusive. Segments are opened one
+  at a time, only once the merge reaches their time range.
+  """
+  matches = _RecordFilter(filters)
+  pending = iter(candidate_segments(filters, after, until, descending))
+  upcoming = next(pending, None)
+  heap, order = [], itertools.count()
+
+  def push(rows):
+    for key, record in rows:
+      heapq.heappush(heap, (_Newest(key) if descending else key, next(order), key, record, rows))
+      return
+
+  def reaches(segment, key):
+    return utc_stamp(segment.end_at) >= key[0] if descending else utc_stamp(segment.start_at) <= key[0]
+
+  while True:
+    # A segment joins the merge once its range reaches the next row to hand out.
+    while upcoming is not None and (not heap or reaches(upcoming, heap[0][2])):
+      push(_segment_rows(upcoming, matches, after, until, descending))
+      upcoming = next(pending, None)
+    if not heap:
+      return
+    _, _, key, record, rows = heapq.heappop(heap)
+    yield key, record
+    push(rows)
+
+
+def archived_log(record, actors):
+  """An unsaved AuditLog for an archived record, marked `archived`."""
+  log = AuditLog(
+    id=uuid.UUID(record["id"]), timestamp=parse_datetime(record["timestamp"]),
+    action=record["action"], entity_type=record["entity_type"], entity_id=record["entity_id"],
+    summary=record["summary"], ip_address=record["ip_address"], user_agent=record["user_agent"],
+    before=record["before"], after=record["after"], metadata=record["metadata"],
+  )
+  if record["actor"] is not None:
+    # Users deleted since archiving keep the username they had.
+    log.actor = actors.get(record["actor"]) or User(pk=record["actor"], username=record["actor_username"])
+  log.archived = True
+  return log
+
+
+def merge_archived(rows, filters, cursor, limit):
+  """The first `limit` of the table's keyset page `rows` and the archived rows, merged in page order.
+
+  `cursor` is the page's decoded (values, reverse) cursor or None.
+  """
+  values, reverse = cursor or (None, False)
+  descending = not reverse
+  after = row_key(values[0], values[1]) if values else None
+  # A full page from the table bounds how far into the archive the page can reach.
+  until = row_key(rows[-1].timestamp, rows[-1].id) if len(rows) >= limit else None
+  table = ((row_key(row.timestamp, row.id), row) for row in rows)
+  archived = iter_archived(filters, after, until, descending)
+  merged = [row for _, row in itertools.islice(heapq.merge(table, archived, key=itemgetter(0), reverse=descending), limit)]
+
+  actor_ids = {row["actor"] for row in merged if isinstance(row, dict) and row["actor"] is not None}
+  actors = User.objects.in_bulk(actor_ids) if actor_ids else {}
+  return [archived_log(row, actors) if isinstance(row, dict) else row for row in merged]
+
+
+def _covers(segment, matches):
+  """True when every row of `segment` lies inside the start_date/end_date range of `matches`."""
+  return (
+    (matches.since is None or utc_stamp(segment.start_at) >= matches.since)
+    and (matches.before is None or utc_stamp(segment.end_at) < matches.before)
+  )
+
+
+def count_archived(filters, max_segments=None):
+  """(number of archived rows matching `filters`, exact).
+
+  Segments the filters take whole are counted from the index; the others have
+  to be decompressed and read. When more than `max_segments` (default
+  AUDIT_ARCHIVE_COUNT_MAX_SEGMENTS) would be read, the count is the index's
+  upper bound (estimate_archived) and exact is False.
+  """
+  if max_segments is None:
+    max_segments = settings.AUDIT_ARCHIVE_COUNT_MAX_SEGMENTS
+  segments = candidate_segments(filters)
+  matches = _RecordFilter(filters)
+  row_filters = any(filters.get(name) for name in ("actor", "action", "entity_type", "q"))
+  read = [segment for segment in segments if row_filters or not _covers(segment, matches)]
+  if len(read) > max_segments:
+    return sum(segment.row_count for segment in segments), False
+  whole = sum(segment.row_count for segment in segments) - sum(segment.row_count for segment in read)
+  return whole + sum(1 for segment in read for _ in _segment_rows(segment, matches, None, None, True)), True
+
+
+def estimate_archived(filters):
+  """Upper bound on archived rows matching `filters`, from the segment index alone."""
+  return sum(segment.row_count for segment in candidate_segments(filters))
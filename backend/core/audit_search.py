@@ -0,0 +1,85 @@
+"""Indexed substring search over audit log summaries and entity ids.
+
+Audit searches are "contains" searches (a name, an id fragment), so the index is
+a trigram one. PostgreSQL gets pg_trgm GIN indexes on UPPER(summary) and
+UPPER(entity_id), which is exactly the expression icontains compiles to, so the
+planner uses them without any change to the query. SQLite gets an FTS5 trigram
+table (core_auditlog_fts) kept in sync by triggers (core.db.FullTextIndex, as
+for indicators), and matching rows are looked up through it.
+
+Trigrams need at least three characters; shorter queries, other backends and
+queries matching more than AUDIT_SEARCH_INDEX_MAX_MATCHES rows use plain
+icontains, which for common words finds a page of matches quickly by walking
+the newest rows first.
+"""
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+from .db import FullTextIndex, execute, is_partitioned
+from .models import AuditLogSearchDoc
+
+FIELDS = ("summary", "entity_id")
+MIN_LENGTH = 3
+
+PG_INSTALL = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+# Built outside a transaction so audit writes are not blocked (migration 0011 is
+# non-atomic); once the table is partitioned (core.audit_archive) it is built on
+# each partition instead, as CONCURRENTLY is not supported there.
+PG_INDEX = (
+  "CREATE INDEX {concurrently}IF NOT EXISTS core_auditlog_{field}_trgm_idx "
+  "ON core_auditlog USING GIN (UPPER({field}) gin_trgm_ops)"
+)
+PG_UNINSTALL = [f"DROP INDEX IF EXISTS core_auditlog_{field}_trgm_idx" for field in FIELDS]
+
+
+def _pg_install(connection):
+  concurrently = "" if is_partitioned(connection, "core_auditlog") else "CONCURRENTLY "
+  execute(connection, PG_INSTALL + [PG_INDEX.format(concurrently=concurrently, field=field) for field in FIELDS])
+  return False
+
+
+INDEX = FullTextIndex(
+  "core_auditlog", "auditlog_id", FIELDS,
+  fts_options="tokenize='trigram'",
+  migration="0011_auditlog_search_index",
+  pg_install=_pg_install,
+  pg_rebuild=_pg_install,
+  pg_uninstall=lambda connection: execute(connection, PG_UNINSTALL),
+)
+# Run by migration 0011 and the rebuild_search_index command.
+install_audit_search_index = INDEX.install
+rebuild_audit_search_index = INDEX.rebuild
+uninstall_audit_search_index = INDEX.uninstall
+
+
+def _fts_match(q, fields):
+  # One quoted phrase: the trigram tokenizer turns it into a substring match.
+  phrase = '"' + q.replace('"', '""') + '"'
+  return "{" + " ".join(fields) + "} : " + phrase
+
+
+def count_audit_matches(q, limit, fields=FIELDS, using="default"):
+  """Number of audit logs the SQLite trigram index matches for `q`, counted up to `limit` + 1."""
+  with connections[using].cursor() as cursor:
+    cursor.execute(
+      "SELECT count(*) FROM (SELECT 1 FROM core_auditlog_fts WHERE core_auditlog_fts MATCH %s LIMIT %s) m",
+      [_fts_match(q, fields), limit + 1],
+    )
+    return cursor.fetchone()[0]
+
+
+def audit_search_q(q, fields=("summary",), using="default"):
+  """Q for audit logs where any of `fields` contains `q`, case-insensitively."""
+  contains = Q()
+  for field in fields:
+    contains |= Q(**{f"{field}__icontains": q})
+  connection = connections[using]
+  if len(q) < MIN_LENGTH or connection.vendor != "sqlite" or not INDEX.has_fts_table(using):
+    # On PostgreSQL this is the indexed path: the trigram indexes cover UPPER(field) LIKE.
+    return contains
+  limit = settings.AUDIT_SEARCH_INDEX_MAX_MATCHES
+  if count_audit_matches(q, limit, fields, using) > limit:
+    return contains
+  docs = AuditLogSearchDoc.objects.using(using).filter(fulltext__document__match=_fts_match(q, fields))
+  return Q(pk__in=docs.values("auditlog_id"))
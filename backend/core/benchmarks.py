@@ -0,0 +1,128 @@
+"""Benchmarks for the due-status, serialization, snapshot, audit and import hot paths.
+
+seed() fills the database with a core.datasets dataset of a given size:
+indicators across projects with two years of compliance history, evidence
+and audit logs. run_cases() times each case and counts its SQL queries;
+compare() checks a run against a saved baseline. `manage.py benchmark` drives all three in a throwaway test
+database and writes the results as JSON.
+"""
+import io
+import platform
+import statistics
+import tempfile
+import time
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .datasets import generate
+from .importers import import_indicators_csv
+from .models import Indicator
+from .serializers import IndicatorSerializer
+from .services import compute_due_status
+from .snapshots import build_snapshot_payload
+
+
+def seed(size, seed=0):
+  """Create `size` indicators with history (core.datasets); returns the benchmark user."""
+  generate(size, years=2, file_pool=5, seed=seed)
+  return User.objects.create_user(username="bench", password="bench", is_superuser=True)
+
+
+def _import_csv(rows, run):
+  lines = ["Section,Standard,Indicator,Evidence Required,Responsible Person"]
+  lines += [f"Imported,IMP-{run}-{i:06d},Imported indicator {i},Register,Manager" for i in range(rows)]
+  return io.StringIO("\n".join(lines) + "\n")
+
+
+def cases(size, user):
+  """{name: callable} for one dataset; each callable does one timed run."""
+  client = APIClient()
+  client.force_authenticate(user)
+  sample = list(Indicator.objects.order_by("id")[:200])
+  page = min(size, 1000)
+  today = timezone.localdate()
+  runs = iter(range(1_000_000))
+
+  def get(path, params=None, stream=False):
+    resp = client.get(path, params or {})
+    assert resp.status_code == 200, (path, resp.status_code)
+    return b"".join(resp.streaming_content) if stream else resp.content
+
+  return {
+    "compute_due_status[200]": lambda: [compute_due_status(indicator) for indicator in sample],
+    f"indicator_serializer[{page}]": lambda: IndicatorSerializer(Indicator.objects.all()[:page], many=True).data,
+    "build_snapshot_payload": lambda: build_snapshot_payload({}, today),
+    "audit_summary[year]": lambda: get("/api/audit/summary/", {"period": "year"}),
+    "audit_logs[page]": lambda: get("/api/audit/logs/"),
+    "audit_logs[search]": lambda: get("/api/audit/logs/", {"q": "PHA-00001"}),
+    "audit_export": lambda: get("/api/audit/logs/export/", stream=True),
+    f"csv_import[{page}]": lambda: import_indicators_csv(_import_csv(page, next(runs))),
+  }
+
+
+def run_cases(size, user, repeat=5, only=None):
+  """Time every case `repeat` times after one warm-up run: {name: {median_ms, min_ms, queries}}."""
+  results = {}
+  for name, fn in cases(size, user).items():
+    if only and not any(name.startswith(prefix) for prefix in only):
+      continue
+    cache.clear()
+    fn()
+    timings, queries = [], 0
+    for _ in range(repeat):
+      cache.clear()
+      reset_queries()
+      with CaptureQueriesContext(connection) as captured:
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+      queries = len(captured)
+    results[name] = {
+      "median_ms": round(statistics.median(timings), 2),
+      "min_ms": round(min(timings), 2),
+      "queries": queries,
+    }
+  return results
+
+
+def environment():
+  return {
+    "python": platform.python_version(),
+    "django": django.get_version(),
+    "database": connection.vendor,
+    "machine": platform.machine(),
+    "created_at": timezone.now().isoformat(),
+  }
+
+
+def compare(results, baseline, threshold):
+  """Regressions of `results` against `baseline` (both {size: {case: stats}}).
+
+  A case regresses when its median is more than `threshold` (a fraction) slower,
+  or when it runs more queries than before. Cases missing from either side are skipped.
+  """
+  regressions = []
+  for size, current in results.items():
+    for name, stats in current.items():
+      before = baseline.get(size, {}).get(name)
+      if before is None:
+        continue
+      if stats["median_ms"] > before["median_ms"] * (1 + threshold):
+        regressions.append(
+          f"{name} @ {size}: {stats['median_ms']:.1f}ms vs {before['median_ms']:.1f}ms "
+          f"(+{(stats['median_ms'] / before['median_ms'] - 1) * 100:.0f}%)"
+        )
+      if stats["queries"] > before["queries"]:
+        regressions.append(f"{name} @ {size}: {stats['queries']} queries vs {before['queries']}")
+  return regressions
+
+
+def media_root():
+  return tempfile.mkdtemp(prefix="accredcheck-bench-")
+
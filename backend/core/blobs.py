@@ -0,0 +1,251 @@
+"""Content-addressed evidence storage.
+
+Each distinct evidence file is stored once, at evidence/blobs/<aa>/<sha256><ext>,
+as an EvidenceBlob; EvidenceItem.blob points at it and EvidenceBlob.ref_count
+counts those rows. Uploads are hashed while they stream in (the handlers below
+are listed in settings.FILE_UPLOAD_HANDLERS), so storing one never re-reads it.
+core.signals attaches new uploads and releases blobs when evidence is deleted or
+its file replaced.
+
+A blob that loses its last reference stays, at ref_count 0, until collect()
+runs after that transaction commits. store() and collect() both lock the row
+first, so an upload of the same content either revives the blob before it is
+collected or, once it is gone, writes the file again; a file is never deleted
+from under a new reference. `dedupe_evidence` (recount) also collects blobs
+left at 0 and deletes files under evidence/blobs/ that no blob owns.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import derivatives, metrics
+from .models import EvidenceBlob, EvidenceItem
+
+BLOB_DIR = "evidence/blobs"
+# Files younger than this are never swept: store() writes a blob's file before
+# its transaction commits the row.
+SWEEP_MIN_AGE = timedelta(hours=1)
+
+
+class HashingMixin:
+  """Keeps a sha256 of the chunks this handler stores and sets it as `sha256` on the uploaded file."""
+
+  def new_file(self, *args, **kwargs):
+    # Before super(): MemoryFileUploadHandler raises StopFutureHandlers from new_file.
+    self.digest = hashlib.sha256()
+    super().new_file(*args, **kwargs)
+
+  def receive_data_chunk(self, raw_data, start):
+    remaining = super().receive_data_chunk(raw_data, start)
+    if remaining is None:  # this handler consumed the chunk
+      self.digest.update(raw_data)
+    return remaining
+
+  def file_complete(self, file_size):
+    upload = super().file_complete(file_size)
+    if upload is not None:
+      upload.sha256 = self.digest.hexdigest()
+    return upload
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+  pass
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin, TemporaryFileUploadHandler):
+  pass
+
+
+def file_sha256(file):
+  """sha256 hex digest of a file, read in chunks; used when it did not come through the handlers."""
+  digest = hashlib.sha256()
+  if hasattr(file, "seek"):
+    file.seek(0)
+  for chunk in file.chunks():
+    digest.update(chunk)
+  if hasattr(file, "seek"):
+    file.seek(0)
+  return digest.hexdigest()
+
+
+def blob_name(digest, filename):
+  ext = os.path.splitext(filename or "")[1].lower()
+  return f"{BLOB_DIR}/{digest[:2]}/{digest}{ext}"
+
+
+def _touch(name):
+  """Set a stored file's mtime to now; False when the storage has no local paths."""
+  try:
+    path = default_storage.path(name)
+  except NotImplementedError:
+    return False
+  os.utime(path)
+  return True
+
+
+def _write(digest, file, filename):
+  name = blob_name(digest, filename)
+  if default_storage.exists(name):
+    # Left by a rolled-back upload or an earlier run of dedupe_evidence: same digest, same bytes.
+    # Reused only once its age is reset, so sweep_files() leaves it to the row about to claim it;
+    # storages without local paths get it written again instead.
+    if default_storage.size(name) == file.size and _touch(name):
+      return name
+    default_storage.delete(name)
+  if hasattr(file, "seek"):
+    file.seek(0)
+  return default_storage.save(name, file)
+
+
+def _locked(digest):
+  return EvidenceBlob.objects.select_for_update().filter(sha256=digest).first()
+
+
+def store(file, filename=None, refs=1):
+  """The EvidenceBlob holding `file`'s content with `refs` more references, writing the file if it is new.
+
+  Returns (blob, created). Call inside the transaction that saves the referencing rows.
+  """
+  digest = getattr(file, "sha256", None) or file_sha256(file)
+  filename = filename or getattr(file, "name", "")
+  with transaction.atomic():
+    blob = _locked(digest)
+    if blob is None:
+      name = _write(digest, file, filename)
+      try:
+        with transaction.atomic():
+          return EvidenceBlob.objects.create(sha256=digest, file=name, size=file.size, ref_count=refs), True
+      except IntegrityError:
+        # A concurrent upload of the same content created it first.
+        blob = _locked(digest)
+    if blob.ref_count == 0 and not default_storage.exists(blob.file.name):
+      # Left by a collect() that deleted the file and then failed to commit.
+      _write(digest, file, blob.file.name)
+    EvidenceBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") + refs)
+    blob.ref_count += refs
+  metrics.inc("evidence_deduplicated_bytes_total", value=file.size * refs)
+  return blob, False
+
+
+def release(blob_id):
+  """Drop one reference; the last one leaves the blob for collect() once the transaction commits.
+
+  Returns True when the file is going to be deleted.
+  """
+  with transaction.atomic():
+    blob = EvidenceBlob.objects.select_for_update().filter(pk=blob_id).first()
+    if blob is None:
+      return False
+    if blob.ref_count > 1:
+      EvidenceBlob.objects.filter(pk=blob_id).update(ref_count=F("ref_count") - 1)
+      return False
+    EvidenceBlob.objects.filter(pk=blob_id).update(ref_count=0)
+    transaction.on_commit(lambda: collect(blob_id))
+  return True
+
+
+def collect(blob_id):
+  """Delete the blob and its file if it still has no references. Returns True if it did."""
+  with transaction.atomic():
+    blob = EvidenceBlob.objects.select_for_update().filter(pk=blob_id, ref_count=0).first()
+    if blob is None or blob.evidence_items.exists():
+      return False
+    name = blob.file.name
+    blob.delete()
+    # Deleted while the row is still locked: a store() waiting on it finds
+    # neither row nor file afterwards and writes both again.
+    default_storage.delete(name)
+    derivatives.delete(name)
+  return True
+
+
+def dedupe_existing(batch_size=500, dry_run=False, log=None):
+  """Move evidence files stored before content addressing into blobs; returns a summary dict.
+
+  Rows sharing a file name move together. Old files are deleted after their rows point
+  at the blob; missing files are reported and their rows left alone. Finally every
+  blob's ref_count is recounted, blobs nothing references are deleted, and so
+  are files under evidence/blobs/ that no blob owns.
+  """
+  summary = {
+    "files": 0, "rows": 0, "blobs_created": 0, "bytes_saved": 0, "missing": [],
+    "recounted": 0, "orphans_deleted": 0, "stray_files_deleted": 0,
+  }
+  legacy = EvidenceItem.objects.filter(blob__isnull=True).exclude(file="").exclude(file__isnull=True)
+  seen = set(EvidenceBlob.objects.values_list("sha256", flat=True)) if dry_run else None
+  last = ""
+  while True:
+    names = list(legacy.filter(file__gt=last).order_by("file").values_list("file", flat=True).distinct()[:batch_size])
+    if not names:
+      break
+    last = names[-1]
+    for name in names:
+      if not default_storage.exists(name):
+        summary["missing"].append(name)
+        continue
+      rows = legacy.filter(file=name)
+      with default_storage.open(name, "rb") as file:
+        if dry_run:
+          digest, count = file_sha256(file), rows.count()
+          created = digest not in seen
+          seen.add(digest)
+        else:
+          with transaction.atomic():
+            count = rows.count()
+            blob, created = store(file, name, refs=count)
+            rows.update(blob=blob, file=blob.file.name)
+            if blob.file.name != name:
+              transaction.on_commit(lambda name=name: (default_storage.delete(name), derivatives.delete(name)))
+        size = file.size
+      summary["files"] += 1
+      summary["rows"] += count
+      summary["blobs_created"] += created
+      summary["bytes_saved"] += 0 if created else size
+      if log:
+        log(f"{name}: {count} rows -> {'new' if created else 'existing'} blob")
+
+  if not dry_run:
+    summary["recounted"], summary["orphans_deleted"], summary["stray_files_deleted"] = recount()
+  return summary
+
+
+def recount():
+  """Set every blob's ref_count from the rows pointing at it, collect unreferenced blobs and sweep stray files.
+
+  Returns (blobs corrected, blobs deleted, files deleted).
+  """
+  corrected = 0
+  for blob_id, count in (
+    EvidenceBlob.objects.annotate(refs=Count("evidence_items")).exclude(ref_count=F("refs")).values_list("pk", "refs")
+  ):
+    EvidenceBlob.objects.filter(pk=blob_id).update(ref_count=count)
+    corrected += 1
+  collected = sum(collect(blob_id) for blob_id in EvidenceBlob.objects.filter(ref_count=0).values_list("pk", flat=True))
+  return corrected, collected, len(sweep_files())
+
+
+def sweep_files(min_age=SWEEP_MIN_AGE):
+  """Delete files under evidence/blobs/ that belong to no blob and are older than `min_age`; returns their names.
+
+  Such files are left by uploads that were rolled back after writing them.
+  Derivatives (<sha256>.thumb.jpg, ...) belong to the blob they were made from.
+  """
+  if not default_storage.exists(BLOB_DIR):
+    return []
+  owned = set(EvidenceBlob.objects.values_list("file", flat=True))
+  owned |= {derivatives.derivative_name(name, kind) for name in list(owned) for kind in derivatives.KINDS}
+  cutoff = timezone.now() - min_age
+  swept = []
+  for prefix in default_storage.listdir(BLOB_DIR)[0]:
+    for filename in default_storage.listdir(f"{BLOB_DIR}/{prefix}")[1]:
+      name = f"{BLOB_DIR}/{prefix}/{filename}"
+      if name not in owned and default_storage.get_modified_time(name) < cutoff:
+        default_storage.delete(name)
+        swept.append(name)
+  return swept
@@ -0,0 +1,32 @@
+"""Multi-row INSERTs of plain tuples, for bulk paths where bulk_create's per-object cost dominates.
+
+Rows carry values already in database form (see prepare_rows); no model
+instances are built, no defaults or auto_now values are filled in and no
+signals are sent, so callers supply every NOT NULL column themselves.
+"""
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+CHUNK = 2000
+
+
+def insert_rows(model, columns, rows, ignore_conflicts=False, chunk=CHUNK):
+  """INSERT `rows` (tuples in `columns` order, by field name) into `model`'s table."""
+  rows = list(rows)
+  if not rows:
+    return
+  qn = connection.ops.quote_name
+  sql = "INSERT INTO {} ({}) VALUES ({}){}".format(
+    qn(model._meta.db_table), ", ".join(qn(model._meta.get_field(name).column) for name in columns),
+    ", ".join(["%s"] * len(columns)), " ON CONFLICT DO NOTHING" if ignore_conflicts else "",
+  )
+  with connection.cursor() as cursor:
+    for i in range(0, len(rows), chunk):
+      cursor.executemany(sql, rows[i:i + chunk])
+
+
+def prepare_rows(model, columns, rows):
+  """Python values -> database values, column by column, as bulk_create would convert them."""
+  preps = [model._meta.get_field(name).get_db_prep_save for name in columns]
+  # The wrapper itself, not the `connection` proxy: one thread-local lookup instead of one per value.
+  wrapper = connections[DEFAULT_DB_ALIAS]
+  return [tuple(value if value is None else prep(value, wrapper) for prep, value in zip(preps, row)) for row in rows]
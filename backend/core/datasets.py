@@ -0,0 +1,280 @@
+"""Synthetic datasets at production scale, for staging and benchmarks.
+
+generate() bulk-creates projects, users in the Admin/Contributor/Reviewer
+groups, indicators with multi-year compliance histories (renewals, late
+renewals, lapses and revocations), evidence rows sharing a pool of small
+placeholder blobs (core.blobs), and the audit log rows those events would have written.
+Rows are built as plain tuples and inserted with core.bulk one batch of
+indicators at a time inside a transaction, so memory stays flat and
+millions of rows take minutes. Indicator.latest_* is filled in from the
+generated history; the compliance trend is rebuilt if it had been built.
+
+The same seed, sizes and `today` produce the same rows with the same ids
+(users and their auto-increment ids aside).
+"""
+import random
+import struct
+from collections import Counter
+import uuid
+import zlib
+from dataclasses import asdict, dataclass
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import blobs
+from .audit_archive import ensure_partitions
+from .bulk import insert_rows, prepare_rows
+from .models import (
+  AuditAction, AuditLog, ComplianceRecord, ComplianceTrendState, EvidenceBlob, EvidenceItem, EvidenceType, Frequency,
+  Indicator, Project, User,
+)
+from .services import compute_valid_until
+from .snapshots import bump_version
+from .trends import rebuild_trend
+
+ROLES = (("Admin", 0.05), ("Reviewer", 0.2), ("Contributor", 0.75))
+FREQUENCIES = (
+  (Frequency.MONTHLY, 0.4), (Frequency.QUARTERLY, 0.25), (Frequency.ANNUALLY, 0.15),
+  (Frequency.ONE_TIME, 0.15), (Frequency.WEEKLY, 0.05),
+)
+EVIDENCE_TYPES = (
+  (EvidenceType.FILE, 0.4), (EvidenceType.NOTE, 0.25), (EvidenceType.PHOTO, 0.2),
+  (EvidenceType.LINK, 0.1), (EvidenceType.SCREENSHOT, 0.05),
+)
+SECTIONS = ("Governance", "Infection Control", "Pharmacy", "Laboratory", "Patient Safety", "Records", "Facilities", "Staffing")
+RESPONSIBLE = ("Facility Manager", "Nurse In-charge", "Pharmacist", "Lab Technician", "Medical Officer", "Records Clerk")
+USERNAME_PREFIX = "gen-"
+
+# Column order of the row tuples built below (field names, see core.bulk).
+INDICATOR_COLUMNS = (
+  "id", "project", "section", "standard", "indicator_text", "evidence_required_text", "responsible_person",
+  "frequency", "is_active", "latest_compliant_on", "latest_valid_until", "created_at", "updated_at",
+)
+RECORD_COLUMNS = (
+  "id", "indicator", "compliant_on", "valid_until", "notes", "is_revoked", "revoked_at", "revoked_reason",
+  "created_by", "created_at", "updated_at",
+)
+EVIDENCE_COLUMNS = ("id", "indicator", "compliance_record", "type", "note_text", "url", "file", "blob", "created_by", "created_at")
+AUDIT_COLUMNS = ("id", "timestamp", "actor", "action", "entity_type", "entity_id", "summary", "ip_address", "user_agent", "metadata")
+
+
+@dataclass
+class DatasetReport:
+  projects: int = 0
+  users: int = 0
+  indicators: int = 0
+  compliance_records: int = 0
+  revoked: int = 0
+  evidence_items: int = 0
+  placeholder_files: int = 0
+  audit_logs: int = 0
+
+  def as_dict(self):
+    return asdict(self)
+
+
+def _pick(rng, weighted):
+  return rng.choices([value for value, _ in weighted], [weight for _, weight in weighted])[0]
+
+
+def _uuid(rng):
+  return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _at(rng, day):
+  """An aware datetime during working hours on `day`."""
+  return timezone.make_aware(datetime.combine(day, time(8)) + timedelta(minutes=rng.randrange(9 * 60)))
+
+
+def _png(rgb):
+  """A valid 8x8 single-colour PNG."""
+  def chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+  rows = b"".join(b"\x00" + bytes(rgb) * 8 for _ in range(8))
+  return b"".join([
+    b"\x89PNG\r\n\x1a\n",
+    chunk(b"IHDR", struct.pack(">IIBBBBB", 8, 8, 8, 2, 0, 0, 0)),
+    chunk(b"IDAT", zlib.compress(rows)),
+    chunk(b"IEND", b""),
+  ])
+
+
+def _pdf(n):
+  return (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 200 200]>>endobj\n"
+    + f"% placeholder {n}\ntrailer<</Root 1 0 R>>\n%%EOF\n".encode()
+  )
+
+
+def placeholder_files(count, rng):
+  """{evidence type: [(blob id, storage name)]} of `count` small files per file-backed type.
+
+  The blobs start with no references; generate() adds them as evidence rows go in.
+  """
+  pool = {EvidenceType.FILE: [], EvidenceType.PHOTO: [], EvidenceType.SCREENSHOT: []}
+  for n in range(count):
+    rgb = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+    for kind, name, content in (
+      (EvidenceType.FILE, f"placeholder-{n:04d}.pdf", _pdf(n)),
+      (EvidenceType.PHOTO, f"photo-{n:04d}.png", _png(rgb)),
+      (EvidenceType.SCREENSHOT, f"screenshot-{n:04d}.png", _png(rgb[::-1])),
+    ):
+      blob, _ = blobs.store(ContentFile(content, name=name), refs=0)
+      pool[kind].append((blob.pk, blob.file.name))
+  return pool
+
+
+def _users(count, rng, password):
+  groups = {name: Group.objects.get_or_create(name=name)[0] for name, _ in ROLES}
+  # One hash for everyone: hashing per user would dominate the run.
+  hashed = make_password(password) if password else "!"
+  # Every role is represented, however few users there are.
+  roles = [name for name, _ in ROLES][:count] + [_pick(rng, ROLES) for _ in range(count - len(ROLES))]
+  users = User.objects.bulk_create([
+    User(username=f"{USERNAME_PREFIX}{n:06d}", email=f"{USERNAME_PREFIX}{n:06d}@example.org", password=hashed, is_staff=role == "Admin")
+    for n, role in enumerate(roles)
+  ])
+  User.groups.through.objects.bulk_create([
+    User.groups.through(user_id=user.pk, group_id=groups[role].pk) for user, role in zip(users, roles)
+  ])
+  return users
+
+
+def _audit(rng, actor, action, entity_type, entity_id, summary, at, metadata=None):
+  ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+  return (_uuid(rng), at, actor, action, entity_type, str(entity_id), summary, ip, "Mozilla/5.0 (generated)", metadata)
+
+
+def _evidence(rng, indicator_id, record_id, creator, at, rate, pool, evidence, logs):
+  for _ in range(3):
+    if rng.random() >= rate:
+      break
+    kind = _pick(rng, EVIDENCE_TYPES)
+    item_id = _uuid(rng)
+    note = url = blob = path = None
+    if kind == EvidenceType.NOTE:
+      note = rng.choice(["Checklist completed", "Spot check passed", "Minutes filed"])
+    elif kind == EvidenceType.LINK:
+      url = f"https://docs.example.org/evidence/{item_id}"
+    else:
+      blob, path = rng.choice(pool[kind])
+    evidence.append((item_id, indicator_id, record_id, kind, note, url, path, blob, creator, at))
+    logs.append(_audit(rng, creator, AuditAction.CREATE, "EvidenceItem", item_id, f"Uploaded evidence for indicator {indicator_id}", at))
+
+
+def _history(rng, indicator_id, frequency, start, today, revoke_rate, evidence_rate, creators, pool, records, evidence, logs):
+  """Rows for one indicator's compliance from `start`: renewals, late renewals, lapses, revocations.
+
+  Returns the latest non-revoked (compliant_on, valid_until), or (None, None).
+  """
+  latest, day = (None, None), start
+  while day <= today:
+    record_id, creator, at = _uuid(rng), rng.choice(creators), _at(rng, day)
+    valid_until = compute_valid_until(frequency, day)
+    revoked = rng.random() < revoke_rate
+    revoked_at = reason = None
+    if revoked:
+      revoked_at = _at(rng, min(day + timedelta(days=rng.randrange(1, 8)), today))
+      reason = rng.choice(["Recorded in error", "Evidence did not meet the standard"])
+    notes = rng.choice([None, None, "Checked on site", "Register reviewed"])
+    records.append((record_id, indicator_id, day, valid_until, notes, revoked, revoked_at, reason, creator, at, revoked_at or at))
+    logs.append(_audit(rng, creator, AuditAction.CREATE, "ComplianceRecord", record_id, f"Created compliance record for indicator {indicator_id}", at))
+    _evidence(rng, indicator_id, record_id, creator, at, evidence_rate, pool, evidence, logs)
+    if revoked:
+      logs.append(_audit(
+        rng, rng.choice(creators), AuditAction.REVOKE, "ComplianceRecord", record_id,
+        f"Revoked compliance record {record_id}", revoked_at, {"reason": reason},
+      ))
+      day += timedelta(days=rng.randrange(1, 10))
+      continue
+    latest = (day, valid_until)
+    if valid_until is None or rng.random() < 0.02:
+      break  # one-time, or the indicator lapsed and was never renewed
+    if rng.random() < 0.15:
+      day = valid_until + timedelta(days=rng.randrange(1, (valid_until - day).days // 2 + 2))
+    else:
+      day = valid_until - timedelta(days=rng.randrange(4))
+  return latest
+
+
+def generate(indicators, projects=None, users=None, years=3, evidence_rate=0.35, revoke_rate=0.03,
+             file_pool=20, seed=0, today=None, batch_size=2000, password=None, progress=None):
+  """Create a dataset of `indicators` indicators and everything around them; returns a DatasetReport.
+
+  `projects` and `users` default to one per 250 and per 100 indicators. `progress`
+  is called with the report after each batch of indicators.
+  """
+  if User.objects.filter(username__startswith=USERNAME_PREFIX).exists():
+    raise ValueError(f"Users named {USERNAME_PREFIX}* already exist; generate into an empty database")
+  rng = random.Random(seed)
+  today = today or timezone.localdate()
+  projects = projects or max(1, indicators // 250)
+  users = users or max(3, indicators // 100)
+  report = DatasetReport()
+  first_day = today - timedelta(days=365 * years)
+  ensure_partitions(connection, since=_at(rng, first_day))
+
+  with transaction.atomic():
+    creators = [user.pk for user in _users(users, rng, password)]
+    report.users = len(creators)
+    project_ids = [project.pk for project in Project.objects.bulk_create([
+      Project(id=_uuid(rng), name=f"Facility {n + 1:04d}", description=f"Generated project {n + 1}", created_by_id=rng.choice(creators))
+      for n in range(projects)
+    ])]
+    report.projects = len(project_ids)
+    pool = placeholder_files(file_pool, rng)
+    report.placeholder_files = sum(len(names) for names in pool.values())
+
+  for offset in range(0, indicators, batch_size):
+    batch, records, evidence, logs = [], [], [], []
+    for n in range(offset, min(offset + batch_size, indicators)):
+      indicator_id, section, frequency = _uuid(rng), rng.choice(SECTIONS), _pick(rng, FREQUENCIES)
+      start = first_day + timedelta(days=rng.randrange(120))
+      created_at = _at(rng, start)
+      standard = f"{section[:3].upper()}-{n + 1:07d}"
+      logs.append(_audit(rng, rng.choice(creators), AuditAction.CREATE, "Indicator", indicator_id, f"Created indicator {standard}", created_at))
+      latest = (None, None)
+      if rng.random() >= 0.05:  # the rest were never started
+        latest = _history(
+          rng, indicator_id, frequency, start + timedelta(days=rng.randrange(30)), today, revoke_rate, evidence_rate,
+          creators, pool, records, evidence, logs,
+        )
+      batch.append((
+        indicator_id, rng.choice(project_ids), section, standard, f"{section} requirement {n + 1} is met and documented",
+        rng.choice(["Signed register", "Photo of display", "Audit checklist", None]), rng.choice(RESPONSIBLE),
+        frequency, rng.random() > 0.02, *latest, created_at, created_at,
+      ))
+
+    with transaction.atomic():
+      for model, columns, rows in (
+        (Indicator, INDICATOR_COLUMNS, batch), (ComplianceRecord, RECORD_COLUMNS, records),
+        (EvidenceItem, EVIDENCE_COLUMNS, evidence), (AuditLog, AUDIT_COLUMNS, logs),
+      ):
+        insert_rows(model, columns, prepare_rows(model, columns, rows), chunk=batch_size)
+      for blob_id, refs in Counter(row[7] for row in evidence if row[7]).items():
+        EvidenceBlob.objects.filter(pk=blob_id).update(ref_count=F("ref_count") + refs)
+    report.indicators += len(batch)
+    report.compliance_records += len(records)
+    report.revoked += sum(1 for record in records if record[5])
+    report.evidence_items += len(evidence)
+    report.audit_logs += len(logs)
+    if progress:
+      progress(report)
+
+  # Placeholders no evidence row picked would never be released.
+  pool_ids = [blob_id for entries in pool.values() for blob_id, _ in entries]
+  for blob_id in EvidenceBlob.objects.filter(pk__in=pool_ids, ref_count=0).values_list("pk", flat=True):
+    blobs.release(blob_id)
+  # Rows went in without signals: rebuild what the signal handlers would have kept current.
+  if ComplianceTrendState.objects.filter(through_day__isnull=False).exists():
+    rebuild_trend(today)
+  bump_version()
+  return report
@@ -0,0 +1,170 @@
+"""Database helpers shared by migrations and queries."""
+from django.db import connections
+from django.db.migrations.operations import AddIndex
+from django.db.migrations.recorder import MigrationRecorder
+
+
+class AddIndexOnline(AddIndex):
+  """AddIndex that builds with CREATE INDEX CONCURRENTLY on PostgreSQL.
+
+  Concurrent builds do not hold a write lock on the table, so large tables stay
+  writable while the index is created. Other backends get a plain CREATE INDEX.
+  Migrations using it must set atomic = False.
+  """
+
+  def describe(self):
+    return "Create index %s (concurrently on PostgreSQL) on model %s" % (self.index.name, self.model_name)
+
+  def _concurrently(self, schema_editor, model):
+    connection = schema_editor.connection
+    # Partitioned tables (core_auditlog) cannot be indexed concurrently; the
+    # index is built on each partition in turn instead.
+    if connection.vendor != "postgresql" or is_partitioned(connection, model._meta.db_table):
+      return {}
+    return {"concurrently": True}
+
+  def database_forwards(self, app_label, schema_editor, from_state, to_state):
+    model = to_state.apps.get_model(app_label, self.model_name)
+    if self.allow_migrate_model(schema_editor.connection.alias, model):
+      schema_editor.add_index(model, self.index, **self._concurrently(schema_editor, model))
+
+  def database_backwards(self, app_label, schema_editor, from_state, to_state):
+    model = from_state.apps.get_model(app_label, self.model_name)
+    if self.allow_migrate_model(schema_editor.connection.alias, model):
+      schema_editor.remove_index(model, self.index, **self._concurrently(schema_editor, model))
+
+
+def is_partitioned(connection, table):
+  """True when `table` is a natively partitioned PostgreSQL table."""
+  if connection.vendor != "postgresql":
+    return False
+  with connection.cursor() as cursor:
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+    row = cursor.fetchone()
+  return row is not None and row[0] == "p"
+
+
+def execute(connection, statements):
+  with connection.cursor() as cursor:
+    for sql in statements:
+      cursor.execute(sql)
+
+
+def sqlite_has_fts5(connection):
+  with connection.cursor() as cursor:
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    return bool(cursor.fetchone()[0])
+
+
+_fulltext_indexes = []
+
+
+class FullTextIndex:
+  """A full-text index over `fields` of `table`, kept in sync by triggers.
+
+  On SQLite it is an FTS5 table (<table>_fts, created with `fts_options`) whose
+  rows are keyed by <table>_search_doc: the tables have uuid pks, and the
+  implicit rowid of such a table may change on VACUUM. PostgreSQL indexes are
+  owner-specific, so they are set up by the `pg_install` (returns True when it
+  (re)built anything), `pg_rebuild` and `pg_uninstall` callables. Other
+  backends, or a SQLite build without FTS5, get no index.
+
+  `migration` is the core migration that first installs the index; after it
+  has been applied, every migrate re-checks the triggers (ensure_fulltext_indexes).
+  """
+
+  def __init__(self, table, key, fields, fts_options, migration, pg_install, pg_rebuild, pg_uninstall):
+    self.table = table
+    self.fields = tuple(fields)
+    self.fts_table = f"{table}_fts"
+    self.migration = migration
+    self.pg_install = pg_install
+    self.pg_rebuild = pg_rebuild
+    self.pg_uninstall = pg_uninstall
+    self._present = {}
+
+    doc = f"{table}_search_doc"
+    columns = ", ".join(self.fields)
+    docid = f"(SELECT docid FROM {doc} WHERE {key} = {{row}}.id)"
+    self.sqlite_tables = [
+      f"CREATE TABLE IF NOT EXISTS {doc} (docid INTEGER PRIMARY KEY, {key} char(32) NOT NULL UNIQUE)",
+      f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts_table} USING fts5({columns}, {fts_options})",
+    ]
+    self.sqlite_triggers = {
+      f"{self.fts_table}_ai": (
+        f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {doc}({key}) VALUES (new.id); "
+        f"INSERT INTO {self.fts_table}(rowid, {columns}) "
+        f"VALUES ({docid.format(row='new')}, {', '.join(f'new.{f}' for f in self.fields)}); END"
+      ),
+      f"{self.fts_table}_ad": (
+        f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_ad AFTER DELETE ON {table} BEGIN "
+        f"DELETE FROM {self.fts_table} WHERE rowid = {docid.format(row='old')}; "
+        f"DELETE FROM {doc} WHERE {key} = old.id; END"
+      ),
+      f"{self.fts_table}_au": (
+        f"CREATE TRIGGER IF NOT EXISTS {self.fts_table}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"UPDATE {self.fts_table} SET {', '.join(f'{f} = new.{f}' for f in self.fields)} "
+        f"WHERE rowid = {docid.format(row='new')}; END"
+      ),
+    }
+    self.sqlite_rebuild = [
+      f"DELETE FROM {self.fts_table}",
+      f"DELETE FROM {doc}",
+      f"INSERT INTO {doc}({key}) SELECT id FROM {table}",
+      f"INSERT INTO {self.fts_table}(rowid, {columns}) "
+      f"SELECT d.docid, {', '.join(f't.{f}' for f in self.fields)} FROM {table} t JOIN {doc} d ON d.{key} = t.id",
+    ]
+    self.sqlite_uninstall = [f"DROP TRIGGER IF EXISTS {name}" for name in self.sqlite_triggers] + [
+      f"DROP TABLE IF EXISTS {self.fts_table}",
+      f"DROP TABLE IF EXISTS {doc}",
+    ]
+    _fulltext_indexes.append(self)
+
+  def install(self, connection):
+    """Create the index and its triggers if missing; rebuild it when anything was missing.
+
+    Returns True when the index was (re)built. Idempotent, so it also repairs
+    triggers lost when Django's SQLite schema editor rebuilds the table.
+    """
+    self._present.pop(connection.alias, None)
+    if connection.vendor == "postgresql":
+      return self.pg_install(connection)
+    if connection.vendor == "sqlite" and sqlite_has_fts5(connection):
+      with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [self.table])
+        present = {row[0] for row in cursor.fetchall()}
+      missing = [sql for name, sql in self.sqlite_triggers.items() if name not in present]
+      if missing:
+        execute(connection, self.sqlite_tables + missing + self.sqlite_rebuild)
+      return bool(missing)
+    return False
+
+  def rebuild(self, connection):
+    self._present.pop(connection.alias, None)
+    if connection.vendor == "postgresql":
+      self.pg_rebuild(connection)
+    elif connection.vendor == "sqlite" and sqlite_has_fts5(connection):
+      execute(connection, self.sqlite_tables + list(self.sqlite_triggers.values()) + self.sqlite_rebuild)
+
+  def uninstall(self, connection):
+    self._present.pop(connection.alias, None)
+    if connection.vendor == "postgresql":
+      self.pg_uninstall(connection)
+    elif connection.vendor == "sqlite":
+      execute(connection, self.sqlite_uninstall)
+
+  def has_fts_table(self, using):
+    """True when the SQLite FTS table exists on `using` (cached until install/rebuild/uninstall)."""
+    if using not in self._present:
+      self._present[using] = self.fts_table in connections[using].introspection.table_names()
+    return self._present[using]
+
+
+def ensure_fulltext_indexes(sender, using="default", **kwargs):
+  """post_migrate hook: put back triggers that a table rebuild dropped."""
+  connection = connections[using]
+  applied = MigrationRecorder(connection).applied_migrations()
+  for index in _fulltext_indexes:
+    if ("core", index.migration) in applied:
+      index.install(connection)
@@ -0,0 +1,139 @@
+"""Thumbnails and previews of evidence files.
+
+Each image (and, when poppler's `pdftoppm` is installed, each PDF's first page)
+gets two JPEG derivatives stored next to the original: `<name>.thumb.jpg`
+(THUMBNAIL_SIZE px on the long side) and `<name>.preview.jpg` (PREVIEW_SIZE px,
+progressive). Evidence files are content-addressed (core.blobs), so identical
+uploads share their derivatives as well. After an upload commits, core.signals
+hands the file to a pool of EVIDENCE_DERIVATIVE_WORKERS threads; the thumbnail
+and preview endpoints build whatever is missing on request, so a lost job, a
+restart or a file stored before this module only costs a slower first view.
+Generation only reads and writes storage, never the database.
+"""
+import functools
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = 256
+PREVIEW_SIZE = 1280
+KINDS = {"thumb": THUMBNAIL_SIZE, "preview": PREVIEW_SIZE}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+PDF_TIMEOUT_SECONDS = 30
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=None)
+def pdf_rasterizer_available():
+  return shutil.which("pdftoppm") is not None
+
+
+def supported(name):
+  """Whether derivatives can be made for the stored file `name`."""
+  ext = os.path.splitext(name or "")[1].lower()
+  return ext in IMAGE_EXTENSIONS or (ext == ".pdf" and pdf_rasterizer_available())
+
+
+def derivative_name(name, kind):
+  return f"{os.path.splitext(name)[0]}.{kind}.jpg"
+
+
+def _first_page(name):
+  """The first page of a stored PDF as a PIL image, rendered by pdftoppm."""
+  with tempfile.TemporaryDirectory(prefix="evidence-pdf-") as tmp:
+    try:
+      source = default_storage.path(name)
+    except NotImplementedError:
+      source = os.path.join(tmp, "source.pdf")
+      with default_storage.open(name, "rb") as src, open(source, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    out = os.path.join(tmp, "page")
+    subprocess.run(
+      ["pdftoppm", "-f", "1", "-l", "1", "-singlefile", "-scale-to", str(PREVIEW_SIZE), "-png", source, out],
+      check=True, timeout=PDF_TIMEOUT_SECONDS, capture_output=True,
+    )
+    with Image.open(out + ".png") as page:
+      page.load()
+      return page.copy()
+
+
+def _open_image(name):
+  if name.lower().endswith(".pdf"):
+    image = _first_page(name)
+  else:
+    with default_storage.open(name, "rb") as fh:
+      image = Image.open(fh)
+      image.draft("RGB", (PREVIEW_SIZE, PREVIEW_SIZE))  # JPEG: decode at reduced scale
+      image.load()
+    image = ImageOps.exif_transpose(image)  # phone photos carry their rotation in EXIF
+  if image.mode != "RGB":
+    # Screenshots may be transparent: flatten onto white rather than black.
+    rgba = image.convert("RGBA")
+    image = Image.new("RGB", rgba.size, "white")
+    image.paste(rgba, mask=rgba.getchannel("A"))
+  return image
+
+
+def ensure(name):
+  """Create whichever derivatives of the stored file `name` are missing; returns their names by kind.
+
+  Raises for files that cannot be decoded (or PDFs without pdftoppm).
+  """
+  names = {kind: derivative_name(name, kind) for kind in KINDS}
+  missing = [kind for kind, path in names.items() if not default_storage.exists(path)]
+  if not missing:
+    return names
+  image = _open_image(name)
+  for kind in missing:
+    copy = image.copy()
+    copy.thumbnail((KINDS[kind], KINDS[kind]))
+    buf = io.BytesIO()
+    copy.save(buf, "JPEG", quality=80, optimize=True, progressive=kind == "preview")
+    saved = default_storage.save(names[kind], ContentFile(buf.getvalue()))
+    if saved != names[kind]:
+      # Another worker wrote it first; its copy is identical.
+      default_storage.delete(saved)
+  return names
+
+
+def _ensure_logged(name):
+  try:
+    ensure(name)
+  except Exception:
+    logger.warning("Could not create derivatives of %s", name, exc_info=True)
+
+
+def schedule(name):
+  """Create the derivatives of `name` in the background pool (inline when EVIDENCE_DERIVATIVE_WORKERS is 0)."""
+  global _executor
+  if not supported(name):
+    return
+  if settings.EVIDENCE_DERIVATIVE_WORKERS <= 0:
+    _ensure_logged(name)
+    return
+  with _executor_lock:
+    if _executor is None:
+      _executor = ThreadPoolExecutor(
+        max_workers=settings.EVIDENCE_DERIVATIVE_WORKERS, thread_name_prefix="evidence-derivatives",
+      )
+  _executor.submit(_ensure_logged, name)
+
+
+def delete(name):
+  """Delete the derivatives of the stored file `name`."""
+  for kind in KINDS:
+    default_storage.delete(derivative_name(name, kind))
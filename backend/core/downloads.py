@@ -0,0 +1,120 @@
+"""Streaming file responses with byte ranges and HTTP validators for stored evidence."""
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _FileRange:
+  """Read-only view of `length` bytes of an open file, so FileResponse streams just the range."""
+
+  def __init__(self, fh, start, length):
+    fh.seek(start)
+    self.fh = fh
+    self.remaining = length
+
+  def read(self, size=-1):
+    if self.remaining <= 0:
+      return b""
+    if size < 0 or size > self.remaining:
+      size = self.remaining
+    data = self.fh.read(size)
+    self.remaining -= len(data)
+    return data
+
+  def close(self):
+    self.fh.close()
+
+
+def parse_range(header, size):
+  """Return (start, end) inclusive for a single "bytes=" range, None to ignore it, or "invalid"."""
+  if not header:
+    return None
+  match = RANGE_RE.match(header.strip())
+  if not match:
+    # Multiple ranges or other units: serving the whole entity is a valid answer.
+    return None
+  first, last = match.groups()
+  if not first and not last:
+    return "invalid"
+  if not first:
+    suffix = int(last)
+    if suffix == 0:
+      return "invalid"
+    return (max(size - suffix, 0), size - 1)
+  start = int(first)
+  end = min(int(last), size - 1) if last else size - 1
+  if start >= size or end < start:
+    return "invalid"
+  return (start, end)
+
+
+def file_validators(fieldfile, fallback_mtime=None):
+  """(etag, last_modified timestamp, size) for a stored file."""
+  size = fieldfile.size
+  try:
+    mtime = int(fieldfile.storage.get_modified_time(fieldfile.name).timestamp())
+  except (NotImplementedError, OSError):
+    mtime = int(fallback_mtime.timestamp()) if fallback_mtime else 0
+  digest = hashlib.sha1(f"{fieldfile.name}:{size}:{mtime}".encode("utf-8")).hexdigest()[:20]
+  return f'"{digest}"', mtime, size
+
+
+def _if_range_matches(request, etag, mtime):
+  if_range = request.META.get("HTTP_IF_RANGE")
+  if not if_range:
+    return True
+  if if_range.startswith('"') or if_range.startswith("W/"):
+    return if_range == etag
+  since = parse_http_date_safe(if_range)
+  return since is not None and mtime <= since
+
+
+def serve_file(request, fieldfile, filename=None, fallback_mtime=None, as_attachment=True):
+  """Stream `fieldfile` with Content-Length, ETag/Last-Modified and single byte-range support.
+
+  Returns (response, served) where served is (start, end) of the bytes sent, or None
+  when no body was sent (304/412/416).
+  """
+  etag, mtime, size = file_validators(fieldfile, fallback_mtime)
+  filename = filename or os.path.basename(fieldfile.name)
+  content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+  def with_validators(response):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(mtime)
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+  conditional = get_conditional_response(request, etag=etag, last_modified=mtime)
+  if conditional is not None:
+    return with_validators(conditional), None
+
+  byte_range = parse_range(request.META.get("HTTP_RANGE"), size) if size else None
+  if byte_range is not None and not _if_range_matches(request, etag, mtime):
+    byte_range = None
+  if byte_range == "invalid":
+    response = HttpResponse(status=416)
+    response["Content-Range"] = f"bytes */{size}"
+    return with_validators(response), None
+
+  fh = fieldfile.open("rb")
+  if byte_range is None:
+    start, end = 0, size - 1
+    response = FileResponse(fh, as_attachment=as_attachment, filename=filename, content_type=content_type)
+  else:
+    start, end = byte_range
+    response = FileResponse(
+      _FileRange(fh, start, end - start + 1), status=206,
+      as_attachment=as_attachment, filename=filename, content_type=content_type,
+    )
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+  response["Content-Length"] = str(end - start + 1)
+  return with_validators(response), (start, end)
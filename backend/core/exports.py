@@ -0,0 +1,231 @@
+"""Background compliance snapshot exports.
+
+The SnapshotExportJob table is the queue: the API inserts QUEUED rows and the
+`run_export_jobs` worker claims them with a conditional UPDATE, so several
+workers can poll the same database without a broker and never build the same
+job twice. Finished artifacts are kept for EXPORT_ARTIFACT_TTL_SECONDS and
+handed out again for identical requests while the snapshot data version (bumped
+by every committed indicator, compliance or evidence write) is unchanged.
+"""
+import csv
+import importlib.util
+import io
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ExportFormat, ExportStatus, SnapshotExportJob
+from .snapshots import (
+  SNAPSHOT_CSV_HEADER, current_version, filters_digest, normalise_filters, recent_compliance, recent_evidence,
+  snapshot_csv_row, snapshot_indicator, snapshot_indicators,
+)
+
+logger = logging.getLogger(__name__)
+
+# Progress is written back to the job row once per this many rows.
+PROGRESS_EVERY = 500
+
+
+def xlsx_available():
+  return importlib.util.find_spec("openpyxl") is not None
+
+
+def enqueue_export(filters, fmt, user=None):
+  """(job, reused): an existing job for the same export when one is usable, else a new QUEUED job."""
+  filters = normalise_filters(filters)
+  digest = filters_digest(filters)
+  today = timezone.localdate()
+  same = SnapshotExportJob.objects.filter(filters_digest=digest, format=fmt, snapshot_date=today)
+
+  version = current_version()
+  # A queued job has not read the data yet; a running or finished one is only
+  # good if nothing changed since it started reading.
+  reusable = same.filter(
+    Q(status=ExportStatus.QUEUED)
+    | Q(status=ExportStatus.RUNNING, data_version=version)
+    | Q(status=ExportStatus.DONE, data_version=version, expires_at__gt=timezone.now())
+  ).order_by("-created_at").first()
+  if reusable is not None:
+    return reusable, True
+
+  job = SnapshotExportJob.objects.create(
+    format=fmt, filters=filters, filters_digest=digest, snapshot_date=today, requested_by=user,
+  )
+  return job, False
+
+
+def claim_next_job(now=None):
+  """Take the oldest queued job, or one whose worker stopped heartbeating, for this worker."""
+  now = now or timezone.now()
+  stale = now - timedelta(seconds=settings.EXPORT_JOB_STALE_SECONDS)
+  candidates = (
+    SnapshotExportJob.objects
+    .filter(Q(status=ExportStatus.QUEUED) | Q(status=ExportStatus.RUNNING, claimed_at__lt=stale))
+    .order_by("created_at")
+    .values_list("pk", "status", "claimed_at")[:10]
+  )
+  for pk, status, claimed_at in candidates:
+    # Only one worker's UPDATE can still match the row as it was read.
+    claimed = SnapshotExportJob.objects.filter(pk=pk, status=status, claimed_at=claimed_at).update(
+      status=ExportStatus.RUNNING, claimed_at=now, attempts=F("attempts") + 1,
+    )
+    if claimed:
+      return SnapshotExportJob.objects.get(pk=pk)
+  return None
+
+
+class _ClaimLost(Exception):
+  """Another worker took the job over after this one went quiet for too long."""
+
+
+def _update_claimed(job, **fields):
+  """Write fields and a fresh heartbeat, but only while job.claimed_at is still this worker's claim."""
+  now = timezone.now()
+  if not SnapshotExportJob.objects.filter(pk=job.pk, claimed_at=job.claimed_at).update(claimed_at=now, **fields):
+    raise _ClaimLost(job.pk)
+  job.claimed_at = now
+
+
+class _Progress:
+  def __init__(self, job, total):
+    self.job = job
+    self.total = total
+    self.written = 0
+
+  def step(self):
+    self.written += 1
+    if self.written % PROGRESS_EVERY == 0:
+      self.save()
+
+  def save(self):
+    # Rows are 0-95%; storing the artifact is the rest. Also the worker's heartbeat.
+    progress = 95 * self.written // self.total if self.total else 95
+    _update_claimed(self.job, rows_written=self.written, progress=progress)
+
+
+def _write_csv(fh, job, rows, progress):
+  text = io.TextIOWrapper(fh, encoding="utf-8", newline="")
+  writer = csv.writer(text)
+  writer.writerow(SNAPSHOT_CSV_HEADER)
+  for row in rows:
+    writer.writerow(snapshot_csv_row(snapshot_indicator(row, job.snapshot_date)))
+    progress.step()
+  text.flush()
+  text.detach()
+
+
+def _write_json(fh, job, rows, progress):
+  # Same shape as /api/audit/snapshot/, streamed indicator by indicator.
+  encoder = DjangoJSONEncoder()
+  counts = {"COMPLIANT":0,"DUE_SOON":0,"OVERDUE":0,"NOT_STARTED":0}
+  fh.write(b'{"indicators": [')
+  for i, row in enumerate(rows):
+    counts[row["due_status"]] = counts.get(row["due_status"], 0) + 1
+    fh.write((", " if i else "").encode("utf-8") + encoder.encode(snapshot_indicator(row, job.snapshot_date)).encode("utf-8"))
+    progress.step()
+  tail = {
+    "summary": counts,
+    "latest_compliance": recent_compliance(),
+    "evidence": recent_evidence(),
+    "filters": job.filters,
+    "snapshot_date": job.snapshot_date,
+  }
+  fh.write(b"], " + encoder.encode(tail)[1:].encode("utf-8"))
+
+
+def _write_xlsx(fh, job, rows, progress):
+  from openpyxl import Workbook
+
+  workbook = Workbook(write_only=True)
+  sheet = workbook.create_sheet("Snapshot")
+  sheet.append(SNAPSHOT_CSV_HEADER)
+  for row in rows:
+    sheet.append(snapshot_csv_row(snapshot_indicator(row, job.snapshot_date)))
+    progress.step()
+  workbook.save(fh)
+
+
+WRITERS = {
+  ExportFormat.CSV: _write_csv,
+  ExportFormat.JSON: _write_json,
+  ExportFormat.XLSX: _write_xlsx,
+}
+
+
+def run_job(job):
+  """Build the artifact for a claimed job and mark it DONE, or FAILED with the error.
+
+  Every write is conditional on this worker's claim (job.claimed_at, moved on
+  by each heartbeat). If the job was taken over meanwhile, the artifact built
+  here is deleted and the row is left to the new owner.
+  """
+  try:
+    if job.attempts > settings.EXPORT_JOB_MAX_ATTEMPTS:
+      _fail(job, "Gave up after repeated worker interruptions")
+      return job
+    try:
+      # Taken before reading, so later writes make the artifact non-reusable.
+      job.data_version = current_version()
+      rows = snapshot_indicators(job.filters, job.snapshot_date)
+      progress = _Progress(job, rows.count())
+      job.rows_total = progress.total
+      _update_claimed(job, data_version=job.data_version, rows_total=job.rows_total)
+
+      with tempfile.TemporaryFile() as fh:
+        WRITERS[job.format](fh, job, rows.iterator(chunk_size=2000), progress)
+        # Storing can be slow; don't let it run past the stale window on an old heartbeat.
+        progress.save()
+        fh.seek(0)
+        job.artifact.save(f"snapshot-{job.snapshot_date}-{job.pk}.{job.format}", File(fh), save=False)
+    except _ClaimLost:
+      raise
+    except Exception as exc:
+      logger.exception("Snapshot export job %s failed", job.pk)
+      if job.artifact:
+        job.artifact.delete(save=False)
+      _fail(job, str(exc) or exc.__class__.__name__)
+      return job
+
+    now = timezone.now()
+    job.status = ExportStatus.DONE
+    job.progress = 100
+    job.rows_written = progress.written
+    job.finished_at = now
+    job.expires_at = now + timedelta(seconds=settings.EXPORT_ARTIFACT_TTL_SECONDS)
+    _update_claimed(
+      job, artifact=job.artifact.name, status=job.status, progress=job.progress, rows_written=job.rows_written,
+      finished_at=job.finished_at, expires_at=job.expires_at,
+    )
+    return job
+  except _ClaimLost:
+    logger.warning("Snapshot export job %s was taken over by another worker; discarding this run", job.pk)
+    if job.artifact:
+      job.artifact.delete(save=False)
+    job.refresh_from_db()
+    return job
+
+
+def _fail(job, message):
+  job.status = ExportStatus.FAILED
+  job.error = message
+  job.finished_at = timezone.now()
+  _update_claimed(job, status=job.status, error=job.error, finished_at=job.finished_at)
+
+
+def purge_expired(now=None):
+  """Delete artifacts past their expiry and mark their jobs EXPIRED. Returns the number purged."""
+  now = now or timezone.now()
+  purged = 0
+  for job in SnapshotExportJob.objects.filter(status=ExportStatus.DONE, expires_at__lte=now):
+    if job.artifact:
+      job.artifact.delete(save=False)
+    job.status = ExportStatus.EXPIRED
+    job.save(update_fields=["artifact", "status"])
+    purged += 1
+  return purged
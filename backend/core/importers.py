@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import csv
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import metrics
+from .models import Indicator, Project
+from .snapshots import bump_version
+from .trends import refresh_trend_on_commit
+
+# CSV header -> Indicator field. Section, Standard and Indicator are required.
+CSV_COLUMNS = {
+    "Section": "section",
+    "Standard": "standard",
+    "Indicator": "indicator_text",
+    "Evidence Required": "evidence_required_text",
+    "Responsible Person": "responsible_person",
+}
+KEY_FIELDS = ("section", "standard", "indicator_text")
+UPDATE_FIELDS = ("evidence_required_text", "responsible_person")
+
+
+@dataclass
+class ImportReport:
+    rows_total: int = 0
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _clean(value: Optional[str]) -> str:
+    return (value or "").strip()
+
+
+def parse_rows(rows: Iterable[Dict[str, str]], report: ImportReport) -> Dict[Tuple[str, str, str], Dict[str, Optional[str]]]:
+    """Validate CSV rows into {upsert key: updatable values}; bad and repeated rows are skipped."""
+    parsed: Dict[Tuple[str, str, str], Dict[str, Optional[str]]] = {}
+    first_seen: Dict[Tuple[str, str, str], int] = {}
+    for i, row in enumerate(rows, start=1):
+        report.rows_total += 1
+        values = {name: _clean(row.get(header)) for header, name in CSV_COLUMNS.items()}
+        key = tuple(values[name] for name in KEY_FIELDS)
+        if not all(key):
+            report.skipped += 1
+            report.errors.append(f"Row {i}: Missing required fields (Section, Standard, or Indicator)")
+            continue
+        if key in parsed:
+            report.skipped += 1
+            report.errors.append(f"Row {i}: Duplicate of row {first_seen[key]}")
+            continue
+        first_seen[key] = i
+        parsed[key] = {name: values[name] or None for name in UPDATE_FIELDS}
+    return parsed
+
+
+def import_indicators(rows: Iterable[Dict[str, str]], project: Optional[Project] = None, batch_size: int = 500) -> ImportReport:
+    """Upsert indicator CSV rows on (project, section, standard, indicator_text).
+
+    Everything is written in one transaction with batched bulk_create/bulk_update,
+    so a failure leaves the catalog untouched and re-importing a file is idempotent.
+    """
+    started = time.perf_counter()
+    report = ImportReport()
+    try:
+        _import(parse_rows(rows, report), project, batch_size, report)
+    finally:
+        metrics.observe("import_duration_seconds", time.perf_counter() - started)
+    for result in ("created", "updated", "unchanged", "skipped"):
+        metrics.inc("import_rows_total", {"result": result}, getattr(report, result))
+    return report
+
+
+def _import(parsed, project: Optional[Project], batch_size: int, report: ImportReport) -> None:
+    if not parsed:
+        return
+
+    with transaction.atomic():
+        existing_qs = Indicator.objects.filter(project=project, section__in={key[0] for key in parsed})
+        existing = {
+            (obj.section, obj.standard, obj.indicator_text): obj
+            for obj in existing_qs.only("id", *KEY_FIELDS, *UPDATE_FIELDS).iterator(chunk_size=2000)
+        }
+        now = timezone.now()
+        to_create: List[Indicator] = []
+        to_update: List[Indicator] = []
+        for key, values in parsed.items():
+            obj = existing.get(key)
+            if obj is None:
+                to_create.append(Indicator(project=project, **dict(zip(KEY_FIELDS, key)), **values))
+            elif any(getattr(obj, name) != value for name, value in values.items()):
+                for name, value in values.items():
+                    setattr(obj, name, value)
+                obj.updated_at = now
+                to_update.append(obj)
+            else:
+                report.unchanged += 1
+
+        Indicator.objects.bulk_create(to_create, batch_size=batch_size)
+        Indicator.objects.bulk_update(to_update, [*UPDATE_FIELDS, "updated_at"], batch_size=batch_size)
+        if to_create or to_update:
+            # bulk_create/bulk_update send no model signals.
+            bump_version()
+        # Updates only touch UPDATE_FIELDS, which the trend does not depend on.
+        refresh_trend_on_commit([obj.pk for obj in to_create])
+    report.created = len(to_create)
+    report.updated = len(to_update)
+
+
+def import_indicators_csv(fileobj, project: Optional[Project] = None, batch_size: int = 500) -> ImportReport:
+    """import_indicators over a text-mode CSV file with the PHC column headers."""
+    return import_indicators(csv.DictReader(fileobj), project=project, batch_size=batch_size)
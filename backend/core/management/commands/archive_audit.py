@@ -0,0 +1,63 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.audit_archive import archive_before, ensure_partitions, verify_segment
+from core.models import AuditArchiveSegment, AuditLog
+
+
+class Command(BaseCommand):
+  help = "Move old audit log rows into compressed archive segments and keep monthly partitions created ahead"
+
+  def add_arguments(self, parser):
+    parser.add_argument("--older-than-days", type=int, default=None, help="Archive rows older than this many days (default AUDIT_ARCHIVE_AFTER_DAYS)")
+    parser.add_argument("--before", help="Archive rows before this date (YYYY-MM-DD) instead")
+    parser.add_argument("--segment-rows", type=int, default=None, help="Rows per segment file (default AUDIT_ARCHIVE_SEGMENT_ROWS)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be archived without moving anything")
+    parser.add_argument("--verify", action="store_true", help="Check every segment file against its checksum and exit")
+
+  def handle(self, *args, **opts):
+    if opts["verify"]:
+      return self.verify()
+
+    if opts["before"]:
+      try:
+        day = datetime.strptime(opts["before"], "%Y-%m-%d").date()
+      except ValueError:
+        raise CommandError("--before must be a date in YYYY-MM-DD format")
+      cutoff = timezone.make_aware(datetime.combine(day, time.min))
+    else:
+      days = settings.AUDIT_ARCHIVE_AFTER_DAYS if opts["older_than_days"] is None else opts["older_than_days"]
+      cutoff = timezone.now() - timedelta(days=days)
+
+    for name in ensure_partitions(connection):
+      self.stdout.write(f"Created partition {name}")
+
+    if opts["dry_run"]:
+      count = AuditLog.objects.filter(timestamp__lt=cutoff).count()
+      self.stdout.write(f"Would archive {count} audit log rows older than {cutoff.isoformat()}")
+      return
+
+    segments = archive_before(cutoff, opts["segment_rows"])
+    for segment in segments:
+      self.stdout.write(f"Archived {segment.row_count} rows ({segment.start_at.isoformat()} .. {segment.end_at.isoformat()}) to {segment.file.name}")
+    rows = sum(segment.row_count for segment in segments)
+    self.stdout.write(self.style.SUCCESS(f"Archived {rows} audit log rows into {len(segments)} segments"))
+
+  def verify(self):
+    bad = 0
+    for segment in AuditArchiveSegment.objects.order_by("start_at"):
+      try:
+        ok = verify_segment(segment)
+      except OSError as exc:
+        ok = False
+        self.stderr.write(f"{segment.file.name}: {exc}")
+      if not ok:
+        bad += 1
+        self.stderr.write(self.style.ERROR(f"Checksum mismatch: {segment.file.name}"))
+    if bad:
+      raise CommandError(f"{bad} archive segments failed verification")
+    self.stdout.write(self.style.SUCCESS("All archive segments verified"))
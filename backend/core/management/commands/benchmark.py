@@ -0,0 +1,76 @@
+import json
+import logging
+import shutil
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core import benchmarks
+
+
+class Command(BaseCommand):
+  help = "Time the due-status, serializer, snapshot, audit and import hot paths on seeded datasets"
+
+  def add_arguments(self, parser):
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated indicator counts to seed (default 1000,10000,100000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case after one warm-up run (default 5)")
+    parser.add_argument("--case", action="append", default=[], help="Only run cases whose name starts with this (repeatable)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated datasets")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare against the results JSON of an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown against the baseline as a fraction (default 0.2)")
+
+  def handle(self, *args, **opts):
+    try:
+      sizes = [int(size) for size in opts["sizes"].split(",") if size.strip()]
+    except ValueError:
+      raise CommandError("--sizes must be comma-separated integers")
+    if not sizes or min(sizes) < 1:
+      raise CommandError("--sizes must be positive")
+    baseline = None
+    if opts["baseline"]:
+      try:
+        with open(opts["baseline"]) as fh:
+          baseline = json.load(fh)["results"]
+      except (OSError, ValueError, KeyError) as exc:
+        raise CommandError(f"Cannot read baseline {opts['baseline']}: {exc}")
+
+    results = {}
+    logging.getLogger("core.timing").setLevel(logging.ERROR)
+    setup_test_environment()
+    try:
+      for size in sizes:
+        results[str(size)] = self.run_size(size, opts)
+    finally:
+      teardown_test_environment()
+
+    payload = {"meta": {**benchmarks.environment(), "repeat": opts["repeat"], "seed": opts["seed"]}, "results": results}
+    if opts["output"]:
+      with open(opts["output"], "w") as fh:
+        json.dump(payload, fh, indent=2, sort_keys=True)
+      self.stdout.write(f"Wrote {opts['output']}")
+
+    if baseline is not None:
+      regressions = benchmarks.compare(results, baseline, opts["threshold"])
+      if regressions:
+        for line in regressions:
+          self.stderr.write(f"REGRESSION {line}")
+        raise CommandError(f"{len(regressions)} regressions against {opts['baseline']} (threshold {opts['threshold']:.0%})")
+      self.stdout.write(self.style.SUCCESS(f"No regressions against {opts['baseline']} (threshold {opts['threshold']:.0%})"))
+
+  def run_size(self, size, opts):
+    # A throwaway test database per size; the configured database is never written to.
+    media = benchmarks.media_root()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+      with override_settings(MEDIA_ROOT=media, METRICS_ENABLED=False):
+        self.stdout.write(f"Seeding {size} indicators...")
+        user = benchmarks.seed(size, seed=opts["seed"])
+        results = benchmarks.run_cases(size, user, repeat=opts["repeat"], only=opts["case"])
+    finally:
+      connection.creation.destroy_test_db(old_name, verbosity=0)
+      shutil.rmtree(media, ignore_errors=True)
+    for name, stats in results.items():
+      self.stdout.write(f"  {size:>7} {name:<28} {stats['median_ms']:>10.1f}ms  (min {stats['min_ms']:.1f}ms)  {stats['queries']:>5} queries")
+    return results
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.blobs import dedupe_existing
+
+
+class Command(BaseCommand):
+  help = "Move evidence files stored before content addressing into shared blobs, deleting duplicate copies"
+
+  def add_arguments(self, parser):
+    parser.add_argument("--batch-size", type=int, default=500, help="File names read per query (default 500)")
+    parser.add_argument("--dry-run", action="store_true", help="Hash the files and report the savings without changing anything")
+
+  def handle(self, *args, **opts):
+    if opts["batch_size"] < 1:
+      raise CommandError("--batch-size must be positive")
+    log = self.stdout.write if opts["verbosity"] > 1 else None
+    summary = dedupe_existing(batch_size=opts["batch_size"], dry_run=opts["dry_run"], log=log)
+    for name in summary["missing"]:
+      self.stderr.write(self.style.WARNING(f"Missing file, rows left unchanged: {name}"))
+    verb = "Would move" if opts["dry_run"] else "Moved"
+    self.stdout.write(self.style.SUCCESS(
+      f"{verb} {summary['files']} files ({summary['rows']} evidence rows) into {summary['blobs_created']} new blobs, "
+      f"saving {summary['bytes_saved']} bytes; {len(summary['missing'])} files missing"
+    ))
+    if not opts["dry_run"]:
+      self.stdout.write(
+        f"Corrected {summary['recounted']} reference counts, deleted {summary['orphans_deleted']} unreferenced blobs "
+        f"and {summary['stray_files_deleted']} stray files"
+      )
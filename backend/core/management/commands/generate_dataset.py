@@ -0,0 +1,53 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.datasets import generate
+
+
+class Command(BaseCommand):
+  help = "Bulk-create a synthetic dataset (projects, users, indicators, compliance history, evidence, audit logs) for staging and benchmarks"
+
+  def add_arguments(self, parser):
+    parser.add_argument("--indicators", type=int, default=10000, help="Indicators to create (default 10000)")
+    parser.add_argument("--projects", type=int, default=None, help="Projects to spread them over (default one per 250 indicators)")
+    parser.add_argument("--users", type=int, default=None, help="Users to create (default one per 100 indicators)")
+    parser.add_argument("--years", type=int, default=3, help="Years of compliance history (default 3)")
+    parser.add_argument("--evidence-rate", type=float, default=0.35, help="Chance of each further evidence item per compliance record (default 0.35)")
+    parser.add_argument("--revoke-rate", type=float, default=0.03, help="Share of compliance records that get revoked (default 0.03)")
+    parser.add_argument("--file-pool", type=int, default=20, help="Placeholder files per file type that evidence rows share (default 20)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; the same seed and --today give the same rows")
+    parser.add_argument("--today", help="Date the history runs up to (YYYY-MM-DD, default today)")
+    parser.add_argument("--batch-size", type=int, default=2000, help="Indicators per transaction and rows per INSERT (default 2000)")
+    parser.add_argument("--password", help="Password for the generated users (default: unusable)")
+
+  def handle(self, *args, **opts):
+    today = None
+    if opts["today"]:
+      try:
+        today = datetime.strptime(opts["today"], "%Y-%m-%d").date()
+      except ValueError:
+        raise CommandError("--today must be a date in YYYY-MM-DD format")
+    if opts["indicators"] < 1 or opts["batch_size"] < 1 or opts["years"] < 1:
+      raise CommandError("--indicators, --batch-size and --years must be positive")
+
+    started = time.monotonic()
+
+    def progress(report):
+      self.stdout.write(
+        f"{report.indicators}/{opts['indicators']} indicators, {report.compliance_records} compliance records, "
+        f"{report.evidence_items} evidence items, {report.audit_logs} audit logs ({time.monotonic() - started:.0f}s)"
+      )
+
+    try:
+      report = generate(
+        opts["indicators"], projects=opts["projects"], users=opts["users"], years=opts["years"],
+        evidence_rate=opts["evidence_rate"], revoke_rate=opts["revoke_rate"], file_pool=opts["file_pool"],
+        seed=opts["seed"], today=today, batch_size=opts["batch_size"], password=opts["password"], progress=progress,
+      )
+    except ValueError as exc:
+      raise CommandError(str(exc))
+    rows = sum(value for name, value in report.as_dict().items() if name not in ("revoked", "placeholder_files"))
+    summary = ", ".join(f"{name}={value}" for name, value in report.as_dict().items())
+    self.stdout.write(self.style.SUCCESS(f"Created {rows} rows in {time.monotonic() - started:.1f}s: {summary}"))
@@ -1,25 +1,26 @@
-import csv
-from django.core.management.base import BaseCommand
-from core.models import Indicator
+from django.core.management.base import BaseCommand, CommandError
+from core.importers import import_indicators_csv
+from core.models import Project
 
 class Command(BaseCommand):
   help = "Import indicators from the PHC CSV"
 
   def add_arguments(self, parser):
     parser.add_argument("--path", required=True)
+    parser.add_argument("--project", help="Project id the indicators belong to")
+    parser.add_argument("--batch-size", type=int, default=500)
 
   def handle(self, *args, **opts):
-    path = opts["path"]
-    created = 0
-    with open(path, "r", encoding="utf-8") as f:
-      reader = csv.DictReader(f)
-      for row in reader:
-        Indicator.objects.create(
-          section=(row.get("Section") or "").strip(),
-          standard=(row.get("Standard") or "").strip(),
-          indicator_text=(row.get("Indicator") or "").strip(),
-          evidence_required_text=(row.get("Evidence Required") or "").strip() or None,
-          responsible_person=(row.get("Responsible Person") or "").strip() or None,
-        )
-        created += 1
-    self.stdout.write(self.style.SUCCESS(f"Imported {created} indicators"))
+    project = None
+    if opts.get("project"):
+      project = Project.objects.filter(pk=opts["project"]).first()
+      if project is None:
+        raise CommandError(f"Project {opts['project']} does not exist")
+    with open(opts["path"], "r", encoding="utf-8-sig") as f:
+      report = import_indicators_csv(f, project=project, batch_size=opts["batch_size"])
+    for error in report.errors:
+      self.stderr.write(error)
+    self.stdout.write(self.style.SUCCESS(
+      f"Imported {report.rows_total} rows: {report.created} created, {report.updated} updated, "
+      f"{report.unchanged} unchanged, {report.skipped} skipped"
+    ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.audit_archive import partition_audit_table, unpartition_audit_table
+
+
+class Command(BaseCommand):
+  help = "Convert core_auditlog into monthly range partitions on PostgreSQL (copies the table under an exclusive lock)"
+
+  def add_arguments(self, parser):
+    parser.add_argument("--undo", action="store_true", help="Convert a partitioned core_auditlog back into a plain table")
+
+  def handle(self, *args, **opts):
+    if connection.vendor != "postgresql":
+      self.stdout.write("core_auditlog is only partitioned on PostgreSQL; nothing to do")
+      return
+    convert = unpartition_audit_table if opts["undo"] else partition_audit_table
+    with transaction.atomic():
+      converted = convert(connection)
+    state = "a plain table" if opts["undo"] else "partitioned by month"
+    if converted:
+      self.stdout.write(self.style.SUCCESS(f"Converted core_auditlog: it is now {state}"))
+    else:
+      self.stdout.write(f"core_auditlog is already {state}")
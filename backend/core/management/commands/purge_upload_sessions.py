@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.uploads import purge_expired_sessions
+
+
+class Command(BaseCommand):
+  help = "Delete chunked upload sessions idle past EVIDENCE_UPLOAD_SESSION_TTL_SECONDS, with their chunks"
+
+  def handle(self, *args, **opts):
+    purged = purge_expired_sessions()
+    self.stdout.write(self.style.SUCCESS(f"Purged {purged} expired upload sessions"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.services import refresh_compliance_state
+
+class Command(BaseCommand):
+  help = "Backfill or rebuild the stored latest-compliance columns on indicators"
+
+  def add_arguments(self, parser):
+    parser.add_argument("--indicator", action="append", dest="indicators", help="Limit to this indicator id (repeatable)")
+
+  def handle(self, *args, **opts):
+    with transaction.atomic():
+      updated = refresh_compliance_state(opts.get("indicators"))
+    self.stdout.write(self.style.SUCCESS(f"Rebuilt compliance state for {updated} indicators"))
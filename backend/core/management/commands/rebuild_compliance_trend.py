@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from core.models import ComplianceStatusSpan
+from core.trends import rebuild_trend
+
+class Command(BaseCommand):
+  help = "Rebuild the materialised compliance trend (status spans and daily counts) from the compliance records"
+
+  def handle(self, *args, **opts):
+    state = rebuild_trend()
+    spans = ComplianceStatusSpan.objects.count()
+    self.stdout.write(self.style.SUCCESS(
+      f"Rebuilt compliance trend from {state.first_day} through {state.through_day} ({spans} status spans)"
+    ))
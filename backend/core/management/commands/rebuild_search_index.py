@@ -0,0 +1,19 @@
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from core.audit_search import rebuild_audit_search_index
+from core.search import rebuild_search_index, search_backend
+
+class Command(BaseCommand):
+  help = "Rebuild the indicator full-text and audit log trigram search indexes and their triggers"
+
+  def handle(self, *args, **opts):
+    with transaction.atomic():
+      rebuild_search_index(connection)
+    backend = search_backend() or "none (icontains fallback)"
+    self.stdout.write(self.style.SUCCESS(f"Rebuilt indicator search index ({backend})"))
+    # PostgreSQL builds the trigram indexes CONCURRENTLY, which cannot run in a transaction.
+    with nullcontext() if connection.vendor == "postgresql" else transaction.atomic():
+      rebuild_audit_search_index(connection)
+    self.stdout.write(self.style.SUCCESS("Rebuilt audit log search index"))
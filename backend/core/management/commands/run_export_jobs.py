@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.exports import claim_next_job, purge_expired, run_job
+from core.uploads import purge_expired_sessions
+
+
+class Command(BaseCommand):
+  help = "Process queued snapshot export jobs (the database table is the queue) and purge expired upload sessions"
+
+  def add_arguments(self, parser):
+    parser.add_argument("--once", action="store_true", help="Exit once the queue is empty instead of polling")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds to wait when the queue is empty")
+
+  def handle(self, *args, **opts):
+    processed = 0
+    try:
+      while True:
+        close_old_connections()
+        purged = purge_expired()
+        if purged:
+          self.stdout.write(f"Purged {purged} expired export artifacts")
+        purged = purge_expired_sessions()
+        if purged:
+          self.stdout.write(f"Purged {purged} expired upload sessions")
+        job = claim_next_job()
+        if job is None:
+          if opts["once"]:
+            break
+          time.sleep(opts["poll_interval"])
+          continue
+        job = run_job(job)
+        processed += 1
+        style = self.style.SUCCESS if job.status == "DONE" else self.style.ERROR
+        self.stdout.write(style(f"Export job {job.pk}: {job.status} ({job.rows_written} rows)"))
+    except KeyboardInterrupt:
+      pass
+    self.stdout.write(self.style.SUCCESS(f"Processed {processed} export jobs"))
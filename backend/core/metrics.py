@@ -0,0 +1,318 @@
+"""Prometheus metrics for /api/metrics/, shared across gunicorn workers through files.
+
+Each process counts in memory and writes its totals to
+METRICS_DIR/<pid>-<start>.json, at most every METRICS_FLUSH_SECONDS after a
+request, on exit, and right before it answers a scrape. <start> is the process
+start time, so a restarted worker that reuses a pid gets a file of its own. The
+scrape sums every file, so any worker can serve it and no external service is
+needed. It also folds the files of workers that have exited into one
+exited.json, under a lock file, so counters and histograms keep their totals
+when gunicorn recycles a worker while the directory holds one file per live
+worker. Gauges (open DB connections, pool stats) only include live processes.
+
+Request metrics are fed by core.timing.RequestTimingMiddleware and are labelled
+with the same view names (indicator.list, audit.snapshot).
+"""
+import atexit
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connections
+
+PREFIX = "accredcheck_"
+EXITED = "exited.json"
+LOCK = ".collect.lock"
+
+COUNTERS = {
+  "http_requests_total": "Requests by view, method and status class (2xx, 4xx, 5xx)",
+  "audit_rows_written_total": "Audit log rows written, by buffered or sync write",
+  "audit_rows_dropped_total": "Audit log rows dropped after a failed write",
+  "evidence_uploaded_bytes_total": "Bytes of evidence files uploaded",
+  "evidence_deduplicated_bytes_total": "Bytes of evidence uploads not stored again because the content already was",
+  "evidence_downloaded_bytes_total": "Bytes of evidence files served by download",
+  "import_rows_total": "Indicator CSV import rows by result",
+  "snapshot_cache_requests_total": "Compliance snapshot payloads served from the cache (hit) or built (miss)",
+}
+HISTOGRAMS = {
+  "http_request_duration_seconds": (
+    "Request latency by view", (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+  ),
+  "http_request_queries": ("SQL queries per request by view", (1, 2, 5, 10, 20, 50, 100, 200, 500)),
+  "audit_write_seconds": ("Audit log bulk write time", (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1)),
+  "import_duration_seconds": ("Indicator CSV import time", (0.1, 0.5, 1, 5, 10, 30, 60, 300)),
+}
+GAUGES = {
+  "db_connections_open": "Open database connections held by live workers",
+  "db_pool_size": "Connections in the database pool of live workers",
+  "db_pool_available": "Idle connections in the database pool of live workers",
+  "db_pool_waiting": "Requests waiting for a pooled connection",
+}
+
+
+class MetricStore:
+  """This process's counters and histograms, flushed to its file in METRICS_DIR."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._pid = None
+    self._started = None
+    self._reset()
+
+  def _reset(self):
+    self.counters = {}
+    self.histograms = {}
+    self._flushed_at = 0.0
+    self._dirty = False
+
+  def _check_process(self):
+    # Forked after import (gunicorn --preload): start empty rather than repeat the parent's totals.
+    pid = os.getpid()
+    if pid != self._pid:
+      self._pid = pid
+      # Wall time stands in where /proc is missing; it is still unique per process.
+      self._started = _process_start(pid) or time.time_ns()
+      self._reset()
+      atexit.register(self.flush)
+
+  def inc(self, name, labels=None, value=1):
+    if not settings.METRICS_ENABLED:
+      return
+    key = (name, _label_key(labels))
+    with self._lock:
+      self._check_process()
+      self.counters[key] = self.counters.get(key, 0) + value
+      self._dirty = True
+
+  def observe(self, name, value, labels=None):
+    if not settings.METRICS_ENABLED:
+      return
+    key = (name, _label_key(labels))
+    bounds = HISTOGRAMS[name][1]
+    with self._lock:
+      self._check_process()
+      entry = self.histograms.get(key)
+      if entry is None:
+        entry = self.histograms[key] = [[0] * (len(bounds) + 1), 0.0, 0]
+      entry[0][bisect_left(bounds, value)] += 1
+      entry[1] += value
+      entry[2] += 1
+      self._dirty = True
+
+  def maybe_flush(self):
+    if self._dirty and time.monotonic() - self._flushed_at >= settings.METRICS_FLUSH_SECONDS:
+      self.flush()
+
+  def flush(self):
+    """Write this process's totals to its file (atomically, via rename)."""
+    if not settings.METRICS_ENABLED:
+      return
+    with self._lock:
+      self._check_process()
+      data = {
+        "pid": self._pid,
+        "started": self._started,
+        "counters": [[name, dict(labels), value] for (name, labels), value in self.counters.items()],
+        "histograms": [[name, dict(labels), *entry] for (name, labels), entry in self.histograms.items()],
+        "gauges": _gauges(),
+      }
+      self._dirty = False
+      self._flushed_at = time.monotonic()
+    directory = metrics_dir()
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "w") as fh:
+      json.dump(data, fh)
+    os.replace(tmp, os.path.join(directory, f"{self._pid}-{self._started}.json"))
+
+
+store = MetricStore()
+inc = store.inc
+observe = store.observe
+
+
+def metrics_dir():
+  return settings.METRICS_DIR or os.path.join(tempfile.gettempdir(), "accredcheck-metrics")
+
+
+def _label_key(labels):
+  return tuple(sorted((labels or {}).items()))
+
+
+def _status_class(status_code):
+  return f"{status_code // 100}xx"
+
+
+def observe_request(view, method, status_code, seconds, queries):
+  labels = {"view": view}
+  inc("http_requests_total", {"view": view, "method": method, "status": _status_class(status_code)})
+  observe("http_request_duration_seconds", seconds, labels)
+  observe("http_request_queries", queries, labels)
+  store.maybe_flush()
+
+
+def _gauges():
+  gauges = []
+  for alias in connections:
+    conn = connections[alias]
+    labels = {"database": alias}
+    gauges.append(["db_connections_open", labels, int(conn.connection is not None)])
+    # Only PostgreSQL with OPTIONS["pool"] (psycopg_pool) has one.
+    pool = getattr(conn, "pool", None) if conn.vendor == "postgresql" else None
+    if pool is not None:
+      stats = pool.get_stats()
+      gauges.append(["db_pool_size", labels, stats.get("pool_size", 0)])
+      gauges.append(["db_pool_available", labels, stats.get("pool_available", 0)])
+      gauges.append(["db_pool_waiting", labels, stats.get("requests_waiting", 0)])
+  return gauges
+
+
+def _process_start(pid):
+  """Start time of process `pid` in clock ticks since boot, or None without /proc (non-Linux)."""
+  try:
+    with open(f"/proc/{pid}/stat") as fh:
+      # Field 22; the command name before it may contain spaces and parentheses.
+      return int(fh.read().rsplit(")", 1)[1].split()[19])
+  except (OSError, IndexError, ValueError):
+    return None
+
+
+def _alive(pid, started):
+  try:
+    os.kill(pid, 0)
+  except ProcessLookupError:
+    return False
+  except PermissionError:
+    pass
+  # A live pid started at another time is a new process that reused the pid.
+  current = _process_start(pid)
+  return current is None or started is None or current == started
+
+
+def _read_files(directory):
+  files = {}
+  for name in os.listdir(directory):
+    if not name.endswith(".json"):
+      continue
+    try:
+      with open(os.path.join(directory, name)) as fh:
+        files[name] = json.load(fh)
+    except (OSError, ValueError):
+      continue
+  return files
+
+
+def _add(counters, histograms, data):
+  for metric, labels, value in data["counters"]:
+    key = (metric, _label_key(labels))
+    counters[key] = counters.get(key, 0) + value
+  for metric, labels, buckets, total, count in data["histograms"]:
+    key = (metric, _label_key(labels))
+    entry = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+    entry[0] = [a + b for a, b in zip(entry[0], buckets)]
+    entry[1] += total
+    entry[2] += count
+
+
+def _fold_exited(directory, files):
+  """Merge the files of exited workers into EXITED and delete them; returns the files left.
+
+  EXITED lists the files it has absorbed until they are gone, so a fold
+  interrupted before its deletes does not count them twice.
+  """
+  exited = {name: data for name, data in files.items() if "pid" in data and not _alive(data["pid"], data.get("started"))}
+  if not exited:
+    return files
+  aggregate = files.get(EXITED, {"counters": [], "histograms": [], "folded": []})
+  counters, histograms = {}, {}
+  _add(counters, histograms, aggregate)
+  for name, data in exited.items():
+    if name not in aggregate["folded"]:
+      _add(counters, histograms, data)
+  aggregate = {
+    "counters": [[name, dict(labels), value] for (name, labels), value in counters.items()],
+    "histograms": [[name, dict(labels), *entry] for (name, labels), entry in histograms.items()],
+    "gauges": [],
+    "folded": sorted(set(exited) | {name for name in aggregate["folded"] if name in files}),
+  }
+  fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+  with os.fdopen(fd, "w") as fh:
+    json.dump(aggregate, fh)
+  os.replace(tmp, os.path.join(directory, EXITED))
+  for name in exited:
+    try:
+      os.remove(os.path.join(directory, name))
+    except FileNotFoundError:
+      pass
+  files = {name: data for name, data in files.items() if name not in exited}
+  files[EXITED] = aggregate
+  return files
+
+
+def collect():
+  """Sum every worker's file: ({(name, labels): value}, {(name, labels): [buckets, sum, count]}, gauges).
+
+  Files of exited workers are folded into EXITED on the way.
+  """
+  counters, histograms, gauges = {}, {}, {}
+  directory = metrics_dir()
+  os.makedirs(directory, exist_ok=True)
+  # Concurrent scrapes take turns, so no exited file is folded twice or read
+  # alongside the aggregate that already holds it.
+  with open(os.path.join(directory, LOCK), "a") as lock:
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    files = _fold_exited(directory, _read_files(directory))
+  for data in files.values():
+    _add(counters, histograms, data)
+    if "pid" in data and _alive(data["pid"], data.get("started")):
+      for metric, labels, value in data["gauges"]:
+        key = (metric, _label_key(labels))
+        gauges[key] = gauges.get(key, 0) + value
+  return counters, histograms, gauges
+
+
+def _escape(value):
+  return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, extra=()):
+  pairs = [*labels, *extra]
+  if not pairs:
+    return ""
+  return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _number(value):
+  return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+  """All workers' metrics in the Prometheus text exposition format (0.0.4)."""
+  store.flush()
+  counters, histograms, gauges = collect()
+  lines = []
+
+  def samples(values, name):
+    return sorted((labels, value) for (metric, labels), value in values.items() if metric == name)
+
+  for name, help_text in COUNTERS.items():
+    lines += [f"# HELP {PREFIX}{name} {help_text}", f"# TYPE {PREFIX}{name} counter"]
+    lines += [f"{PREFIX}{name}{_labels(labels)} {_number(value)}" for labels, value in samples(counters, name)]
+  for name, (help_text, bounds) in HISTOGRAMS.items():
+    lines += [f"# HELP {PREFIX}{name} {help_text}", f"# TYPE {PREFIX}{name} histogram"]
+    for labels, (buckets, total, count) in samples(histograms, name):
+      cumulative = 0
+      for bound, bucket in zip([*bounds, "+Inf"], buckets):
+        cumulative += bucket
+        lines.append(f"{PREFIX}{name}_bucket{_labels(labels, [('le', bound)])} {cumulative}")
+      lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {_number(total)}")
+      lines.append(f"{PREFIX}{name}_count{_labels(labels)} {count}")
+  for name, help_text in GAUGES.items():
+    lines += [f"# HELP {PREFIX}{name} {help_text}", f"# TYPE {PREFIX}{name} gauge"]
+    lines += [f"{PREFIX}{name}{_labels(labels)} {_number(value)}" for labels, value in samples(gauges, name)]
+  return "\n".join(lines) + "\n"
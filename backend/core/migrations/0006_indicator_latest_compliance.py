@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:17
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_latest_compliance(apps, schema_editor):
+    Indicator = apps.get_model("core", "Indicator")
+    ComplianceRecord = apps.get_model("core", "ComplianceRecord")
+    latest = ComplianceRecord.objects.filter(
+        indicator=OuterRef("pk"), is_revoked=False
+    ).order_by("-compliant_on", "-created_at")
+    Indicator.objects.update(
+        latest_compliant_on=Subquery(latest.values("compliant_on")[:1]),
+        latest_valid_until=Subquery(latest.values("valid_until")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_project_indicator_project'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indicator',
+            name='latest_compliant_on',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='indicator',
+            name='latest_valid_until',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_latest_compliance, migrations.RunPython.noop),
+    ]
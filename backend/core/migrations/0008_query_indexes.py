@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:27
+
+from django.conf import settings
+import core.db
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY (PostgreSQL) cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('core', '0007_auditlog_timestamp_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        core.db.AddIndexOnline(
+            model_name='auditlog',
+            index=models.Index(fields=['-timestamp', '-id'], name='auditlog_order_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='auditlog',
+            index=models.Index(fields=['actor', '-timestamp', '-id'], name='auditlog_actor_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='auditlog',
+            index=models.Index(fields=['action', '-timestamp', '-id'], name='auditlog_action_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='auditlog',
+            index=models.Index(fields=['entity_type', '-timestamp', '-id'], name='auditlog_entity_type_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='compliancerecord',
+            index=models.Index(condition=models.Q(('is_revoked', False)), fields=['indicator', '-compliant_on', '-created_at'], name='compliance_latest_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='compliancerecord',
+            index=models.Index(fields=['indicator', '-compliant_on', '-created_at', 'id'], name='compliance_ind_order_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='compliancerecord',
+            index=models.Index(fields=['-compliant_on', '-created_at', 'id'], name='compliance_order_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='compliancerecord',
+            index=models.Index(fields=['-created_at'], name='compliance_created_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='evidenceitem',
+            index=models.Index(fields=['indicator', '-created_at', 'id'], name='evidence_ind_order_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='evidenceitem',
+            index=models.Index(fields=['-created_at', 'id'], name='evidence_order_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='indicator',
+            index=models.Index(fields=['section', 'standard', 'id'], name='indicator_order_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='indicator',
+            index=models.Index(fields=['is_active', 'section', 'standard', 'id'], name='indicator_active_order_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='indicator',
+            index=models.Index(fields=['project', 'section', 'standard', 'id'], name='indicator_project_order_idx'),
+        ),
+        core.db.AddIndexOnline(
+            model_name='indicator',
+            index=models.Index(fields=['is_active', 'latest_valid_until'], name='indicator_active_due_idx'),
+        ),
+    ]
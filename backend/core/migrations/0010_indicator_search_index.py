@@ -0,0 +1,125 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:45
+
+import core.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The index as this migration first installed it. Frozen here rather than
+# imported from core.search, so later changes there cannot alter history;
+# core.db.ensure_fulltext_indexes re-checks the live definition after migrate.
+SQLITE_INSTALL = [
+    "CREATE TABLE IF NOT EXISTS core_indicator_search_doc (docid INTEGER PRIMARY KEY, indicator_id char(32) NOT NULL UNIQUE)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_indicator_fts USING fts5(section, standard, indicator_text, "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS core_indicator_fts_ai AFTER INSERT ON core_indicator BEGIN "
+    "INSERT INTO core_indicator_search_doc(indicator_id) VALUES (new.id); "
+    "INSERT INTO core_indicator_fts(rowid, section, standard, indicator_text) "
+    "VALUES ((SELECT docid FROM core_indicator_search_doc WHERE indicator_id = new.id), new.section, new.standard, new.indicator_text); END",
+    "CREATE TRIGGER IF NOT EXISTS core_indicator_fts_ad AFTER DELETE ON core_indicator BEGIN "
+    "DELETE FROM core_indicator_fts WHERE rowid = (SELECT docid FROM core_indicator_search_doc WHERE indicator_id = old.id); "
+    "DELETE FROM core_indicator_search_doc WHERE indicator_id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS core_indicator_fts_au AFTER UPDATE OF section, standard, indicator_text ON core_indicator BEGIN "
+    "UPDATE core_indicator_fts SET section = new.section, standard = new.standard, indicator_text = new.indicator_text "
+    "WHERE rowid = (SELECT docid FROM core_indicator_search_doc WHERE indicator_id = new.id); END",
+    "DELETE FROM core_indicator_fts",
+    "DELETE FROM core_indicator_search_doc",
+    "INSERT INTO core_indicator_search_doc(indicator_id) SELECT id FROM core_indicator",
+    "INSERT INTO core_indicator_fts(rowid, section, standard, indicator_text) "
+    "SELECT d.docid, t.section, t.standard, t.indicator_text FROM core_indicator t "
+    "JOIN core_indicator_search_doc d ON d.indicator_id = t.id",
+]
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS core_indicator_fts_ai",
+    "DROP TRIGGER IF EXISTS core_indicator_fts_ad",
+    "DROP TRIGGER IF EXISTS core_indicator_fts_au",
+    "DROP TABLE IF EXISTS core_indicator_fts",
+    "DROP TABLE IF EXISTS core_indicator_search_doc",
+]
+
+PG_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce({row}.standard, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce({row}.section, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce({row}.indicator_text, '')), 'C')"
+)
+PG_INSTALL = [
+    "ALTER TABLE core_indicator ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE OR REPLACE FUNCTION core_indicator_search_vector() RETURNS trigger LANGUAGE plpgsql AS $$ "
+    f"BEGIN NEW.search_vector := {PG_VECTOR.format(row='NEW')}; RETURN NEW; END $$",
+    "DROP TRIGGER IF EXISTS core_indicator_search_vector_trg ON core_indicator",
+    "CREATE TRIGGER core_indicator_search_vector_trg "
+    "BEFORE INSERT OR UPDATE OF section, standard, indicator_text ON core_indicator "
+    "FOR EACH ROW EXECUTE FUNCTION core_indicator_search_vector()",
+    f"UPDATE core_indicator SET search_vector = {PG_VECTOR.format(row='core_indicator')}",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS core_indicator_search_idx ON core_indicator USING GIN (search_vector)",
+]
+PG_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS core_indicator_search_vector_trg ON core_indicator",
+    "DROP FUNCTION IF EXISTS core_indicator_search_vector()",
+    "DROP INDEX IF EXISTS core_indicator_search_idx",
+    "ALTER TABLE core_indicator DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run(connection, statements):
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def install(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        run(connection, PG_INSTALL)
+    elif connection.vendor == "sqlite" and has_fts5(connection):
+        run(connection, SQLITE_INSTALL)
+
+
+def uninstall(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        run(connection, PG_UNINSTALL)
+    elif connection.vendor == "sqlite":
+        run(connection, SQLITE_UNINSTALL)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL.
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_snapshot_export_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicatorSearchDoc',
+            fields=[
+                ('docid', models.AutoField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'db_table': 'core_indicator_search_doc',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='IndicatorFullText',
+            fields=[
+                ('doc', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='fulltext', serialize=False, to='core.indicatorsearchdoc')),
+                ('section', models.TextField()),
+                ('standard', models.TextField()),
+                ('indicator_text', models.TextField()),
+                ('document', core.models.FullTextMatchField(db_column='core_indicator_fts')),
+            ],
+            options={
+                'db_table': 'core_indicator_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:51
+
+import core.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The index as this migration first installed it. Frozen here rather than
+# imported from core.audit_search, so later changes there cannot alter history;
+# core.db.ensure_fulltext_indexes re-checks the live definition after migrate.
+SQLITE_INSTALL = [
+    "CREATE TABLE IF NOT EXISTS core_auditlog_search_doc (docid INTEGER PRIMARY KEY, auditlog_id char(32) NOT NULL UNIQUE)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_auditlog_fts USING fts5(summary, entity_id, tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS core_auditlog_fts_ai AFTER INSERT ON core_auditlog BEGIN "
+    "INSERT INTO core_auditlog_search_doc(auditlog_id) VALUES (new.id); "
+    "INSERT INTO core_auditlog_fts(rowid, summary, entity_id) "
+    "VALUES ((SELECT docid FROM core_auditlog_search_doc WHERE auditlog_id = new.id), new.summary, new.entity_id); END",
+    "CREATE TRIGGER IF NOT EXISTS core_auditlog_fts_ad AFTER DELETE ON core_auditlog BEGIN "
+    "DELETE FROM core_auditlog_fts WHERE rowid = (SELECT docid FROM core_auditlog_search_doc WHERE auditlog_id = old.id); "
+    "DELETE FROM core_auditlog_search_doc WHERE auditlog_id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS core_auditlog_fts_au AFTER UPDATE OF summary, entity_id ON core_auditlog BEGIN "
+    "UPDATE core_auditlog_fts SET summary = new.summary, entity_id = new.entity_id "
+    "WHERE rowid = (SELECT docid FROM core_auditlog_search_doc WHERE auditlog_id = new.id); END",
+    "DELETE FROM core_auditlog_fts",
+    "DELETE FROM core_auditlog_search_doc",
+    "INSERT INTO core_auditlog_search_doc(auditlog_id) SELECT id FROM core_auditlog",
+    "INSERT INTO core_auditlog_fts(rowid, summary, entity_id) "
+    "SELECT d.docid, t.summary, t.entity_id FROM core_auditlog t JOIN core_auditlog_search_doc d ON d.auditlog_id = t.id",
+]
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS core_auditlog_fts_ai",
+    "DROP TRIGGER IF EXISTS core_auditlog_fts_ad",
+    "DROP TRIGGER IF EXISTS core_auditlog_fts_au",
+    "DROP TABLE IF EXISTS core_auditlog_fts",
+    "DROP TABLE IF EXISTS core_auditlog_search_doc",
+]
+
+FIELDS = ("summary", "entity_id")
+PG_INSTALL = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+PG_INDEX = (
+    "CREATE INDEX {concurrently}IF NOT EXISTS core_auditlog_{field}_trgm_idx "
+    "ON core_auditlog USING GIN (UPPER({field}) gin_trgm_ops)"
+)
+PG_UNINSTALL = [f"DROP INDEX IF EXISTS core_auditlog_{field}_trgm_idx" for field in FIELDS]
+
+
+def run(connection, statements):
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def is_partitioned(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('core_auditlog')")
+        row = cursor.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def install(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        # CONCURRENTLY is not supported on a partitioned table (core.audit_archive).
+        concurrently = "" if is_partitioned(connection) else "CONCURRENTLY "
+        run(connection, PG_INSTALL + [PG_INDEX.format(concurrently=concurrently, field=field) for field in FIELDS])
+    elif connection.vendor == "sqlite" and has_fts5(connection):
+        run(connection, SQLITE_INSTALL)
+
+
+def uninstall(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        run(connection, PG_UNINSTALL)
+    elif connection.vendor == "sqlite":
+        run(connection, SQLITE_UNINSTALL)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL.
+    atomic = False
+
+
+    dependencies = [
+        ('core', '0010_indicator_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLogSearchDoc',
+            fields=[
+                ('docid', models.AutoField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'db_table': 'core_auditlog_search_doc',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditLogFullText',
+            fields=[
+                ('doc', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='fulltext', serialize=False, to='core.auditlogsearchdoc')),
+                ('summary', models.TextField()),
+                ('entity_id', models.TextField()),
+                ('document', core.models.FullTextMatchField(db_column='core_auditlog_fts')),
+            ],
+            options={
+                'db_table': 'core_auditlog_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:57
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_auditlog_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditArchiveSegment',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file', models.FileField(upload_to='audit-archive/')),
+                ('start_at', models.DateTimeField()),
+                ('end_at', models.DateTimeField()),
+                ('row_count', models.PositiveIntegerField()),
+                ('actor_ids', models.JSONField(blank=True, default=list)),
+                ('actions', models.JSONField(blank=True, default=list)),
+                ('entity_types', models.JSONField(blank=True, default=list)),
+                ('sha256', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-end_at'], name='auditsegment_end_idx'), models.Index(fields=['start_at'], name='auditsegment_start_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_audit_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplianceTrendState',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('first_day', models.DateField(blank=True, null=True)),
+                ('through_day', models.DateField(blank=True, null=True)),
+                ('built_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ComplianceStatusSpan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indicator_id', models.UUIDField()),
+                ('project_id', models.UUIDField(blank=True, null=True)),
+                ('section', models.TextField()),
+                ('status', models.CharField(max_length=16)),
+                ('start_on', models.DateField()),
+                ('end_on', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['indicator_id', 'start_on'], name='statusspan_indicator_idx'), models.Index(fields=['start_on'], name='statusspan_start_idx'), models.Index(fields=['end_on'], name='statusspan_end_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ComplianceTrendPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=8)),
+                ('key', models.TextField(blank=True)),
+                ('day', models.DateField()),
+                ('compliant', models.IntegerField(default=0)),
+                ('due_soon', models.IntegerField(default=0)),
+                ('overdue', models.IntegerField(default=0)),
+                ('not_started', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key', 'day'), name='trendpoint_scope_key_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_snapshot_data_version'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='snapshotexportjob',
+            name='data_fingerprint',
+        ),
+        migrations.AddField(
+            model_name='snapshotexportjob',
+            name='data_version',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_export_job_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='assembling_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
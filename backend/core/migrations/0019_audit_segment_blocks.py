@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_upload_session_assembling_since'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditarchivesegment',
+            name='blocks',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
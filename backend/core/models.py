@@ -4,13 +4,14 @@ from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
-import os
 
 def validate_file_size(value):
   limit = 10 * 1024 * 1024  # 10 MB
   if value.size > limit:
     raise ValidationError('File too large. Size should not exceed 10 MB.')
 
+EVIDENCE_FILE_EXTENSIONS = ['pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png', 'xlsx', 'xls']
+
 def evidence_upload_path(instance, filename):
   ext = filename.split('.')[-1]
   filename = f"{uuid.uuid4()}.{ext}"
@@ -56,9 +57,32 @@ class Indicator(models.Model):
   evidence_min_rule_json=models.JSONField(blank=True, null=True)
   ai_prompt_template=models.TextField(blank=True, null=True)
   is_active=models.BooleanField(default=True)
+  # Latest non-revoked compliance, maintained by services.refresh_compliance_state.
+  latest_compliant_on=models.DateField(blank=True, null=True, editable=False)
+  latest_valid_until=models.DateField(blank=True, null=True, editable=False)
   created_at=models.DateTimeField(auto_now_add=True)
   updated_at=models.DateTimeField(auto_now=True)
 
+  COMPLIANCE_STATE_FIELDS=("latest_compliant_on","latest_valid_until")
+
+  class Meta:
+    indexes=[
+      models.Index(fields=["section","standard","id"], name="indicator_order_idx"),
+      models.Index(fields=["is_active","section","standard","id"], name="indicator_active_order_idx"),
+      models.Index(fields=["project","section","standard","id"], name="indicator_project_order_idx"),
+      models.Index(fields=["is_active","latest_valid_until"], name="indicator_active_due_idx"),
+    ]
+
+  def save(self, *args, **kwargs):
+    # The compliance state columns are written by the compliance write path only,
+    # so a regular edit never overwrites them with a stale in-memory copy.
+    if not self._state.adding and kwargs.get("update_fields") is None:
+      kwargs["update_fields"] = [
+        f.name for f in self._meta.concrete_fields
+        if not f.primary_key and f.name not in self.COMPLIANCE_STATE_FIELDS
+      ]
+    super().save(*args, **kwargs)
+
 class ProjectStatus(models.TextChoices):
   ACTIVE="active","Active"
   ARCHIVED="archived","Archived"
@@ -75,6 +99,43 @@ class Project(models.Model):
   def __str__(self):
     return self.name
 
+class FullTextMatchField(models.TextField):
+  """The hidden table-named column of an SQLite FTS5 table; supports `__match`."""
+
+
+@FullTextMatchField.register_lookup
+class FullTextMatch(models.Lookup):
+  lookup_name="match"
+
+  def as_sql(self, compiler, connection):
+    lhs, lhs_params = self.process_lhs(compiler, connection)
+    rhs, rhs_params = self.process_rhs(compiler, connection)
+    return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class IndicatorSearchDoc(models.Model):
+  """SQLite full-text index bookkeeping (core.search); the tables are created and kept by triggers."""
+  docid=models.AutoField(primary_key=True)
+  indicator=models.OneToOneField(Indicator, on_delete=models.DO_NOTHING, db_constraint=False, related_name="search_doc")
+
+  class Meta:
+    managed=False
+    db_table="core_indicator_search_doc"
+
+class IndicatorFullText(models.Model):
+  doc=models.OneToOneField(
+    IndicatorSearchDoc, on_delete=models.DO_NOTHING, db_constraint=False,
+    primary_key=True, db_column="rowid", related_name="fulltext",
+  )
+  section=models.TextField()
+  standard=models.TextField()
+  indicator_text=models.TextField()
+  document=FullTextMatchField(db_column="core_indicator_fts")
+
+  class Meta:
+    managed=False
+    db_table="core_indicator_fts"
+
 class ComplianceRecord(models.Model):
   id=models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
   indicator=models.ForeignKey(Indicator, on_delete=models.CASCADE, related_name="compliance_records")
@@ -88,6 +149,76 @@ class ComplianceRecord(models.Model):
   created_at=models.DateTimeField(auto_now_add=True)
   updated_at=models.DateTimeField(auto_now=True)
 
+  class Meta:
+    indexes=[
+      # Latest non-revoked record per indicator (due-status subqueries).
+      models.Index(
+        fields=["indicator","-compliant_on","-created_at"],
+        condition=models.Q(is_revoked=False),
+        name="compliance_latest_idx",
+      ),
+      models.Index(fields=["indicator","-compliant_on","-created_at","id"], name="compliance_ind_order_idx"),
+      models.Index(fields=["-compliant_on","-created_at","id"], name="compliance_order_idx"),
+      models.Index(fields=["-created_at"], name="compliance_created_idx"),
+    ]
+
+class ComplianceStatusSpan(models.Model):
+  """A run of days on which one active indicator had one due status (core.trends).
+
+  Project and section are copied so a span can be taken back out of the
+  counts it was added to after the indicator moves or is deleted.
+  """
+  indicator_id=models.UUIDField()
+  project_id=models.UUIDField(null=True, blank=True)
+  section=models.TextField()
+  status=models.CharField(max_length=16)
+  start_on=models.DateField()
+  end_on=models.DateField(null=True, blank=True)
+
+  class Meta:
+    indexes=[
+      models.Index(fields=["indicator_id","start_on"], name="statusspan_indicator_idx"),
+      models.Index(fields=["start_on"], name="statusspan_start_idx"),
+      models.Index(fields=["end_on"], name="statusspan_end_idx"),
+    ]
+
+class ComplianceTrendPoint(models.Model):
+  """Active indicators per due status on one day, for all indicators, one project or one section."""
+  scope=models.CharField(max_length=8)
+  key=models.TextField(blank=True)
+  day=models.DateField()
+  compliant=models.IntegerField(default=0)
+  due_soon=models.IntegerField(default=0)
+  overdue=models.IntegerField(default=0)
+  not_started=models.IntegerField(default=0)
+
+  class Meta:
+    constraints=[
+      models.UniqueConstraint(fields=["scope","key","day"], name="trendpoint_scope_key_day_uniq"),
+    ]
+
+class ComplianceTrendState(models.Model):
+  """Single row: the materialised day range of ComplianceTrendPoint, locked while it is maintained."""
+  id=models.PositiveSmallIntegerField(primary_key=True, default=1)
+  first_day=models.DateField(null=True, blank=True)
+  through_day=models.DateField(null=True, blank=True)
+  built_at=models.DateTimeField(null=True, blank=True)
+
+class SnapshotDataVersion(models.Model):
+  """Single row: bumped after every committed write a compliance snapshot depends on (core.snapshots)."""
+  id=models.PositiveSmallIntegerField(primary_key=True, default=1)
+  version=models.BigIntegerField(default=0)
+
+class EvidenceBlob(models.Model):
+  """One stored evidence file, shared by every EvidenceItem with the same content (see core.blobs)."""
+  id=models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+  sha256=models.CharField(max_length=64, unique=True)
+  file=models.FileField(max_length=255)
+  size=models.BigIntegerField()
+  # EvidenceItem rows pointing here; the blob and its file go when it reaches 0.
+  ref_count=models.PositiveIntegerField(default=0)
+  created_at=models.DateTimeField(auto_now_add=True)
+
 class EvidenceItem(models.Model):
   id=models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
   indicator=models.ForeignKey(Indicator, on_delete=models.CASCADE, related_name="evidence_items")
@@ -100,17 +231,57 @@ class EvidenceItem(models.Model):
     blank=True,
     null=True,
     validators=[
-      FileExtensionValidator(['pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png', 'xlsx', 'xls']),
+      FileExtensionValidator(EVIDENCE_FILE_EXTENSIONS),
       validate_file_size
     ]
   )
+  # Set for uploads stored through core.blobs; rows from before content addressing
+  # keep blob=None until `manage.py dedupe_evidence` moves their files.
+  blob=models.ForeignKey(EvidenceBlob, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name="evidence_items")
   created_by=models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="created_evidence_items")
   created_at=models.DateTimeField(auto_now_add=True)
 
+  class Meta:
+    indexes=[
+      models.Index(fields=["indicator","-created_at","id"], name="evidence_ind_order_idx"),
+      models.Index(fields=["-created_at","id"], name="evidence_order_idx"),
+    ]
+
+class UploadStatus(models.TextChoices):
+  OPEN="OPEN","Open"
+  ASSEMBLING="ASSEMBLING","Assembling"
+  COMPLETE="COMPLETE","Complete"
+
+class UploadSession(models.Model):
+  """A chunked evidence upload (core.uploads); received chunks are the files in its directory on disk."""
+  id=models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+  indicator=models.ForeignKey(Indicator, on_delete=models.CASCADE, related_name="upload_sessions")
+  compliance_record=models.ForeignKey(ComplianceRecord, on_delete=models.SET_NULL, null=True, blank=True, related_name="upload_sessions")
+  type=models.CharField(max_length=16, choices=EvidenceType.choices, default=EvidenceType.FILE)
+  note_text=models.TextField(blank=True, null=True)
+  filename=models.CharField(max_length=255)
+  size=models.BigIntegerField()
+  chunk_size=models.PositiveIntegerField()
+  # Optional sha256 of the whole file, checked when the chunks are assembled.
+  sha256=models.CharField(max_length=64, blank=True)
+  status=models.CharField(max_length=16, choices=UploadStatus.choices, default=UploadStatus.OPEN)
+  # When finalise claimed it; an ASSEMBLING session older than
+  # EVIDENCE_UPLOAD_ASSEMBLY_STALE_SECONDS lost its worker and is claimed again.
+  assembling_since=models.DateTimeField(null=True, blank=True)
+  evidence=models.ForeignKey(EvidenceItem, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+  created_by=models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+  created_at=models.DateTimeField(auto_now_add=True)
+  # Pushed back by every chunk; `purge_upload_sessions` deletes sessions past it.
+  expires_at=models.DateTimeField()
+
+  class Meta:
+    indexes=[models.Index(fields=["expires_at"], name="upload_session_expiry_idx")]
+
 
 class AuditLog(models.Model):
   id=models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-  timestamp=models.DateTimeField(auto_now_add=True)
+  # Stamped by log_audit when the event happens, not when the buffered row is flushed.
+  timestamp=models.DateTimeField(default=timezone.now)
   actor=models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="audit_logs")
   action=models.CharField(max_length=32, choices=AuditAction.choices)
   entity_type=models.CharField(max_length=255)
@@ -122,14 +293,102 @@ class AuditLog(models.Model):
   after=models.JSONField(null=True, blank=True)
   metadata=models.JSONField(null=True, blank=True)
 
-from django.db.models.signals import post_delete
-from django.dispatch import receiver
-
-@receiver(post_delete, sender=EvidenceItem)
-def auto_delete_file_on_delete(sender, instance, **kwargs):
-  if instance.file:
-    try:
-      if instance.file.path and os.path.isfile(instance.file.path):
-        os.remove(instance.file.path)
-    except Exception:
-      pass
+  class Meta:
+    indexes=[
+      models.Index(fields=["-timestamp","-id"], name="auditlog_order_idx"),
+      models.Index(fields=["actor","-timestamp","-id"], name="auditlog_actor_idx"),
+      models.Index(fields=["action","-timestamp","-id"], name="auditlog_action_idx"),
+      models.Index(fields=["entity_type","-timestamp","-id"], name="auditlog_entity_type_idx"),
+    ]
+
+class AuditLogSearchDoc(models.Model):
+  """SQLite trigram index bookkeeping (core.audit_search); the tables are created and kept by triggers."""
+  docid=models.AutoField(primary_key=True)
+  auditlog=models.OneToOneField(AuditLog, on_delete=models.DO_NOTHING, db_constraint=False, related_name="search_doc")
+
+  class Meta:
+    managed=False
+    db_table="core_auditlog_search_doc"
+
+class AuditLogFullText(models.Model):
+  doc=models.OneToOneField(
+    AuditLogSearchDoc, on_delete=models.DO_NOTHING, db_constraint=False,
+    primary_key=True, db_column="rowid", related_name="fulltext",
+  )
+  summary=models.TextField()
+  entity_id=models.TextField()
+  document=FullTextMatchField(db_column="core_auditlog_fts")
+
+  class Meta:
+    managed=False
+    db_table="core_auditlog_fts"
+
+class AuditArchiveSegment(models.Model):
+  """A gzip JSONL file of audit rows moved out of core_auditlog by `archive_audit` (core.audit_archive).
+
+  Rows are stored newest first, in blocks of separate gzip members. The time
+  range and the distinct actors, actions and entity types let readers skip
+  segments a filter cannot match; the block index lets them skip the parts of
+  a segment a page cannot reach and read it backwards a block at a time.
+  """
+  id=models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+  file=models.FileField(upload_to="audit-archive/")
+  start_at=models.DateTimeField()
+  end_at=models.DateTimeField()
+  row_count=models.PositiveIntegerField()
+  actor_ids=models.JSONField(default=list, blank=True)
+  actions=models.JSONField(default=list, blank=True)
+  entity_types=models.JSONField(default=list, blank=True)
+  # [byte offset, newest utc_stamp] of each gzip member, in file order; empty for one-member files.
+  blocks=models.JSONField(default=list, blank=True)
+  # sha256 of the compressed file; gzip's own CRC covers the rows inside it.
+  sha256=models.CharField(max_length=64)
+  created_at=models.DateTimeField(auto_now_add=True)
+
+  class Meta:
+    indexes=[
+      models.Index(fields=["-end_at"], name="auditsegment_end_idx"),
+      models.Index(fields=["start_at"], name="auditsegment_start_idx"),
+    ]
+
+class ExportStatus(models.TextChoices):
+  QUEUED="QUEUED","Queued"
+  RUNNING="RUNNING","Running"
+  DONE="DONE","Done"
+  FAILED="FAILED","Failed"
+  EXPIRED="EXPIRED","Expired"
+
+class ExportFormat(models.TextChoices):
+  CSV="csv","CSV"
+  JSON="json","JSON"
+  XLSX="xlsx","Excel"
+
+
+class SnapshotExportJob(models.Model):
+  """A compliance snapshot export produced by the `run_export_jobs` worker; the table is the queue."""
+  id=models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+  status=models.CharField(max_length=16, choices=ExportStatus.choices, default=ExportStatus.QUEUED)
+  format=models.CharField(max_length=8, choices=ExportFormat.choices, default=ExportFormat.CSV)
+  filters=models.JSONField(default=dict, blank=True)
+  # Reuse key: same filters and format on the same day at the same snapshot data
+  # version (core.snapshots), i.e. with no write committed since the job read the data.
+  filters_digest=models.CharField(max_length=40)
+  snapshot_date=models.DateField()
+  data_version=models.BigIntegerField(null=True, blank=True)
+  progress=models.PositiveSmallIntegerField(default=0)
+  rows_total=models.PositiveIntegerField(null=True, blank=True)
+  rows_written=models.PositiveIntegerField(default=0)
+  artifact=models.FileField(upload_to="exports/", blank=True, null=True)
+  error=models.TextField(blank=True)
+  attempts=models.PositiveSmallIntegerField(default=0)
+  requested_by=models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="snapshot_export_jobs")
+  created_at=models.DateTimeField(auto_now_add=True)
+  claimed_at=models.DateTimeField(null=True, blank=True)
+  finished_at=models.DateTimeField(null=True, blank=True)
+  expires_at=models.DateTimeField(null=True, blank=True)
+
+  class Meta:
+    indexes=[
+      models.Index(fields=["status","created_at"], name="exportjob_queue_idx"),
+      models.Index(fields=["filters_digest","format","snapshot_date"], name="exportjob_reuse_idx"),
+    ]
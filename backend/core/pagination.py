@@ -0,0 +1,186 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _cursor_value(value):
+  if value is None or isinstance(value, (int, float, str, bool)):
+    return value
+  if hasattr(value, "isoformat"):
+    return value.isoformat()
+  return str(value)
+
+
+class KeysetPagination(BasePagination):
+  """Cursor pagination on a composite ordering, e.g. ("section", "standard", "id").
+
+  The cursor carries the ordering values of the last row served, and the next page
+  is fetched with a lexicographic "after this row" filter, so there is no OFFSET
+  scan and no COUNT(*). The last ordering column must be unique (the pk) and the
+  ordering columns must not be NULL. Views may override the ordering per request
+  with get_cursor_ordering().
+  """
+  ordering = ("-created_at", "id")
+  cursor_query_param = "cursor"
+  page_size_query_param = "page_size"
+
+  def __init__(self):
+    self.page_size = getattr(settings, "API_PAGE_SIZE", 50)
+    self.max_page_size = getattr(settings, "API_MAX_PAGE_SIZE", 200)
+
+  def get_ordering(self, request, queryset, view):
+    get_cursor_ordering = getattr(view, "get_cursor_ordering", None)
+    if get_cursor_ordering is not None:
+      return tuple(get_cursor_ordering())
+    return tuple(self.ordering)
+
+  def get_page_size(self, request):
+    try:
+      size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+    except (TypeError, ValueError):
+      size = self.page_size
+    return max(1, min(size, self.max_page_size))
+
+  def encode_cursor(self, values, reverse=False):
+    raw = json.dumps({"v": [_cursor_value(v) for v in values], "r": int(reverse)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+  def decode_cursor(self, request):
+    encoded = request.query_params.get(self.cursor_query_param)
+    if not encoded:
+      return None
+    try:
+      data = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")).decode("utf-8"))
+      values, reverse = data["v"], bool(data["r"])
+    except (TypeError, ValueError, KeyError, UnicodeError):
+      raise NotFound("Invalid cursor")
+    if len(values) != len(self.ordering_fields):
+      raise NotFound("Invalid cursor")
+    return values, reverse
+
+  def keyset_filter(self, values, reverse):
+    """(f1 > v1) OR (f1 = v1 AND f2 > v2) OR ... with > / < following each column's direction."""
+    condition = Q()
+    equal = Q()
+    for field, value in zip(self.ordering_fields, values):
+      name = field.lstrip("-")
+      descending = field.startswith("-") != reverse
+      condition |= equal & Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+      equal &= Q(**{name: value})
+    return condition
+
+  def paginate_queryset(self, queryset, request, view=None):
+    self.request = request
+    self.ordering_fields = self.get_ordering(request, queryset, view)
+    self.page_size_value = self.get_page_size(request)
+    cursor = self.decode_cursor(request)
+    self.reverse = bool(cursor and cursor[1])
+
+    order = self.ordering_fields
+    if self.reverse:
+      order = tuple(f[1:] if f.startswith("-") else f"-{f}" for f in order)
+    queryset = queryset.order_by(*order)
+    if cursor:
+      queryset = queryset.filter(self.keyset_filter(*cursor))
+
+    rows = self.fetch_rows(queryset, cursor, self.page_size_value + 1)
+    has_more = len(rows) > self.page_size_value
+    rows = rows[:self.page_size_value]
+    if self.reverse:
+      rows.reverse()
+      self.has_next, self.has_previous = True, has_more
+    else:
+      self.has_next, self.has_previous = has_more, cursor is not None
+    self.page = rows
+    return rows
+
+  def fetch_rows(self, queryset, cursor, limit):
+    """The first `limit` rows of the ordered, cursor-filtered queryset."""
+    return list(queryset[:limit])
+
+  def _row_values(self, row):
+    return [getattr(row, f.lstrip("-")) for f in self.ordering_fields]
+
+  def get_next_link(self):
+    if not self.has_next or not self.page:
+      return None
+    url = self.request.build_absolute_uri()
+    return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self._row_values(self.page[-1])))
+
+  def get_previous_link(self):
+    if not self.has_previous:
+      return None
+    url = self.request.build_absolute_uri()
+    if not self.page:
+      return remove_query_param(url, self.cursor_query_param)
+    return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self._row_values(self.page[0]), reverse=True))
+
+  def get_paginated_response(self, data):
+    return Response(OrderedDict([
+      ("next", self.get_next_link()),
+      ("previous", self.get_previous_link()),
+      ("results", data),
+    ]))
+
+  def get_paginated_response_schema(self, schema):
+    return {
+      "type": "object",
+      "properties": {
+        "next": {"type": "string", "nullable": True, "format": "uri"},
+        "previous": {"type": "string", "nullable": True, "format": "uri"},
+        "results": schema,
+      },
+    }
+
+
+class IndicatorPagination(KeysetPagination):
+  ordering = ("section", "standard", "id")
+
+
+class ComplianceRecordPagination(KeysetPagination):
+  ordering = ("-compliant_on", "-created_at", "id")
+
+
+class EvidenceItemPagination(KeysetPagination):
+  ordering = ("-created_at", "id")
+
+
+class AuditLogPagination(KeysetPagination):
+  ordering = ("-timestamp", "-id")
+
+  def __init__(self, archive_filters=None):
+    super().__init__()
+    # Filters for rows in archived segments (core.audit_archive), merged in
+    # after the table's own rows; None leaves the archive out.
+    self.archive_filters = archive_filters
+
+  def fetch_rows(self, queryset, cursor, limit):
+    rows = super().fetch_rows(queryset, cursor, limit)
+    if self.archive_filters is None:
+      return rows
+    from .audit_archive import merge_archived
+    return merge_archived(rows, self.archive_filters, cursor, limit)
+
+
+def estimate_count(queryset, cap=10000):
+  """Cheap row count for a queryset: (count, is_exact).
+
+  PostgreSQL answers from the planner's row estimate; elsewhere the count is
+  exact but stops at `cap` rows, so it never walks the whole table.
+  """
+  queryset = queryset.order_by()
+  if connections[queryset.db].vendor == "postgresql":
+    plan = queryset.explain(format="json")
+    if isinstance(plan, str):
+      plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"]), False
+  count = queryset[:cap + 1].count()
+  return min(count, cap), count <= cap
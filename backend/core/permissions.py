@@ -1,12 +1,52 @@
+import ipaddress
+
+from django.conf import settings
+from django.core.cache import cache
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
+ROLE_CACHE_KEY = "rbac:roles:{}"
+
+# Bumped on every invalidation in this process, so a user object that outlives a
+# request (or was loaded before a role change) never serves its memoized roles.
+_roles_generation = 0
+
+
+def get_roles(user) -> frozenset:
+    """Group names of `user`, loaded once per user object and cached across requests.
+
+    Cross-request entries live in the default cache for RBAC_ROLE_CACHE_SECONDS and
+    are dropped by invalidate_roles() whenever the user's groups change. That only
+    reaches other workers through a shared cache, so the setting is 0 (off) unless
+    DJANGO_CACHE_BACKEND names one.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+    memo = getattr(user, "_rbac_roles", None)
+    if memo is not None and memo[0] == _roles_generation:
+        return memo[1]
+    timeout = settings.RBAC_ROLE_CACHE_SECONDS
+    key = ROLE_CACHE_KEY.format(user.pk)
+    roles = cache.get(key) if timeout > 0 else None
+    if roles is None:
+        roles = frozenset(user.groups.values_list("name", flat=True))
+        if timeout > 0:
+            cache.set(key, roles, timeout)
+    user._rbac_roles = (_roles_generation, roles)
+    return roles
+
+
+def invalidate_roles(*user_pks):
+    global _roles_generation
+    _roles_generation += 1
+    cache.delete_many([ROLE_CACHE_KEY.format(pk) for pk in user_pks])
+
 
 def _in_group(user, name: str) -> bool:
-    return user and user.is_authenticated and user.groups.filter(name=name).exists()
+    return name in get_roles(user)
 
 
 def is_admin(user) -> bool:
-    return user and user.is_authenticated and (user.is_superuser or _in_group(user, "Admin"))
+    return bool(user and user.is_authenticated and (user.is_superuser or _in_group(user, "Admin")))
 
 
 def is_reviewer(user) -> bool:
@@ -47,3 +87,18 @@ class ReadOnlyOrAdminContributor(BasePermission):
         if request.method in SAFE_METHODS:
             return request.user.is_authenticated
         return is_admin(request.user) or is_contributor(request.user)
+
+
+class IsMetricsScraper(BasePermission):
+    """Only clients whose REMOTE_ADDR is in METRICS_ALLOWED_IPS (addresses or CIDR networks).
+
+    X-Forwarded-For is ignored, since any client can set it; behind a proxy, list the
+    proxy's address or scrape the workers directly.
+    """
+
+    def has_permission(self, request, view):
+        try:
+            address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+        except ValueError:
+            return False
+        return any(address in ipaddress.ip_network(net, strict=False) for net in settings.METRICS_ALLOWED_IPS)
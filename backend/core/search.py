@@ -0,0 +1,175 @@
+"""Ranked, prefix-matching indicator search backed by the database's full-text index.
+
+PostgreSQL keeps a weighted tsvector column (core_indicator.search_vector, GIN
+indexed); SQLite keeps an FTS5 table (core_indicator_fts). Both are maintained
+by triggers (install_search_index, run by migration 0010 and re-checked after
+every migrate; the SQLite side is core.db.FullTextIndex), so save(), bulk_create/bulk_update and queryset.update() all
+stay in sync. Other backends, or a SQLite build without FTS5, fall back to
+icontains matching.
+
+Both indexes use plain word tokens (no stemming) so every term can be matched
+as a prefix while the user types.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Func, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .db import FullTextIndex, execute
+
+TERM_RE = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 8
+
+# Column weights: standard codes first, then section titles, then indicator text
+# (bm25 takes them in FTS column order: section, standard, indicator_text).
+PG_WEIGHTS = "'{0.1, 0.2, 0.4, 1.0}'"
+
+PG_VECTOR = (
+  "setweight(to_tsvector('simple', coalesce({row}.standard, '')), 'A') || "
+  "setweight(to_tsvector('simple', coalesce({row}.section, '')), 'B') || "
+  "setweight(to_tsvector('simple', coalesce({row}.indicator_text, '')), 'C')"
+)
+
+PG_INSTALL = [
+  "ALTER TABLE core_indicator ADD COLUMN IF NOT EXISTS search_vector tsvector",
+  "CREATE OR REPLACE FUNCTION core_indicator_search_vector() RETURNS trigger LANGUAGE plpgsql AS $$ "
+  f"BEGIN NEW.search_vector := {PG_VECTOR.format(row='NEW')}; RETURN NEW; END $$",
+  "DROP TRIGGER IF EXISTS core_indicator_search_vector_trg ON core_indicator",
+  "CREATE TRIGGER core_indicator_search_vector_trg "
+  "BEFORE INSERT OR UPDATE OF section, standard, indicator_text ON core_indicator "
+  "FOR EACH ROW EXECUTE FUNCTION core_indicator_search_vector()",
+]
+PG_REBUILD = [f"UPDATE core_indicator SET search_vector = {PG_VECTOR.format(row='core_indicator')}"]
+# Built outside a transaction so the table stays writable (migration 0010 is non-atomic).
+PG_INDEX = "CREATE INDEX CONCURRENTLY IF NOT EXISTS core_indicator_search_idx ON core_indicator USING GIN (search_vector)"
+PG_UNINSTALL = [
+  "DROP TRIGGER IF EXISTS core_indicator_search_vector_trg ON core_indicator",
+  "DROP FUNCTION IF EXISTS core_indicator_search_vector()",
+  "DROP INDEX IF EXISTS core_indicator_search_idx",
+  "ALTER TABLE core_indicator DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _pg_install(connection):
+  with connection.cursor() as cursor:
+    cursor.execute(
+      "SELECT 1 FROM pg_trigger WHERE tgname = 'core_indicator_search_vector_trg' "
+      "AND tgrelid = 'core_indicator'::regclass"
+    )
+    missing = cursor.fetchone() is None
+  if missing:
+    execute(connection, PG_INSTALL + PG_REBUILD)
+  execute(connection, [PG_INDEX])
+  return missing
+
+
+INDEX = FullTextIndex(
+  "core_indicator", "indicator_id", ("section", "standard", "indicator_text"),
+  fts_options="tokenize='unicode61 remove_diacritics 2', prefix='2 3'",
+  migration="0010_indicator_search_index",
+  pg_install=_pg_install,
+  pg_rebuild=lambda connection: execute(connection, PG_INSTALL + PG_REBUILD),
+  pg_uninstall=lambda connection: execute(connection, PG_UNINSTALL),
+)
+# Run by migration 0010 and the rebuild_search_index command.
+install_search_index = INDEX.install
+rebuild_search_index = INDEX.rebuild
+uninstall_search_index = INDEX.uninstall
+
+
+def search_terms(q):
+  return [term.lower() for term in TERM_RE.findall(q or "")][:MAX_TERMS]
+
+
+def search_backend(using="default"):
+  connection = connections[using]
+  if connection.vendor == "postgresql":
+    return "postgresql"
+  if connection.vendor == "sqlite":
+    if INDEX.has_fts_table(using):
+      return "sqlite"
+  return None
+
+
+def _icontains(q):
+  return Q(indicator_text__icontains=q) | Q(standard__icontains=q) | Q(section__icontains=q)
+
+
+def search_indicators(queryset, q, rank=False):
+  """Filter `queryset` to indicators matching every term of `q` (each as a prefix).
+
+  With rank=True the rows are annotated with `search_rank` (higher is better).
+  """
+  terms = search_terms(q)
+  backend = search_backend(queryset.db)
+  if not terms or backend is None:
+    queryset = queryset.filter(_icontains(q))
+    return queryset.annotate(search_rank=RawSQL("0", [], output_field=FloatField())) if rank else queryset
+
+  if backend == "postgresql":
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    queryset = queryset.filter(RawSQL(
+      '"core_indicator"."search_vector" @@ to_tsquery(\'simple\', %s)', [tsquery], output_field=BooleanField(),
+    ))
+    if rank:
+      queryset = queryset.annotate(search_rank=RawSQL(
+        f'ts_rank({PG_WEIGHTS}, "core_indicator"."search_vector", to_tsquery(\'simple\', %s))',
+        [tsquery], output_field=FloatField(),
+      ))
+    return queryset
+
+  match = " ".join(f'"{term}"*' for term in terms)
+  # Joined through the unmanaged IndicatorSearchDoc/IndicatorFullText models, so
+  # SQLite drives the query from the FTS index and looks indicators up by id.
+  queryset = queryset.filter(search_doc__fulltext__document__match=match)
+  if rank:
+    # bm25() is lower-is-better; negate it to sort like ts_rank.
+    queryset = queryset.annotate(search_rank=Func(
+      F("search_doc__fulltext__document"), Value(2.0), Value(4.0), Value(1.0),
+      function="bm25", template="-%(function)s(%(expressions)s)", output_field=FloatField(),
+    ))
+  return queryset
+
+
+def count_matches(q, limit, using="default"):
+  """Number of indicators the full-text index matches for `q`, counted up to `limit` + 1."""
+  terms = search_terms(q)
+  backend = search_backend(using)
+  with connections[using].cursor() as cursor:
+    if backend == "postgresql":
+      cursor.execute(
+        "SELECT count(*) FROM (SELECT 1 FROM core_indicator "
+        "WHERE search_vector @@ to_tsquery('simple', %s) LIMIT %s) m",
+        [" & ".join(f"{term}:*" for term in terms), limit + 1],
+      )
+    else:
+      cursor.execute(
+        "SELECT count(*) FROM (SELECT 1 FROM core_indicator_fts "
+        "WHERE core_indicator_fts MATCH %s LIMIT %s) m",
+        [" ".join(f'"{term}"*' for term in terms), limit + 1],
+      )
+    return cursor.fetchone()[0]
+
+
+def ranked_search(queryset, q):
+  """(queryset, keyset ordering) for a paginated search listing.
+
+  Ranking has to score every match, so it is used only while the query matches
+  at most SEARCH_RANK_MAX_MATCHES indicators. Broader queries (typically the
+  first letters typed) are listed in index order, which the database can walk
+  and stop after a page; ordering None means the caller's default ordering.
+  """
+  backend = search_backend(queryset.db)
+  if not search_terms(q) or backend is None:
+    return search_indicators(queryset, q), None
+  limit = settings.SEARCH_RANK_MAX_MATCHES
+  if count_matches(q, limit, queryset.db) <= limit:
+    return search_indicators(queryset, q, rank=True), ("-search_rank", "section", "standard", "id")
+  queryset = search_indicators(queryset, q)
+  if backend == "sqlite":
+    return queryset.annotate(search_position=F("search_doc__fulltext__doc")), ("search_position",)
+  # PostgreSQL: walking indicator_order_idx and testing each row's tsvector is
+  # cheap precisely because broad queries match most rows.
+  return queryset, None
@@ -1,9 +1,19 @@
+import os
+import re
+from django.conf import settings
 from rest_framework import serializers
-from .models import Indicator, ComplianceRecord, EvidenceItem, User, AuditLog, Project
-from .services import compute_due_status
+from .models import (
+  Indicator, ComplianceRecord, EvidenceItem, EvidenceType, EVIDENCE_FILE_EXTENSIONS, User, AuditLog, Project,
+  SnapshotExportJob, UploadSession,
+)
+from . import derivatives, uploads
+from django.urls import reverse
+from django.utils import timezone
+from .services import due_status_for
+from .timing import TimedSerializerMixin
 from django.contrib.auth.models import Group
 
-class AuditLogSerializer(serializers.ModelSerializer):
+class AuditLogSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     actor_username = serializers.ReadOnlyField(source='actor.username')
 
     class Meta:
@@ -14,7 +24,7 @@ class AuditLogSerializer(serializers.ModelSerializer):
             "ip_address", "user_agent"
         ]
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     roles = serializers.SlugRelatedField(
         many=True,
         read_only=True,
@@ -26,7 +36,7 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ["id", "username", "email", "roles", "is_staff", "is_active"]
 
-class IndicatorSerializer(serializers.ModelSerializer):
+class IndicatorSerializer(TimedSerializerMixin, serializers.ModelSerializer):
   last_compliant_on = serializers.SerializerMethodField()
   next_due_on = serializers.SerializerMethodField()
   due_status = serializers.SerializerMethodField()
@@ -41,39 +51,137 @@ class IndicatorSerializer(serializers.ModelSerializer):
     ]
 
   def _t(self, obj):
-    return compute_due_status(obj)
+    # Prefer the services.annotate_due_status annotations (list views), else the
+    # stored latest-compliance columns; either way no per-row queries.
+    if hasattr(obj, "due_status"):
+      next_due = timezone.localdate() if obj.due_status == "NOT_STARTED" else obj.due_next_due_on
+      return (obj.due_last_compliant_on, next_due, obj.due_status)
+    if obj.latest_compliant_on is None:
+      return (None, timezone.localdate(), "NOT_STARTED")
+    return (obj.latest_compliant_on, obj.latest_valid_until, due_status_for(obj.latest_compliant_on, obj.latest_valid_until))
 
   def get_last_compliant_on(self, obj): return self._t(obj)[0]
   def get_next_due_on(self, obj): return self._t(obj)[1]
   def get_due_status(self, obj): return self._t(obj)[2]
 
-class ComplianceRecordSerializer(serializers.ModelSerializer):
+class ComplianceRecordSerializer(TimedSerializerMixin, serializers.ModelSerializer):
   class Meta:
     model = ComplianceRecord
     fields = ["id","indicator","compliant_on","valid_until","notes","is_revoked","revoked_at","revoked_reason","created_by","created_at","updated_at"]
     read_only_fields = ["created_by","created_at","updated_at","revoked_at"]
 
-class EvidenceItemSerializer(serializers.ModelSerializer):
+class EvidenceItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+  thumbnail_url = serializers.SerializerMethodField()
+  preview_url = serializers.SerializerMethodField()
+
   class Meta:
     model = EvidenceItem
-    fields = ["id","indicator","compliance_record","type","note_text","url","file","created_by","created_at"]
+    fields = [
+      "id","indicator","compliance_record","type","note_text","url","file","thumbnail_url","preview_url",
+      "created_by","created_at",
+    ]
     read_only_fields = ["created_by","created_at"]
 
-class ProjectSerializer(serializers.ModelSerializer):
+  def get_thumbnail_url(self, obj):
+    return self._derivative_url(obj, "evidence-thumbnail")
+
+  def get_preview_url(self, obj):
+    return self._derivative_url(obj, "evidence-preview")
+
+  def _derivative_url(self, obj, route):
+    # Made in the background after upload; the endpoint makes it on demand if missing.
+    if not obj.file or not derivatives.supported(obj.file.name):
+      return None
+    url = reverse(route, kwargs={"pk": obj.pk})
+    request = self.context.get("request")
+    return request.build_absolute_uri(url) if request else url
+
+class UploadSessionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+  chunk_count = serializers.SerializerMethodField()
+  received = serializers.SerializerMethodField()
+
+  class Meta:
+    model = UploadSession
+    fields = [
+      "id","indicator","compliance_record","type","note_text","filename","size","chunk_size","sha256",
+      "status","chunk_count","received","evidence","created_at","expires_at",
+    ]
+    read_only_fields = ["status","evidence","created_at","expires_at"]
+    extra_kwargs = {"chunk_size": {"required": False}, "sha256": {"required": False}}
+
+  def validate_type(self, value):
+    if value not in (EvidenceType.FILE, EvidenceType.PHOTO, EvidenceType.SCREENSHOT):
+      raise serializers.ValidationError("Only file, photo and screenshot evidence is uploaded.")
+    return value
+
+  def validate_filename(self, value):
+    value = os.path.basename(value.replace("\\", "/"))
+    if os.path.splitext(value)[1][1:].lower() not in EVIDENCE_FILE_EXTENSIONS:
+      raise serializers.ValidationError(f"Allowed extensions are: {', '.join(EVIDENCE_FILE_EXTENSIONS)}.")
+    return value
+
+  def validate_size(self, value):
+    if not 0 < value <= settings.EVIDENCE_UPLOAD_MAX_SIZE:
+      raise serializers.ValidationError(f"Size must be between 1 and {settings.EVIDENCE_UPLOAD_MAX_SIZE} bytes.")
+    return value
+
+  def validate_chunk_size(self, value):
+    if not uploads.MIN_CHUNK_SIZE <= value <= settings.EVIDENCE_UPLOAD_CHUNK_SIZE:
+      raise serializers.ValidationError(
+        f"Chunk size must be between {uploads.MIN_CHUNK_SIZE} and {settings.EVIDENCE_UPLOAD_CHUNK_SIZE} bytes."
+      )
+    return value
+
+  def validate_sha256(self, value):
+    value = value.lower()
+    if value and not re.fullmatch(r"[0-9a-f]{64}", value):
+      raise serializers.ValidationError("Expected a hex sha256 digest.")
+    return value
+
+  def get_chunk_count(self, obj):
+    return uploads.chunk_count(obj)
+
+  def get_received(self, obj):
+    return uploads.received_chunks(obj)
+
+class ProjectSerializer(TimedSerializerMixin, serializers.ModelSerializer):
   class Meta:
     model = Project
     fields = ["id","name","description","status","created_by","created_at","updated_at"]
     read_only_fields = ["created_by","created_at","updated_at"]
 
-class AuditLogSerializer(serializers.ModelSerializer):
+class AuditLogSerializer(TimedSerializerMixin, serializers.ModelSerializer):
   actor_username = serializers.SerializerMethodField()
+  archived = serializers.SerializerMethodField()
 
   class Meta:
     model = AuditLog
     fields = [
       "id","timestamp","actor","actor_username","action","entity_type","entity_id",
-      "summary","ip_address","user_agent","before","after","metadata"
+      "summary","ip_address","user_agent","before","after","metadata","archived"
     ]
 
   def get_actor_username(self, obj):
     return obj.actor.username if obj.actor else None
+
+  def get_archived(self, obj):
+    # Rows read back from an archived segment (core.audit_archive).
+    return getattr(obj, "archived", False)
+
+class SnapshotExportJobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+  download_url = serializers.SerializerMethodField()
+
+  class Meta:
+    model = SnapshotExportJob
+    fields = [
+      "id","status","format","filters","snapshot_date","progress","rows_total","rows_written",
+      "error","created_at","finished_at","expires_at","download_url",
+    ]
+    read_only_fields = fields
+
+  def get_download_url(self, obj):
+    if obj.status != "DONE" or not obj.artifact:
+      return None
+    url = reverse("audit-snapshot-export-job-download", kwargs={"job_id": obj.pk})
+    request = self.context.get("request")
+    return request.build_absolute_uri(url) if request else url
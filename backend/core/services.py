@@ -1,6 +1,7 @@
 from datetime import timedelta
+from django.db.models import Case, CharField, Count, F, IntegerField, OuterRef, Q, Subquery, Value, When
 from django.utils import timezone
-from .models import Frequency
+from .models import Frequency, ComplianceRecord, Indicator
 
 def compute_valid_until(freq: str, compliant_on):
   if freq == Frequency.ONE_TIME:
@@ -17,17 +18,131 @@ def compute_valid_until(freq: str, compliant_on):
     return compliant_on + timedelta(days=365)
   return None
 
+def due_status_for(compliant_on, valid_until, today=None):
+  """Status for a latest compliance (compliant_on, valid_until); compliant_on=None means none."""
+  today = today or timezone.localdate()
+  if compliant_on is None:
+    return "NOT_STARTED"
+  if valid_until is None:
+    return "COMPLIANT"
+  if valid_until < today:
+    return "OVERDUE"
+  remaining = (valid_until - today).days
+  interval = max((valid_until - compliant_on).days, 1)
+  due_soon = min(3, max(1, int(interval * 0.2)))
+  return "DUE_SOON" if remaining <= due_soon else "COMPLIANT"
+
 def compute_due_status(indicator):
   lc = indicator.compliance_records.filter(is_revoked=False).order_by("-compliant_on","-created_at").first()
   today = timezone.localdate()
   if not lc:
     return (None, today, "NOT_STARTED")
-  if lc.valid_until is None:
-    return (lc.compliant_on, None, "COMPLIANT")
-  if lc.valid_until < today:
-    return (lc.compliant_on, lc.valid_until, "OVERDUE")
-  remaining = (lc.valid_until - today).days
-  interval = max((lc.valid_until - lc.compliant_on).days, 1)
-  due_soon = min(3, max(1, int(interval * 0.2)))
-  status = "DUE_SOON" if remaining <= due_soon else "COMPLIANT"
-  return (lc.compliant_on, lc.valid_until, status)
+  return (lc.compliant_on, lc.valid_until, due_status_for(lc.compliant_on, lc.valid_until, today))
+
+def latest_compliance_subquery():
+  return ComplianceRecord.objects.filter(
+    indicator=OuterRef("pk"), is_revoked=False
+  ).order_by("-compliant_on","-created_at")
+
+def refresh_compliance_state(indicator_ids=None):
+  """Rewrite Indicator.latest_* from the compliance records in one UPDATE.
+
+  Pass indicator ids to refresh only those rows; None rebuilds every indicator.
+  """
+  qs = Indicator.objects.all()
+  if indicator_ids is not None:
+    qs = qs.filter(pk__in=indicator_ids)
+  latest = latest_compliance_subquery()
+  return qs.update(
+    latest_compliant_on=Subquery(latest.values("compliant_on")[:1]),
+    latest_valid_until=Subquery(latest.values("valid_until")[:1]),
+  )
+
+def due_status_expression(compliant_on, valid_until, today):
+  """SQL twin of due_status_for over two date fields/annotations, evaluated for `today`.
+
+  The DUE_SOON window min(3, max(1, int(interval * 0.2))) only spans 1-3 days, so it is
+  unrolled into comparisons against constants: due in <=1 day is always DUE_SOON, due in
+  2 days needs an interval >= 10 days, due in 3 days needs an interval >= 15 days.
+  """
+  def d(days):
+    return today + timedelta(days=days)
+  return Case(
+    When(**{f"{compliant_on}__isnull": True}, then=Value("NOT_STARTED")),
+    When(**{f"{valid_until}__isnull": True}, then=Value("COMPLIANT")),
+    When(**{f"{valid_until}__lt": today}, then=Value("OVERDUE")),
+    When(**{f"{valid_until}__lte": d(1)}, then=Value("DUE_SOON")),
+    When(Q(**{valid_until: d(2), f"{compliant_on}__lte": d(-8)}), then=Value("DUE_SOON")),
+    When(Q(**{valid_until: d(3), f"{compliant_on}__lte": d(-12)}), then=Value("DUE_SOON")),
+    default=Value("COMPLIANT"),
+    output_field=CharField(),
+  )
+
+DUE_STATUS_SEVERITY = {"OVERDUE": 0, "DUE_SOON": 1, "NOT_STARTED": 2, "COMPLIANT": 3}
+
+def annotate_due_status(queryset, today=None, stored=False):
+  """Annotate indicators with due_last_compliant_on, due_next_due_on, due_status and due_severity.
+
+  By default the dates come from a Subquery over ComplianceRecord; stored=True reads the
+  Indicator.latest_* columns instead, which is cheaper and lets the planner use their index.
+  """
+  today = today or timezone.localdate()
+  if stored:
+    dates = {"due_last_compliant_on": F("latest_compliant_on"), "due_next_due_on": F("latest_valid_until")}
+  else:
+    latest = latest_compliance_subquery()
+    dates = {
+      "due_last_compliant_on": Subquery(latest.values("compliant_on")[:1]),
+      "due_next_due_on": Subquery(latest.values("valid_until")[:1]),
+    }
+  return queryset.annotate(**dates).annotate(
+    due_status=due_status_expression("due_last_compliant_on", "due_next_due_on", today),
+  ).annotate(
+    due_severity=Case(
+      *[When(due_status=status, then=Value(rank)) for status, rank in DUE_STATUS_SEVERITY.items()],
+      output_field=IntegerField(),
+    ),
+  )
+
+def due_status_q(status, today=None, compliant_on="latest_compliant_on", valid_until="latest_valid_until"):
+  """Q matching `status` as plain range predicates on the stored columns (index friendly).
+
+  Mirrors due_status_expression; an unknown status matches nothing.
+  """
+  today = today or timezone.localdate()
+  def d(days):
+    return today + timedelta(days=days)
+  due_soon = (
+    Q(**{f"{valid_until}__gte": today, f"{valid_until}__lte": d(1)})
+    | Q(**{valid_until: d(2), f"{compliant_on}__lte": d(-8)})
+    | Q(**{valid_until: d(3), f"{compliant_on}__lte": d(-12)})
+  )
+  started = Q(**{f"{compliant_on}__isnull": False})
+  if status == "NOT_STARTED":
+    return Q(**{f"{compliant_on}__isnull": True})
+  if status == "OVERDUE":
+    return started & Q(**{f"{valid_until}__lt": today})
+  if status == "DUE_SOON":
+    return started & due_soon
+  if status == "COMPLIANT":
+    return started & (Q(**{f"{valid_until}__isnull": True}) | (Q(**{f"{valid_until}__gte": today}) & ~due_soon))
+  return Q(pk__in=[])
+
+def bulk_compute_due_status(queryset, today=None):
+  """compute_due_status for every indicator in `queryset` from one query: {id: (last, next, status)}."""
+  today = today or timezone.localdate()
+  rows = annotate_due_status(queryset, today).values_list(
+    "id", "due_last_compliant_on", "due_next_due_on", "due_status"
+  )
+  return {
+    pk: (last, today if status == "NOT_STARTED" else next_due, status)
+    for pk, last, next_due, status in rows
+  }
+
+def due_status_counts(queryset, today=None):
+  """Per-status indicator counts for `queryset`, grouped in SQL."""
+  counts = {"COMPLIANT":0,"DUE_SOON":0,"OVERDUE":0,"NOT_STARTED":0}
+  rows = annotate_due_status(queryset.order_by(), today).values("due_status").annotate(total=Count("pk"))
+  for row in rows:
+    counts[row["due_status"]] = row["total"]
+  return counts
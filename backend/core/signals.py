@@ -0,0 +1,118 @@
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import blobs, derivatives, uploads
+from .models import ComplianceRecord, EvidenceItem, Indicator, UploadSession, User
+from .permissions import invalidate_roles
+from .services import refresh_compliance_state
+from .snapshots import bump_version
+from .trends import refresh_trend_on_commit
+
+
+@receiver(post_save, sender=ComplianceRecord)
+@receiver(post_delete, sender=ComplianceRecord)
+def sync_indicator_compliance_state(sender, instance, **kwargs):
+  refresh_compliance_state([instance.indicator_id])
+
+
+@receiver(post_save, sender=Indicator)
+@receiver(post_delete, sender=Indicator)
+@receiver(post_save, sender=ComplianceRecord)
+@receiver(post_delete, sender=ComplianceRecord)
+def sync_compliance_trend(sender, instance, **kwargs):
+  refresh_trend_on_commit([instance.pk if sender is Indicator else instance.indicator_id])
+
+
+@receiver(post_save, sender=Indicator)
+@receiver(post_delete, sender=Indicator)
+@receiver(post_save, sender=ComplianceRecord)
+@receiver(post_delete, sender=ComplianceRecord)
+@receiver(post_save, sender=EvidenceItem)
+@receiver(post_delete, sender=EvidenceItem)
+def invalidate_snapshots(sender, **kwargs):
+  bump_version()
+
+
+@receiver(pre_save, sender=EvidenceItem)
+def store_evidence_blob(sender, instance, raw=False, **kwargs):
+  """Store a newly assigned upload as a blob and point the row at it; release the blob it replaces."""
+  if raw:
+    return
+  if instance.file and not instance.file._committed:
+    blob, _ = blobs.store(instance.file.file, instance.file.name)
+    instance.file = blob.file.name
+    instance.blob = blob
+    instance._new_file = True
+  elif not instance.file:
+    instance.blob = None
+  instance._replaced_blob_id = None
+  if not instance._state.adding:
+    previous = EvidenceItem.objects.filter(pk=instance.pk).values_list("blob_id", flat=True).first()
+    if previous != instance.blob_id:
+      instance._replaced_blob_id = previous
+
+
+@receiver(post_save, sender=EvidenceItem)
+def release_replaced_blob(sender, instance, **kwargs):
+  # After the row stops pointing at it: EvidenceItem.blob protects the blob until then.
+  replaced = getattr(instance, "_replaced_blob_id", None)
+  if replaced:
+    instance._replaced_blob_id = None
+    blobs.release(replaced)
+
+
+@receiver(post_save, sender=EvidenceItem)
+def make_evidence_derivatives(sender, instance, **kwargs):
+  if getattr(instance, "_new_file", False):
+    instance._new_file = False
+    name = instance.file.name
+    transaction.on_commit(lambda: derivatives.schedule(name))
+
+
+@receiver(post_delete, sender=EvidenceItem)
+def auto_delete_file_on_delete(sender, instance, **kwargs):
+  """Drop the row's reference to its file; the file itself goes with the last reference.
+
+  Sets `instance._file_deleted` for the audit log.
+  """
+  instance._file_deleted = False
+  if instance.blob_id:
+    instance._file_deleted = blobs.release(instance.blob_id)
+  elif instance.file and not EvidenceItem.objects.filter(file=instance.file.name).exists():
+    # Stored before content addressing and not shared with another row.
+    name, storage = instance.file.name, instance.file.storage
+    transaction.on_commit(lambda: (storage.delete(name), derivatives.delete(name)))
+    instance._file_deleted = True
+
+
+@receiver(post_delete, sender=UploadSession)
+def remove_upload_chunks(sender, instance, **kwargs):
+  # Also reached through Indicator deletes (CASCADE). The path is taken now: the
+  # instance loses its pk once the delete finishes.
+  directory = uploads.session_dir(instance)
+  transaction.on_commit(lambda: uploads.remove_chunks(directory))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_cached_roles(sender, instance, action, reverse, pk_set, **kwargs):
+  if action not in ("post_add", "post_remove", "pre_clear", "post_clear"):
+    return
+  if not reverse:
+    invalidate_roles(instance.pk)
+  elif action == "pre_clear":
+    # group.user_set.clear(): pk_set is None, so collect the members before they go.
+    instance._rbac_member_pks = list(instance.user_set.values_list("pk", flat=True))
+  elif action == "post_clear":
+    invalidate_roles(*getattr(instance, "_rbac_member_pks", ()))
+  else:
+    invalidate_roles(*(pk_set or ()))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_member_roles(sender, instance, created=False, **kwargs):
+  # Renaming or deleting a group changes the role names of all its members.
+  if not created:
+    invalidate_roles(*instance.user_set.values_list("pk", flat=True))
@@ -0,0 +1,185 @@
+"""Cached compliance snapshot payloads, invalidated by a data version counter.
+
+A payload is cached under (data version, today, normalised filters). The version
+is the single SnapshotDataVersion row, so every worker reads the same one: each
+committed write to indicators, compliance records and evidence bumps it, making
+every entry cached before the write unreachable, and the date in the key makes
+the time-based DUE_SOON/OVERDUE transitions roll over at midnight. Payloads
+themselves may live in a per-process cache; they are only found under the
+current version.
+"""
+import hashlib
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .models import ComplianceRecord, EvidenceItem, Indicator, SnapshotDataVersion
+from .search import search_indicators
+from .services import annotate_due_status
+
+PAYLOAD_KEY = "snapshot:payload:{version}:{day}:{filters}"
+
+
+def _create_version():
+  # Start from the clock rather than 0: if the row is ever deleted (a flush, a
+  # restore) while cached payloads survive, they must not become reachable again.
+  try:
+    with transaction.atomic():
+      SnapshotDataVersion.objects.create(pk=1, version=time.time_ns())
+  except IntegrityError:
+    pass  # created concurrently
+
+
+def current_version():
+  version = SnapshotDataVersion.objects.filter(pk=1).values_list("version", flat=True).first()
+  if version is None:
+    _create_version()
+    version = SnapshotDataVersion.objects.values_list("version", flat=True).get(pk=1)
+  return version
+
+
+def _bump():
+  if not SnapshotDataVersion.objects.filter(pk=1).update(version=F("version") + 1):
+    _create_version()
+
+
+def bump_version():
+  """Invalidate cached snapshots once the current transaction commits (now, outside one).
+
+  Bumping after the commit keeps the row lock out of the writing transaction, and
+  a reader that rebuilt the payload from pre-commit data in the meantime cached
+  it under the old version.
+  """
+  transaction.on_commit(_bump)
+
+
+def normalise_filters(filters):
+  return {key: value.strip() for key, value in sorted(filters.items()) if value and value.strip()}
+
+
+def filters_digest(filters):
+  raw = json.dumps(normalise_filters(filters), sort_keys=True, separators=(",", ":"))
+  return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+SNAPSHOT_CSV_HEADER = ["id","section","standard","status","due_date"]
+
+
+def snapshot_indicators(filters, today):
+  """Active indicators matching the snapshot filters, as due-status annotated value rows."""
+  qs = Indicator.objects.filter(is_active=True)
+  q = filters.get("q")
+  section = filters.get("section")
+  standard = filters.get("standard")
+  status = filters.get("status")
+
+  if q:
+    qs = search_indicators(qs, q)
+  if section:
+    qs = qs.filter(section=section)
+  if standard:
+    qs = qs.filter(standard=standard)
+
+  qs = annotate_due_status(qs, today)
+  if status:
+    qs = qs.filter(due_status=status)
+  return qs.order_by("section","standard","id").values(
+    "id","section","standard","due_last_compliant_on","due_next_due_on","due_status"
+  )
+
+
+def snapshot_indicator(row, today):
+  due_status = row["due_status"]
+  return {
+    "id": str(row["id"]),
+    "section": row["section"],
+    "standard": row["standard"],
+    "status": due_status,
+    "due_date": today if due_status == "NOT_STARTED" else row["due_next_due_on"],
+    "last_compliant_on": row["due_last_compliant_on"],
+  }
+
+
+def snapshot_csv_row(indicator):
+  return [indicator["id"], indicator["section"], indicator["standard"], indicator["status"], indicator.get("due_date") or ""]
+
+
+def recent_compliance(limit=50):
+  return list(
+    ComplianceRecord.objects.order_by("-created_at")[:limit]
+    .values(
+      "id","indicator_id","compliant_on","valid_until","is_revoked","revoked_at","created_at"
+    )
+  )
+
+
+def recent_evidence(limit=50):
+  evidence_items = []
+  for item in EvidenceItem.objects.order_by("-created_at")[:limit]:
+    filename = os.path.basename(item.file.name) if item.file else None
+    evidence_items.append({
+      "id": str(item.id),
+      "indicator_id": str(item.indicator_id),
+      "type": item.type,
+      "created_at": item.created_at,
+      "filename": filename,
+      "url": item.url,
+      "file_url": item.file.url if item.file else None,
+    })
+  return evidence_items
+
+
+def build_snapshot_payload(filters, today):
+  indicators = []
+  counts = {"COMPLIANT":0,"DUE_SOON":0,"OVERDUE":0,"NOT_STARTED":0}
+  for row in snapshot_indicators(filters, today):
+    counts[row["due_status"]] = counts.get(row["due_status"], 0) + 1
+    indicators.append(snapshot_indicator(row, today))
+
+  return {
+    "summary": counts,
+    "indicators": indicators,
+    "latest_compliance": recent_compliance(),
+    "evidence": recent_evidence(),
+    "filters": filters,
+  }
+
+
+class SnapshotCache:
+  """The payload cache, counting hits and misses in core.metrics so stats cover every worker."""
+
+  def get_or_build(self, filters, build):
+    """(payload, hit) for `filters`; `build(filters, today)` computes a missing payload."""
+    today = timezone.localdate()
+    key = PAYLOAD_KEY.format(version=current_version(), day=today.isoformat(), filters=filters_digest(filters))
+    payload = cache.get(key)
+    hit = payload is not None
+    if not hit:
+      payload = build(normalise_filters(filters), today)
+      cache.set(key, payload, settings.SNAPSHOT_CACHE_SECONDS)
+    metrics.inc("snapshot_cache_requests_total", {"result": "hit" if hit else "miss"})
+    return payload, hit
+
+  def stats(self):
+    metrics.store.flush()
+    counters = metrics.collect()[0]
+    hits, misses = (
+      counters.get(("snapshot_cache_requests_total", (("result", result),)), 0) for result in ("hit", "miss")
+    )
+    total = hits + misses
+    return {
+      "hits": hits,
+      "misses": misses,
+      "hit_rate": round(hits / total, 4) if total else None,
+      "version": current_version(),
+    }
+
+
+snapshot_cache = SnapshotCache()
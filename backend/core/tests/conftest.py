@@ -0,0 +1,49 @@
+import pytest
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from core.models import Indicator
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def indicator(db):
+    return Indicator.objects.create(section="S", standard="STD", indicator_text="I")
+
+
+@pytest.fixture
+def client_for(db):
+    """client_for(role, username=None): an APIClient authenticated as a new user in that role's group."""
+
+    def make(role, username=None):
+        user = User.objects.create_user(username=username or role.lower(), password="pass")
+        user.groups.add(Group.objects.get_or_create(name=role)[0])
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    return make
+
+
+@pytest.fixture
+def role():
+    """Role of the `client` user; override it in a module or with @pytest.mark.parametrize("role", ...)."""
+    return "Contributor"
+
+
+@pytest.fixture
+def client(client_for, role):
+    return client_for(role)
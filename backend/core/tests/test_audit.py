@@ -22,7 +22,7 @@ def indicator():
         indicator_text='Test Indicator'
     )
 
-@pytest.mark.django_db
+@pytest.mark.django_db(transaction=True)
 class TestAuditTrail:
     def test_compliance_creation_logs(self, api_client, contributor, indicator):
         api_client.force_authenticate(user=contributor)
@@ -89,7 +89,7 @@ def test_admin_permissions(users):
     assert client.get("/api/audit/logs/").status_code == 200
 
 
-@pytest.mark.django_db
+@pytest.mark.django_db(transaction=True)
 def test_audit_log_creation_for_compliance_and_evidence(users, indicator):
     client = auth_client(users["contributor"])
     resp = client.post(
@@ -123,7 +123,7 @@ def test_audit_log_creation_for_compliance_and_evidence(users, indicator):
     assert log.metadata["file_deleted"] is False
 
 
-@pytest.mark.django_db
+@pytest.mark.django_db(transaction=True)
 def test_audit_log_creation_for_import_and_snapshot(users, indicator):
     client = auth_client(users["admin"])
     csv_content = "Section,Standard,Indicator\nSec,Std,Ind\n"
@@ -150,3 +150,32 @@ def test_snapshot_response(users, indicator):
     resp = client.get("/api/audit/snapshot/export/")
     assert resp.status_code == 200
     assert resp["Content-Type"].startswith("text/csv")
+
+
+@pytest.mark.django_db
+def test_audit_log_export_streams_with_constant_queries(users):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    client = auth_client(users["reviewer"])
+
+    def export(**params):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = client.get("/api/audit/logs/export/", params)
+            body = b"".join(resp.streaming_content).decode("utf-8")
+        return resp, body, len(ctx.captured_queries)
+
+    for i in range(3):
+        AuditLog.objects.create(actor=users["contributor"], action="CREATE", entity_type="Indicator", entity_id=str(i), summary=f"row {i}")
+    export(entity_type="Indicator")  # warm the role cache
+    _, _, small = export(entity_type="Indicator")
+    for i in range(3, 30):
+        AuditLog.objects.create(actor=users["admin"] if i % 2 else None, action="CREATE", entity_type="Indicator", entity_id=str(i), summary=f"row {i}")
+    resp, body, large = export(entity_type="Indicator")
+
+    assert resp.streaming
+    assert resp["Content-Type"].startswith("text/csv")
+    lines = body.strip().splitlines()
+    assert len(lines) == 31
+    assert "contrib" in body and "System" in body
+    assert large == small
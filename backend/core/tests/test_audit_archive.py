@@ -0,0 +1,211 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from core import audit_archive
+from core.audit_archive import archive_before, verify_segment
+from core.db import is_partitioned
+from core.models import AuditArchiveSegment, AuditLog
+
+LOGS_URL = "/api/audit/logs/"
+CUTOFF = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def history(db, media):
+    """Two months of old rows (to archive) and a few recent ones."""
+    alice = User.objects.create_user(username="alice", password="p")
+    bob = User.objects.create_user(username="bob", password="p")
+    start = datetime(2024, 11, 20, tzinfo=dt_timezone.utc)
+    for i in range(20):
+        AuditLog.objects.create(
+            timestamp=start + timedelta(days=i * 2), actor=alice if i % 2 else bob,
+            action="UPDATE" if i % 3 else "DELETE", entity_type="Indicator", entity_id=f"old-{i:02d}",
+            summary=f"Old change {i:02d}", before={"n": i}, after={"n": i + 1},
+        )
+    for i in range(5):
+        AuditLog.objects.create(
+            timestamp=CUTOFF + timedelta(days=30 + i), actor=alice, action="CREATE",
+            entity_type="Project", entity_id=f"new-{i}", summary=f"New project {i}",
+        )
+    return alice, bob
+
+
+@pytest.fixture
+def role():
+    return "Admin"
+
+
+def all_pages(client, params):
+    seen, resp = [], client.get(LOGS_URL, params).json()
+    while True:
+        seen += resp["results"]
+        if not resp["next"]:
+            return seen
+        resp = client.get(resp["next"]).json()
+
+
+def test_archive_moves_old_rows_into_checksummed_monthly_segments(history, media):
+    alice, bob = history
+    segments = archive_before(CUTOFF, segment_rows=4)
+
+    assert AuditLog.objects.count() == 5
+    assert sum(s.row_count for s in segments) == 20
+    # Never more than one calendar month per segment, never more than segment_rows rows.
+    for segment in segments:
+        assert (segment.start_at.year, segment.start_at.month) == (segment.end_at.year, segment.end_at.month)
+        assert segment.row_count <= 4
+        assert verify_segment(segment)
+    first = segments[0]
+    with gzip.open(media / first.file.name, "rt") as fh:
+        records = [json.loads(line) for line in fh]
+    assert [r["timestamp"] for r in records] == sorted((r["timestamp"] for r in records), reverse=True)
+    assert records[-1]["entity_id"] == "old-00" and records[-1]["before"] == {"n": 0}
+    assert records[-1]["actor_username"] == "bob"
+    assert set(first.actor_ids) <= {alice.pk, bob.pk} and first.entity_types == ["Indicator"]
+
+    with open(media / first.file.name, "r+b") as fh:
+        fh.seek(20)
+        fh.write(b"\x00")
+    assert not verify_segment(first)
+    with pytest.raises(CommandError):
+        call_command("archive_audit", "--verify", stdout=io.StringIO(), stderr=io.StringIO())
+
+
+def test_logs_page_through_table_and_archive_with_filters(history, client):
+    alice, _ = history
+    expected = all_pages(client, {"page_size": 100})
+    archive_before(CUTOFF, segment_rows=3)
+
+    rows = all_pages(client, {"page_size": 4})
+    assert [r["id"] for r in rows] == [r["id"] for r in expected]
+    assert [r["archived"] for r in rows] == [False] * 5 + [True] * 20
+    assert rows[5]["before"] == {"n": 19} and rows[-1]["actor_username"] == "bob"
+
+    cases = [
+        ({"actor": alice.pk}, lambda r: r["actor"] == alice.pk),
+        ({"action": "DELETE"}, lambda r: r["action"] == "DELETE"),
+        ({"q": "change 1"}, lambda r: "change 1" in r["summary"].lower()),
+        ({"start_date": "2024-12-01", "end_date": "2024-12-10"}, lambda r: "2024-12-01" <= r["timestamp"][:10] <= "2024-12-10"),
+    ]
+    for params, matches in cases:
+        got = all_pages(client, {**params, "page_size": 3})
+        assert [r["entity_id"] for r in got] == [r["entity_id"] for r in expected if matches(r)], params
+
+    assert len(all_pages(client, {"archived": "exclude"})) == 5
+    assert client.get(f"{LOGS_URL}count/").json()["count"] == 25
+    assert client.get(f"{LOGS_URL}count/", {"action": "DELETE"}).json()["count"] == 7
+    assert client.get(f"{LOGS_URL}count/", {"archived": "exclude"}).json()["count"] == 5
+
+
+@pytest.mark.parametrize("segment_rows", [3, None])
+def test_previous_links_cross_back_from_archive(history, client, monkeypatch, segment_rows):
+    # Whole-month segments of two-row blocks, or one block per small segment.
+    monkeypatch.setattr(audit_archive, "SEGMENT_BLOCK_ROWS", 2)
+    archive_before(CUTOFF, segment_rows=segment_rows)
+    pages = [client.get(LOGS_URL, {"page_size": 4}).json()]
+    while pages[-1]["next"]:
+        pages.append(client.get(pages[-1]["next"]).json())
+    for i in range(len(pages) - 1, 0, -1):
+        previous = client.get(pages[i]["previous"]).json()
+        assert [r["id"] for r in previous["results"]] == [r["id"] for r in pages[i - 1]["results"]]
+
+
+def test_pages_decompress_only_the_blocks_they_reach(history, client, monkeypatch):
+    monkeypatch.setattr(audit_archive, "SEGMENT_BLOCK_ROWS", 2)
+    archive_before(CUTOFF)  # December: 14 rows in 7 blocks
+    december = AuditArchiveSegment.objects.get(start_at__month=12)
+    assert len(december.blocks) == 7 and verify_segment(december)
+    pages = [client.get(LOGS_URL, {"page_size": 4}).json()]
+    while len(pages) < 4:
+        pages.append(client.get(pages[-1]["next"]).json())
+
+    read, read_block = [], audit_archive._read_block
+
+    def reading(raw, offset):
+        read.append(offset)
+        return read_block(raw, offset)
+
+    monkeypatch.setattr("core.audit_archive._read_block", reading)
+    # The fourth page starts at December's 8th newest row. Going back to the
+    # third (rows 4-7) reads the blocks of rows 3-8 oldest first, and neither
+    # the newest block nor the older ones below the cursor.
+    previous = client.get(pages[3]["previous"]).json()
+    assert [r["id"] for r in previous["results"]] == [r["id"] for r in pages[2]["results"]]
+    assert read == [december.blocks[i][0] for i in (3, 2, 1)]
+
+
+def test_export_includes_archived_rows(history, client):
+    archive_before(CUTOFF, segment_rows=5)
+    resp = client.get(f"{LOGS_URL}export/", {"entity_type": "Indicator"})
+    rows = list(csv.reader(io.StringIO(b"".join(resp.streaming_content).decode())))[1:]
+    assert [r[3] for r in rows] == [f"Indicator (old-{i:02d})" for i in range(19, -1, -1)]
+    assert rows[0][1] == "alice"
+
+
+def test_segments_outside_the_page_are_not_opened(history, client, monkeypatch):
+    archive_before(CUTOFF)
+
+    def refuse(segment, *args):
+        raise AssertionError("segment opened")
+
+    monkeypatch.setattr("core.audit_archive._read_segment", refuse)
+    # Five table rows answer a page of four and whether a next page exists.
+    assert len(client.get(LOGS_URL, {"page_size": 4}).json()["results"]) == 4
+    # Segments whose index rules the filter out are skipped as well.
+    assert client.get(LOGS_URL, {"entity_type": "Project"}).json()["results"][0]["entity_id"] == "new-4"
+
+
+def test_count_reads_a_bounded_number_of_segments(history, client, settings, monkeypatch):
+    archive_before(CUTOFF)  # one segment per month: 6 rows in November, 14 in December
+    opened, read = [], audit_archive._read_segment
+
+    def reading(segment, *args):
+        opened.append(segment.start_at.month)
+        return read(segment, *args)
+
+    monkeypatch.setattr("core.audit_archive._read_segment", reading)
+    # December lies wholly inside the dates, so its row count is used as is.
+    resp = client.get(f"{LOGS_URL}count/", {"start_date": "2024-12-01", "end_date": "2024-12-31"}).json()
+    assert (resp["count"], resp["count_is_exact"], opened) == (14, True, [])
+    resp = client.get(f"{LOGS_URL}count/", {"q": "change 1"}).json()
+    assert (resp["count"], resp["count_is_exact"], sorted(opened)) == (10, True, [11, 12])
+
+    settings.AUDIT_ARCHIVE_COUNT_MAX_SEGMENTS = 1
+    resp = client.get(f"{LOGS_URL}count/", {"q": "change 0"}).json()
+    assert (resp["count"], resp["count_is_exact"], len(opened)) == (20, False, 2)
+
+
+def test_command_archives_and_reports(history):
+    out = io.StringIO()
+    call_command("archive_audit", "--before", "2025-01-01", "--dry-run", stdout=out)
+    assert "Would archive 20" in out.getvalue() and AuditArchiveSegment.objects.count() == 0
+    call_command("archive_audit", "--before", "2025-01-01", stdout=out)
+    assert "Archived 20 audit log rows" in out.getvalue()
+    call_command("archive_audit", "--verify", stdout=out)
+    assert "All archive segments verified" in out.getvalue()
+
+
+def test_partitioning_is_an_explicit_command(db):
+    assert not is_partitioned(connection, "core_auditlog")
+    call_command("partition_audit_table", stdout=io.StringIO())
+    assert is_partitioned(connection, "core_auditlog") == (connection.vendor == "postgresql")
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="native partitioning is PostgreSQL only")
+def test_audit_table_is_partitioned_by_month(history):
+    call_command("partition_audit_table", stdout=io.StringIO())
+    assert is_partitioned(connection, "core_auditlog")
+    assert AuditLog.objects.count() == 25
+    archive_before(CUTOFF)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('core_auditlog_p202411'), to_regclass('core_auditlog_p202502')")
+        dropped, kept = cursor.fetchone()
+    assert dropped is None and kept is not None
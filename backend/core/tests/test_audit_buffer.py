@@ -0,0 +1,79 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.audit import audit_sink, log_audit
+from core.models import AuditLog
+
+
+def entry(i):
+    log_audit(actor=None, action="CREATE", entity_type="Indicator", entity_id=str(i), summary=f"entry {i}")
+
+
+def audit_inserts(ctx):
+    return [q for q in ctx.captured_queries if q["sql"].startswith('INSERT INTO "core_auditlog"')]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_request_buffer_flushes_in_one_insert_preserving_order():
+    before = audit_sink.stats()
+    audit_sink.begin()
+    try:
+        for i in range(5):
+            entry(i)
+        assert AuditLog.objects.count() == 0
+    finally:
+        with CaptureQueriesContext(connection) as ctx:
+            audit_sink.end()
+    assert len(audit_inserts(ctx)) == 1
+    assert list(AuditLog.objects.order_by("timestamp").values_list("entity_id", flat=True)) == [str(i) for i in range(5)]
+    stats = audit_sink.stats()
+    assert stats["queued"] - before["queued"] == 5
+    assert stats["flushed"] - before["flushed"] == 5
+
+
+@pytest.mark.django_db(transaction=True)
+def test_entries_wait_for_commit_and_vanish_on_rollback():
+    with transaction.atomic():
+        entry("kept")
+        assert not AuditLog.objects.filter(entity_id="kept").exists()
+    assert AuditLog.objects.filter(entity_id="kept").exists()
+
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            entry("rolled-back")
+            raise RuntimeError
+    assert not AuditLog.objects.filter(entity_id="rolled-back").exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_full_buffer_falls_back_to_synchronous_write(settings):
+    settings.AUDIT_BUFFER_MAX_ENTRIES = 3
+    before = audit_sink.stats()
+    audit_sink.begin()
+    try:
+        for i in range(4):
+            entry(i)
+        assert AuditLog.objects.count() == 3
+    finally:
+        audit_sink.end()
+    assert AuditLog.objects.count() == 4
+    stats = audit_sink.stats()
+    assert stats["sync_writes"] - before["sync_writes"] == 3
+    assert stats["flushed"] - before["flushed"] == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_api_request_writes_audit_rows_before_responding():
+    from django.contrib.auth.models import Group, User
+    from rest_framework.test import APIClient
+    from core.models import Indicator
+
+    user = User.objects.create_user(username="contrib", password="pass")
+    user.groups.add(Group.objects.get_or_create(name="Contributor")[0])
+    indicator = Indicator.objects.create(section="S", standard="STD", indicator_text="I")
+    client = APIClient()
+    client.force_authenticate(user=user)
+    resp = client.post("/api/compliance/", {"indicator": str(indicator.id), "compliant_on": "2026-01-01"}, format="json")
+    assert resp.status_code == 201
+    assert AuditLog.objects.filter(action="CREATE", entity_id=resp.data["id"]).exists()
@@ -0,0 +1,88 @@
+import pytest
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework.test import APIClient
+
+from core.audit_search import audit_search_q, install_audit_search_index
+from core.models import AuditLog
+
+LOGS_URL = "/api/audit/logs/"
+
+
+def found(q, fields=("summary",)):
+    return sorted(AuditLog.objects.filter(audit_search_q(q, fields)).values_list("entity_id", flat=True))
+
+
+@pytest.fixture
+def logs(db):
+    alice = User.objects.create_user(username="alice", password="p")
+    return [
+        AuditLog.objects.create(actor=alice, action="CREATE", entity_type="Indicator", entity_id="ind-001", summary="Created Hand Hygiene indicator"),
+        AuditLog.objects.create(action="UPDATE", entity_type="Indicator", entity_id="ind-002", summary="Updated fire safety indicator"),
+        AuditLog.objects.create(action="DELETE", entity_type="EvidenceItem", entity_id="ev-777", summary='Deleted evidence "scan.pdf"'),
+    ]
+
+
+def test_substring_matches_like_icontains(logs):
+    assert found("hygien") == ["ind-001"]
+    assert found("HAND hyg") == ["ind-001"]
+    assert found("indicator") == ["ind-001", "ind-002"]
+    assert found('"scan.pdf"') == ["ev-777"]
+    assert found("ev-7") == []
+    assert found("ev-7", ("summary", "entity_id")) == ["ev-777"]
+    # Below trigram length: plain icontains.
+    assert found("fi") == ["ind-002"]
+
+
+def test_broad_queries_fall_back_to_icontains(logs, settings):
+    settings.AUDIT_SEARCH_INDEX_MAX_MATCHES = 1
+    assert found("indicator") == ["ind-001", "ind-002"]
+
+
+def test_index_follows_updates_and_deletes(logs):
+    created, updated, deleted = logs
+    AuditLog.objects.filter(pk=updated.pk).update(summary="Archived fire safety indicator")
+    assert found("archived") == ["ind-002"] and found("updated") == []
+    deleted.delete()
+    assert found("scan") == []
+
+
+def test_api_filter_and_export_use_search(logs):
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username="root", password="p", is_superuser=True))
+    rows = client.get(LOGS_URL, {"q": "fire saf"}).json()["results"]
+    assert [row["entity_id"] for row in rows] == ["ind-002"]
+    assert client.get(f"{LOGS_URL}count/", {"q": "indicator"}).json()["count"] == 2
+    export = b"".join(client.get(f"{LOGS_URL}export/", {"q": "hygiene"}).streaming_content).decode()
+    assert "ind-001" in export and "ind-002" not in export
+
+
+def test_admin_search_covers_summary_entity_id_and_actor(logs):
+    model_admin = site._registry[AuditLog]
+    request = RequestFactory().get("/admin/core/auditlog/")
+
+    def admin_found(term):
+        queryset, may_have_duplicates = model_admin.get_search_results(request, AuditLog.objects.all(), term)
+        assert may_have_duplicates is False
+        return sorted(queryset.values_list("entity_id", flat=True))
+
+    assert admin_found("ev-77") == ["ev-777"]
+    assert admin_found("alic") == ["ind-001"]
+    assert admin_found("alice hygiene") == ["ind-001"]
+    assert admin_found("alice fire") == []
+    assert admin_found('"fire safety"') == ["ind-002"]
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite table rebuilds drop triggers")
+def test_install_repairs_dropped_triggers(logs):
+    with connection.cursor() as cursor:
+        for name in ("core_auditlog_fts_ai", "core_auditlog_fts_ad", "core_auditlog_fts_au"):
+            cursor.execute(f"DROP TRIGGER {name}")
+    AuditLog.objects.create(action="CREATE", entity_type="Project", entity_id="prj-1", summary="Created project Lab")
+    assert found("project lab") == []
+
+    assert install_audit_search_index(connection) is True
+    assert found("project lab") == ["prj-1"]
+    assert install_audit_search_index(connection) is False
@@ -0,0 +1,49 @@
+import pytest
+
+from core import benchmarks
+from core.models import AuditLog, ComplianceRecord, EvidenceItem, Indicator
+
+# Seeding writes evidence files under MEDIA_ROOT.
+pytestmark = pytest.mark.usefixtures("media")
+
+
+@pytest.mark.django_db
+def test_seed_creates_the_dataset_and_a_superuser():
+    user = benchmarks.seed(30, seed=7)
+    assert user.is_superuser and Indicator.objects.count() == 30
+    assert ComplianceRecord.objects.count() > 30 and AuditLog.objects.exists()
+    assert EvidenceItem.objects.filter(type="FILE").exists()
+
+
+@pytest.mark.django_db
+def test_every_case_runs_and_reports_time_and_queries():
+    user = benchmarks.seed(20)
+    results = benchmarks.run_cases(20, user, repeat=1)
+    assert set(results) == {
+        "compute_due_status[200]", "indicator_serializer[20]", "build_snapshot_payload", "audit_summary[year]",
+        "audit_logs[page]", "audit_logs[search]", "audit_export", "csv_import[20]",
+    }
+    assert all(stats["median_ms"] > 0 and stats["queries"] > 0 for stats in results.values())
+    assert results["indicator_serializer[20]"]["queries"] == 1
+
+    only = benchmarks.run_cases(20, user, repeat=1, only=["audit_logs"])
+    assert set(only) == {"audit_logs[page]", "audit_logs[search]"}
+
+
+def test_compare_flags_slowdowns_beyond_the_threshold_and_extra_queries():
+    baseline = {"1000": {
+        "a": {"median_ms": 10.0, "min_ms": 9.0, "queries": 3},
+        "b": {"median_ms": 10.0, "min_ms": 9.0, "queries": 3},
+        "gone": {"median_ms": 1.0, "min_ms": 1.0, "queries": 1},
+    }}
+    results = {
+        "1000": {
+            "a": {"median_ms": 11.9, "min_ms": 11.0, "queries": 3},
+            "b": {"median_ms": 12.5, "min_ms": 12.0, "queries": 4},
+            "new": {"median_ms": 99.0, "min_ms": 99.0, "queries": 99},
+        },
+        "10000": {"a": {"median_ms": 500.0, "min_ms": 500.0, "queries": 3}},
+    }
+    regressions = benchmarks.compare(results, baseline, 0.2)
+    assert regressions == ["b @ 1000: 12.5ms vs 10.0ms (+25%)", "b @ 1000: 4 queries vs 3"]
+    assert benchmarks.compare(results, baseline, 0.3) == ["b @ 1000: 4 queries vs 3"]
@@ -0,0 +1,76 @@
+from datetime import date
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from core.datasets import generate
+from core.models import AuditLog, ComplianceRecord, ComplianceTrendPoint, EvidenceItem, Indicator, Project
+from core.services import refresh_compliance_state
+from core.trends import ensure_trend
+
+TODAY = date(2026, 6, 30)
+
+# Generated evidence files go under MEDIA_ROOT.
+pytestmark = pytest.mark.usefixtures("media")
+
+
+def rows():
+    return {
+        "indicators": sorted(Indicator.objects.values_list("id", "project_id", "standard", "frequency")),
+        "records": sorted(ComplianceRecord.objects.values_list("id", "indicator_id", "compliant_on", "valid_until", "is_revoked", "created_at")),
+        "evidence": sorted(EvidenceItem.objects.values_list("id", "type", "file", "url")),
+        "audit": sorted(AuditLog.objects.values_list("id", "timestamp", "action", "entity_id")),
+        "users": sorted(User.objects.values_list("username", "groups__name")),
+    }
+
+
+@pytest.mark.django_db
+def test_same_seed_same_rows():
+    first = generate(60, seed=3, today=TODAY, batch_size=25)
+    before = rows()
+    for model in (AuditLog, Indicator, Project, User):
+        model.objects.all().delete()
+    assert generate(60, seed=3, today=TODAY, batch_size=25) == first
+    assert rows() == before
+
+    for model in (AuditLog, Indicator, Project, User):
+        model.objects.all().delete()
+    generate(60, seed=4, today=TODAY)
+    assert rows()["records"] != before["records"]
+
+
+@pytest.mark.django_db
+def test_histories_evidence_and_audit_rows():
+    report = generate(200, seed=1, today=TODAY, file_pool=3)
+    assert report.indicators == Indicator.objects.count() == 200
+    assert report.compliance_records == ComplianceRecord.objects.count() > 1000
+    assert report.revoked == ComplianceRecord.objects.filter(is_revoked=True, revoked_at__isnull=False).count() > 0
+    assert ComplianceRecord.objects.order_by("compliant_on").first().compliant_on < date(2023, 11, 1)
+    assert Indicator.objects.filter(latest_compliant_on__isnull=True).exists()
+    assert Indicator.objects.filter(latest_valid_until__lt=TODAY).exists()
+    latest = list(Indicator.objects.order_by("id").values_list("latest_compliant_on", "latest_valid_until"))
+    refresh_compliance_state()
+    assert list(Indicator.objects.order_by("id").values_list("latest_compliant_on", "latest_valid_until")) == latest
+    assert report.audit_logs == AuditLog.objects.count()
+    assert AuditLog.objects.filter(action="REVOKE").count() == report.revoked
+    assert User.objects.filter(groups__name="Admin").exists() and User.objects.filter(groups__name="Reviewer").exists()
+
+    files = set(EvidenceItem.objects.exclude(file="").exclude(file__isnull=True).values_list("file", flat=True))
+    assert report.placeholder_files == 9 and len(files) <= 9
+    assert all(default_storage.exists(name) for name in files)
+    with default_storage.open(next(name for name in files if name.endswith(".png"))) as fh:
+        assert fh.read(8) == b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.mark.django_db
+def test_a_built_trend_is_rebuilt_and_reruns_are_refused():
+    ensure_trend(TODAY)
+    generate(20, seed=2, today=TODAY)
+    assert ComplianceTrendPoint.objects.filter(scope="all", day=TODAY).get().compliant > 0
+    with pytest.raises(ValueError):
+        generate(20, seed=2, today=TODAY)
+    with pytest.raises(CommandError):
+        call_command("generate_dataset", "--indicators", "20")
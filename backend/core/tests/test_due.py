@@ -13,3 +13,104 @@ def test_one_time_compliant():
   ind = Indicator.objects.create(section="S", standard="St", indicator_text="I", frequency=Frequency.ONE_TIME)
   ComplianceRecord.objects.create(indicator=ind, compliant_on=timezone.localdate())
   assert compute_due_status(ind)[2] == "COMPLIANT"
+
+@pytest.mark.django_db
+def test_latest_compliance_state_tracks_records():
+  ind = Indicator.objects.create(section="S", standard="St", indicator_text="I", frequency=Frequency.MONTHLY)
+  today = timezone.localdate()
+  older = ComplianceRecord.objects.create(indicator=ind, compliant_on=today - timezone.timedelta(days=40), valid_until=today - timezone.timedelta(days=10))
+  newer = ComplianceRecord.objects.create(indicator=ind, compliant_on=today, valid_until=today + timezone.timedelta(days=30))
+  ind.refresh_from_db()
+  assert (ind.latest_compliant_on, ind.latest_valid_until) == (newer.compliant_on, newer.valid_until)
+
+  newer.is_revoked = True
+  newer.save()
+  ind.refresh_from_db()
+  assert ind.latest_compliant_on == older.compliant_on
+
+  older.delete()
+  ind.refresh_from_db()
+  assert ind.latest_compliant_on is None
+
+@pytest.mark.django_db
+def test_indicator_save_keeps_compliance_state():
+  ind = Indicator.objects.create(section="S", standard="St", indicator_text="I")
+  stale = Indicator.objects.get(pk=ind.pk)
+  ComplianceRecord.objects.create(indicator=ind, compliant_on=timezone.localdate())
+  stale.section = "S2"
+  stale.save()
+  ind.refresh_from_db()
+  assert ind.section == "S2"
+  assert ind.latest_compliant_on == timezone.localdate()
+
+@pytest.mark.django_db
+def test_serializer_reads_stored_state_without_queries(django_assert_num_queries):
+  from core.serializers import IndicatorSerializer
+  for i in range(5):
+    ind = Indicator.objects.create(section="S", standard=f"St{i}", indicator_text="I")
+    ComplianceRecord.objects.create(indicator=ind, compliant_on=timezone.localdate())
+  indicators = list(Indicator.objects.all())
+  with django_assert_num_queries(0):
+    data = IndicatorSerializer(indicators, many=True).data
+  assert {row["due_status"] for row in data} == {"COMPLIANT"}
+
+@pytest.mark.django_db
+def test_rebuild_compliance_state_command():
+  from django.core.management import call_command
+  ind = Indicator.objects.create(section="S", standard="St", indicator_text="I")
+  ComplianceRecord.objects.create(indicator=ind, compliant_on=timezone.localdate())
+  Indicator.objects.update(latest_compliant_on=None, latest_valid_until=None)
+  call_command("rebuild_compliance_state")
+  ind.refresh_from_db()
+  assert ind.latest_compliant_on == timezone.localdate()
+
+@pytest.mark.django_db
+def test_bulk_due_status_matches_compute_due_status(django_assert_num_queries):
+  from core.services import bulk_compute_due_status
+  today = timezone.localdate()
+  indicators = [Indicator.objects.create(section="S", standard="none", indicator_text="I")]
+  one_time = Indicator.objects.create(section="S", standard="once", indicator_text="I")
+  ComplianceRecord.objects.create(indicator=one_time, compliant_on=today - timezone.timedelta(days=3))
+  indicators.append(one_time)
+  for interval in range(0, 21):
+    for remaining in range(-2, 6):
+      ind = Indicator.objects.create(section="S", standard=f"{interval}/{remaining}", indicator_text="I")
+      valid_until = today + timezone.timedelta(days=remaining)
+      ComplianceRecord.objects.create(indicator=ind, compliant_on=valid_until - timezone.timedelta(days=interval), valid_until=valid_until)
+      indicators.append(ind)
+  with django_assert_num_queries(1):
+    bulk = bulk_compute_due_status(Indicator.objects.all())
+  for ind in indicators:
+    assert bulk[ind.id] == compute_due_status(ind), ind.standard
+
+@pytest.mark.django_db
+def test_due_status_counts_ignores_revoked():
+  from core.services import due_status_counts
+  today = timezone.localdate()
+  ind = Indicator.objects.create(section="S", standard="St", indicator_text="I")
+  ComplianceRecord.objects.create(indicator=ind, compliant_on=today - timezone.timedelta(days=40), valid_until=today - timezone.timedelta(days=10))
+  ComplianceRecord.objects.create(indicator=ind, compliant_on=today, valid_until=today + timezone.timedelta(days=30), is_revoked=True)
+  Indicator.objects.create(section="S", standard="St2", indicator_text="I")
+  assert due_status_counts(Indicator.objects.all()) == {"COMPLIANT": 0, "DUE_SOON": 0, "OVERDUE": 1, "NOT_STARTED": 1}
+
+@pytest.mark.django_db
+def test_due_status_filter_runs_in_sql(django_assert_num_queries):
+  from rest_framework.test import APIClient
+  from core.services import due_status_q
+  today = timezone.localdate()
+  expected = {}
+  for interval in range(0, 21):
+    for remaining in (-1, 0, 2, 3, 4):
+      ind = Indicator.objects.create(section="S", standard=f"{interval}/{remaining}", indicator_text="I")
+      valid_until = today + timezone.timedelta(days=remaining)
+      ComplianceRecord.objects.create(indicator=ind, compliant_on=valid_until - timezone.timedelta(days=interval), valid_until=valid_until)
+      expected[ind.id] = compute_due_status(ind)[2]
+  for status in ("COMPLIANT", "DUE_SOON", "OVERDUE", "NOT_STARTED"):
+    ids = set(Indicator.objects.filter(due_status_q(status)).values_list("id", flat=True))
+    assert ids == {pk for pk, st in expected.items() if st == status}
+
+  client = APIClient()
+  with django_assert_num_queries(1):
+    resp = client.get("/api/indicators/", {"due_status": "OVERDUE", "ordering": "-next_due_on"})
+  assert resp.status_code == 200
+  assert {row["due_status"] for row in resp.json()["results"]} == {"OVERDUE"}
@@ -0,0 +1,174 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from core import blobs
+from core.models import AuditLog, EvidenceBlob, EvidenceItem
+
+CONTENT = b"%PDF-1.4 same scan\n" * 50
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+
+def upload(client, indicator, name, content=CONTENT):
+    resp = client.post(
+        "/api/evidence/",
+        {"indicator": str(indicator.id), "type": "FILE", "file": SimpleUploadedFile(name, content)},
+        format="multipart",
+    )
+    assert resp.status_code == 201, resp.data
+    return EvidenceItem.objects.get(pk=resp.data["id"])
+
+
+def blob_files(media):
+    return sorted(p for p in (media / "evidence" / "blobs").rglob("*") if p.is_file())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_identical_uploads_share_one_blob(client, indicator, media, monkeypatch):
+    # Uploads are hashed as they stream in; storing them must not read them again.
+    monkeypatch.setattr(blobs, "file_sha256", lambda f: pytest.fail("upload was re-read to hash it"))
+    first = upload(client, indicator, "scan.pdf")
+    second = upload(client, indicator, "copy-of-scan.PDF")
+
+    blob = EvidenceBlob.objects.get()
+    assert blob.sha256 == DIGEST and blob.size == len(CONTENT) and blob.ref_count == 2
+    assert first.blob_id == second.blob_id == blob.pk
+    assert first.file.name == second.file.name == f"evidence/blobs/{DIGEST[:2]}/{DIGEST}.pdf"
+    assert blob_files(media) == [media / first.file.name]
+    assert (media / first.file.name).read_bytes() == CONTENT
+
+    upload(client, indicator, "other.pdf", b"%PDF-1.4 another scan\n")
+    assert EvidenceBlob.objects.count() == 2 and len(blob_files(media)) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_large_uploads_are_hashed_on_disk(client, indicator, media, settings, monkeypatch):
+    settings.FILE_UPLOAD_MAX_MEMORY_SIZE = 100  # spill to HashingTemporaryFileUploadHandler
+    monkeypatch.setattr(blobs, "file_sha256", lambda f: pytest.fail("upload was re-read to hash it"))
+    item = upload(client, indicator, "scan.pdf")
+    assert item.blob.sha256 == DIGEST
+
+
+@pytest.mark.django_db(transaction=True)
+def test_file_is_removed_with_its_last_reference(client, indicator, media):
+    first = upload(client, indicator, "a.pdf")
+    second = upload(client, indicator, "b.pdf")
+    path = media / first.file.name
+
+    assert client.delete(f"/api/evidence/{first.id}/").status_code == 204
+    assert path.exists() and EvidenceBlob.objects.get().ref_count == 1
+    assert AuditLog.objects.get(action="DELETE", entity_id=str(first.id)).metadata["file_deleted"] is False
+
+    assert client.delete(f"/api/evidence/{second.id}/").status_code == 204
+    assert not path.exists() and not EvidenceBlob.objects.exists()
+    assert AuditLog.objects.get(action="DELETE", entity_id=str(second.id)).metadata["file_deleted"] is True
+
+
+@pytest.mark.django_db(transaction=True)
+def test_cascade_and_replacement_release_blobs(client, indicator, media):
+    kept = upload(client, indicator, "a.pdf")
+    replaced = upload(client, indicator, "b.pdf", b"%PDF-1.4 first draft\n")
+    old_path = media / replaced.file.name
+
+    resp = client.patch(f"/api/evidence/{replaced.id}/", {"file": SimpleUploadedFile("b.pdf", CONTENT)}, format="multipart")
+    assert resp.status_code == 200, resp.data
+    assert not old_path.exists()
+    assert EvidenceBlob.objects.get().ref_count == 2
+
+    indicator.delete()
+    assert not EvidenceBlob.objects.exists() and blob_files(media) == []
+    assert not EvidenceItem.objects.filter(pk__in=[kept.pk, replaced.pk]).exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dedupe_evidence_moves_legacy_files(indicator, media):
+    def legacy(name, content):
+        item = EvidenceItem(indicator=indicator, type="FILE")
+        item.file.save(name, ContentFile(content))  # committed file: stored the old way, no blob
+        return item
+
+    a, b, c = legacy("a.pdf", CONTENT), legacy("b.pdf", CONTENT), legacy("c.pdf", b"%PDF-1.4 other\n")
+    shared = EvidenceItem.objects.create(indicator=indicator, type="FILE", file=a.file.name)
+    gone = EvidenceItem.objects.create(indicator=indicator, type="FILE", file="evidence/missing.pdf")
+    old = {item.file.name for item in (a, b, c)}
+    assert all(item.blob_id is None for item in (a, b, c, shared))
+
+    call_command("dedupe_evidence", dry_run=True)
+    assert not EvidenceBlob.objects.exists() and all(default_storage.exists(name) for name in old)
+
+    call_command("dedupe_evidence", batch_size=1)
+    for item in (a, b, c, shared, gone):
+        item.refresh_from_db()
+    assert a.blob_id == b.blob_id == shared.blob_id != c.blob_id
+    assert EvidenceBlob.objects.get(pk=a.blob_id).ref_count == 3
+    assert EvidenceBlob.objects.get(pk=c.blob_id).ref_count == 1
+    assert a.file.name == blobs.blob_name(DIGEST, "a.pdf") and a.file.read() == CONTENT
+    assert not any(default_storage.exists(name) for name in old)
+    assert gone.blob_id is None and gone.file.name == "evidence/missing.pdf"
+
+    EvidenceBlob.objects.filter(pk=c.blob_id).update(ref_count=7)
+    orphan, _ = blobs.store(ContentFile(b"unreferenced", name="x.pdf"), refs=0)
+    call_command("dedupe_evidence")
+    assert EvidenceBlob.objects.get(pk=c.blob_id).ref_count == 1
+    assert not EvidenceBlob.objects.filter(pk=orphan.pk).exists() and not default_storage.exists(orphan.file.name)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_content_stored_again_before_collection_keeps_its_file(client, indicator, media, monkeypatch):
+    item = upload(client, indicator, "a.pdf")
+    pending = []
+    monkeypatch.setattr(blobs, "collect", pending.append)
+    assert client.delete(f"/api/evidence/{item.id}/").status_code == 204
+    # The last reference is gone; the blob waits at 0 for collect().
+    blob = EvidenceBlob.objects.get()
+    assert blob.ref_count == 0 and pending == [blob.pk]
+
+    again = upload(client, indicator, "b.pdf")
+    monkeypatch.undo()
+    assert blobs.collect(blob.pk) is False
+    assert again.blob_id == blob.pk and EvidenceBlob.objects.get().ref_count == 1
+    assert (media / again.file.name).read_bytes() == CONTENT
+
+    # Once collected, the same content is written afresh.
+    client.delete(f"/api/evidence/{again.id}/")
+    assert not EvidenceBlob.objects.exists() and blob_files(media) == []
+    assert (media / upload(client, indicator, "c.pdf").file.name).read_bytes() == CONTENT
+
+
+@pytest.mark.django_db(transaction=True)
+def test_dedupe_evidence_sweeps_stray_blob_files(client, indicator, media):
+    kept = media / upload(client, indicator, "a.pdf").file.name
+    thumb = kept.with_name(kept.stem + ".thumb.jpg")
+    stray, fresh = media / "evidence/blobs/ff/ff00.pdf", media / "evidence/blobs/ff/ff01.pdf"
+    for path in (thumb, stray, fresh):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x")
+    old = time.time() - 2 * blobs.SWEEP_MIN_AGE.total_seconds()
+    for path in (kept, thumb, stray):
+        os.utime(path, (old, old))
+
+    out = io.StringIO()
+    call_command("dedupe_evidence", stdout=out)
+    assert "and 1 stray files" in out.getvalue()
+    assert kept.exists() and thumb.exists() and fresh.exists() and not stray.exists()
+
+
+def test_reused_stray_file_is_not_swept_before_its_row_commits(indicator, media):
+    # A rolled-back upload left the file; an upload of the same content reuses it.
+    name = blobs.blob_name(DIGEST, "a.pdf")
+    path = media / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(CONTENT)
+    old = time.time() - 2 * blobs.SWEEP_MIN_AGE.total_seconds()
+    os.utime(path, (old, old))
+
+    assert blobs._write(DIGEST, ContentFile(CONTENT), "a.pdf") == name
+    # Its EvidenceBlob row is not committed yet, but the file is young again.
+    assert blobs.sweep_files() == [] and path.read_bytes() == CONTENT
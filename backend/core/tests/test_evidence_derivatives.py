@@ -0,0 +1,129 @@
+import io
+import shutil
+
+import pytest
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from core import derivatives
+from core.models import EvidenceItem
+
+
+def image_bytes(size, fmt="PNG", mode="RGBA", exif=None):
+    buf = io.BytesIO()
+    image = Image.new(mode, size, (200, 30, 30, 0) if mode == "RGBA" else "red")
+    image.save(buf, fmt, **({"exif": exif} if exif else {}))
+    return buf.getvalue()
+
+
+@pytest.fixture
+def media(media, settings):
+    settings.EVIDENCE_DERIVATIVE_WORKERS = 0
+    return media
+
+
+@pytest.fixture
+def role():
+    # Admins both upload and view evidence.
+    return "Admin"
+
+
+def upload(client, indicator, name, content, kind="PHOTO"):
+    resp = client.post(
+        "/api/evidence/",
+        {"indicator": str(indicator.id), "type": kind, "file": SimpleUploadedFile(name, content)},
+        format="multipart",
+    )
+    assert resp.status_code == 201, resp.data
+    return resp
+
+
+def stored_size(name):
+    with default_storage.open(name) as fh, Image.open(fh) as image:
+        return image.format, image.mode, image.size
+
+
+@pytest.mark.django_db(transaction=True)
+def test_upload_makes_thumbnail_and_preview(client, indicator, media):
+    resp = upload(client, indicator, "screen.png", image_bytes((3000, 1500)), kind="SCREENSHOT")
+    item = EvidenceItem.objects.get(pk=resp.data["id"])
+    assert resp.data["thumbnail_url"].endswith(f"/api/evidence/{item.id}/thumbnail/")
+    assert resp.data["preview_url"].endswith(f"/api/evidence/{item.id}/preview/")
+
+    thumb = derivatives.derivative_name(item.file.name, "thumb")
+    preview = derivatives.derivative_name(item.file.name, "preview")
+    assert thumb.startswith(item.file.name.rsplit(".", 1)[0])  # next to the original
+    assert stored_size(thumb) == ("JPEG", "RGB", (256, 128))
+    assert stored_size(preview) == ("JPEG", "RGB", (1280, 640))
+
+    resp = client.get(resp.data["thumbnail_url"])
+    assert resp.status_code == 200 and resp["Content-Type"] == "image/jpeg"
+    assert resp["Content-Disposition"].startswith("inline")
+    assert Image.open(io.BytesIO(b"".join(resp.streaming_content))).size == (256, 128)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_missing_derivatives_are_regenerated_on_request(client, indicator, media):
+    item_id = upload(client, indicator, "photo.jpg", image_bytes((640, 480), "JPEG", "RGB")).data["id"]
+    item = EvidenceItem.objects.get(pk=item_id)
+    preview = derivatives.derivative_name(item.file.name, "preview")
+    default_storage.delete(preview)
+
+    resp = client.get(f"/api/evidence/{item_id}/preview/")
+    assert resp.status_code == 200
+    assert stored_size(preview) == ("JPEG", "RGB", (640, 480))  # never enlarged
+
+
+@pytest.mark.django_db(transaction=True)
+def test_photos_are_turned_upright(client, indicator, media):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # orientation: rotate 90 degrees clockwise
+    item_id = upload(client, indicator, "phone.jpg", image_bytes((400, 200), "JPEG", "RGB", exif=exif.tobytes())).data["id"]
+    name = EvidenceItem.objects.get(pk=item_id).file.name
+    assert stored_size(derivatives.derivative_name(name, "thumb"))[2] == (128, 256)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_background_pool(client, indicator, media, settings):
+    settings.EVIDENCE_DERIVATIVE_WORKERS = 1
+    name = EvidenceItem.objects.get(pk=upload(client, indicator, "a.png", image_bytes((50, 50))).data["id"]).file.name
+    derivatives._executor.submit(lambda: None).result(timeout=10)  # one thread: the upload's job ran first
+    assert default_storage.exists(derivatives.derivative_name(name, "thumb"))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_derivatives_go_with_the_last_reference(client, indicator, media):
+    first = upload(client, indicator, "a.png", image_bytes((50, 50))).data["id"]
+    second = upload(client, indicator, "b.png", image_bytes((50, 50))).data["id"]
+    thumb = derivatives.derivative_name(EvidenceItem.objects.get(pk=first).file.name, "thumb")
+    client.delete(f"/api/evidence/{first}/")
+    assert default_storage.exists(thumb)
+    client.delete(f"/api/evidence/{second}/")
+    assert not default_storage.exists(thumb)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pdfs_and_notes(client, indicator, media, monkeypatch):
+    note = client.post("/api/evidence/", {"indicator": str(indicator.id), "type": "NOTE", "note_text": "n"}, format="json")
+    assert note.data["thumbnail_url"] is None and note.data["preview_url"] is None
+    assert client.get(f"/api/evidence/{note.data['id']}/thumbnail/").status_code == 404
+
+    monkeypatch.setattr(derivatives, "pdf_rasterizer_available", lambda: False)
+    pdf = upload(client, indicator, "scan.pdf", b"%PDF-1.4\n", kind="FILE").data
+    assert pdf["thumbnail_url"] is None
+    assert client.get(f"/api/evidence/{pdf['id']}/thumbnail/").status_code == 404
+
+
+@pytest.mark.skipif(shutil.which("pdftoppm") is None, reason="poppler's pdftoppm is not installed")
+@pytest.mark.django_db(transaction=True)
+def test_pdf_first_page(client, indicator, media):
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    page = canvas.Canvas(buf, pagesize=(600, 800))
+    page.drawString(100, 700, "Evidence")
+    page.save()
+    item_id = upload(client, indicator, "scan.pdf", buf.getvalue(), kind="FILE").data["id"]
+    name = EvidenceItem.objects.get(pk=item_id).file.name
+    assert stored_size(derivatives.derivative_name(name, "thumb"))[2] == (192, 256)
@@ -0,0 +1,77 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from core.models import AuditLog, EvidenceItem
+
+CONTENT = b"%PDF-1.4 0123456789abcdef"
+
+
+@pytest.fixture
+def role():
+    return "Reviewer"
+
+
+@pytest.fixture
+def evidence(media, indicator):
+    return EvidenceItem.objects.create(
+        indicator=indicator, type="FILE", file=SimpleUploadedFile("scan.pdf", CONTENT)
+    )
+
+
+def url(item):
+    return f"/api/evidence/{item.id}/download/"
+
+
+def body(resp):
+    return b"".join(resp.streaming_content)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_full_download_streams_with_validators(client, evidence):
+    resp = client.get(url(evidence))
+    assert resp.status_code == 200
+    assert resp.streaming
+    assert body(resp) == CONTENT
+    assert resp["Content-Length"] == str(len(CONTENT))
+    assert resp["Content-Type"] == "application/pdf"
+    assert resp["Accept-Ranges"] == "bytes"
+    assert resp["ETag"] and resp["Last-Modified"]
+    assert "attachment" in resp["Content-Disposition"]
+    assert AuditLog.objects.filter(action="DOWNLOAD_EVIDENCE", entity_id=str(evidence.id)).count() == 1
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("bytes=2-5", CONTENT[2:6]),
+    ("bytes=20-", CONTENT[20:]),
+    ("bytes=-4", CONTENT[-4:]),
+    ("bytes=10-9999", CONTENT[10:]),
+])
+def test_range_requests(client, evidence, header, expected):
+    resp = client.get(url(evidence), HTTP_RANGE=header)
+    assert resp.status_code == 206
+    assert body(resp) == expected
+    assert resp["Content-Length"] == str(len(expected))
+    start = CONTENT.index(expected)
+    assert resp["Content-Range"] == f"bytes {start}-{start + len(expected) - 1}/{len(CONTENT)}"
+
+
+def test_unsatisfiable_range(client, evidence):
+    resp = client.get(url(evidence), HTTP_RANGE="bytes=500-600")
+    assert resp.status_code == 416
+    assert resp["Content-Range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_stale_if_range_serves_full_file(client, evidence):
+    resp = client.get(url(evidence), HTTP_RANGE="bytes=0-3", HTTP_IF_RANGE='"stale"')
+    assert resp.status_code == 200
+    assert body(resp) == CONTENT
+
+
+@pytest.mark.django_db(transaction=True)
+def test_conditional_requests_return_not_modified(client, evidence):
+    first = client.get(url(evidence))
+    resp = client.get(url(evidence), HTTP_IF_NONE_MATCH=first["ETag"])
+    assert resp.status_code == 304
+    resp = client.get(url(evidence), HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+    assert resp.status_code == 304
+    assert AuditLog.objects.filter(action="DOWNLOAD_EVIDENCE").count() == 1
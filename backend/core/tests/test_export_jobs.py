@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from core import exports
+from core.exports import claim_next_job, purge_expired, run_job
+from core.models import AuditLog, ComplianceRecord, EvidenceItem, Indicator, SnapshotExportJob
+
+JOBS_URL = "/api/audit/snapshot/export-jobs/"
+
+# Workers write artifacts under MEDIA_ROOT.
+pytestmark = pytest.mark.usefixtures("media")
+
+
+@pytest.fixture
+def role():
+    return "Reviewer"
+
+
+@pytest.fixture
+def indicators(db):
+    rows = [Indicator.objects.create(section="S", standard=f"STD{i}", indicator_text=f"I{i}") for i in range(3)]
+    ComplianceRecord.objects.create(indicator=rows[0])
+    return rows
+
+
+def body(resp):
+    return b"".join(resp.streaming_content)
+
+
+def test_csv_export_job_lifecycle(client, indicators, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = client.post(JOBS_URL, {"format": "csv", "section": "S"}, format="json")
+    assert resp.status_code == 202
+    job = resp.json()
+    assert job["status"] == "QUEUED" and job["download_url"] is None
+    assert AuditLog.objects.filter(action="EXPORT_SNAPSHOT", entity_id=job["id"]).exists()
+
+    call_command("run_export_jobs", "--once", stdout=io.StringIO())
+
+    job = client.get(f"{JOBS_URL}{job['id']}/").json()
+    assert job["status"] == "DONE"
+    assert job["progress"] == 100 and job["rows_total"] == 3 and job["rows_written"] == 3
+    download = client.get(job["download_url"])
+    assert download.status_code == 200
+    rows = list(csv.reader(io.StringIO(body(download).decode("utf-8"))))
+    assert rows[0] == ["id", "section", "standard", "status", "due_date"]
+    assert sorted(r[2] for r in rows[1:]) == ["STD0", "STD1", "STD2"]
+
+
+def test_json_export_matches_snapshot(client, indicators):
+    job_id = client.post(JOBS_URL, {"format": "json"}, format="json").json()["id"]
+    run_job(claim_next_job())
+    download = client.get(f"{JOBS_URL}{job_id}/download/")
+    data = json.loads(body(download))
+    snapshot = client.get("/api/audit/snapshot/").json()
+    assert data["indicators"] == snapshot["indicators"]
+    assert data["summary"] == snapshot["summary"]
+
+
+@pytest.mark.parametrize("write", ["compliance", "evidence-edit"])
+def test_identical_request_reuses_artifact_until_data_changes(client, indicators, write, django_capture_on_commit_callbacks):
+    evidence = EvidenceItem.objects.create(indicator=indicators[0], type="NOTE", note_text="before")
+    first = client.post(JOBS_URL, {"format": "csv"}, format="json").json()
+    # Still queued: the same job is handed out instead of queueing a duplicate.
+    assert client.post(JOBS_URL, {"format": "csv"}, format="json").json()["id"] == first["id"]
+    run_job(claim_next_job())
+
+    again = client.post(JOBS_URL, {"format": "csv", "q": ""}, format="json")
+    assert again.status_code == 200
+    assert again.json()["id"] == first["id"] and again.json()["download_url"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        if write == "compliance":
+            ComplianceRecord.objects.create(indicator=indicators[1])
+        else:
+            # An in-place edit moves no count or timestamp, but still commits a new version.
+            evidence.note_text = "after"
+            evidence.save()
+    changed = client.post(JOBS_URL, {"format": "csv"}, format="json")
+    assert changed.status_code == 202 and changed.json()["id"] != first["id"]
+
+
+def test_jobs_are_claimed_once_and_stale_claims_retaken(client, indicators, settings):
+    job_id = client.post(JOBS_URL, {}, format="json").json()["id"]
+    claimed = claim_next_job()
+    assert str(claimed.pk) == job_id and claimed.attempts == 1
+    assert claim_next_job() is None
+
+    later = timezone.now() + timedelta(seconds=settings.EXPORT_JOB_STALE_SECONDS + 1)
+    retaken = claim_next_job(now=later)
+    assert str(retaken.pk) == job_id and retaken.attempts == 2
+
+
+@pytest.mark.parametrize("stall", ["writing", "storing"])
+def test_worker_that_lost_its_claim_discards_its_artifact(client, indicators, media, settings, monkeypatch, stall):
+    job_id = client.post(JOBS_URL, {}, format="json").json()["id"]
+    later = timezone.now() + timedelta(seconds=settings.EXPORT_JOB_STALE_SECONDS + 1)
+    takeover = []
+
+    def stalled(original):
+        # The first worker goes quiet past the stale window and a second one claims the job.
+        def run(*args, **kwargs):
+            if not takeover:
+                takeover.append(claim_next_job(now=later))
+            return original(*args, **kwargs)
+        return run
+
+    if stall == "writing":
+        monkeypatch.setitem(exports.WRITERS, "csv", stalled(exports.WRITERS["csv"]))
+    else:
+        storage = SnapshotExportJob._meta.get_field("artifact").storage
+        monkeypatch.setattr(storage, "save", stalled(storage.save))
+    job = run_job(claim_next_job())
+    assert job.status == "RUNNING" and not job.artifact
+    assert [p for p in media.rglob("*") if p.is_file()] == []
+
+    monkeypatch.undo()
+    job = run_job(takeover[0])
+    assert str(job.pk) == job_id and job.status == "DONE" and job.attempts == 2
+    assert [p for p in media.rglob("*") if p.is_file()] == [media / job.artifact.name]
+
+
+def test_failed_job_reports_error(client, indicators, monkeypatch):
+    job_id = client.post(JOBS_URL, {}, format="json").json()["id"]
+
+    def boom(*args):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setitem(exports.WRITERS, "csv", boom)
+    run_job(claim_next_job())
+    job = client.get(f"{JOBS_URL}{job_id}/").json()
+    assert job["status"] == "FAILED" and job["error"] == "disk full"
+    assert client.get(f"{JOBS_URL}{job_id}/download/").status_code == 409
+
+
+def test_expired_artifacts_are_purged(client, indicators, media):
+    job_id = client.post(JOBS_URL, {}, format="json").json()["id"]
+    job = run_job(claim_next_job())
+    path = job.artifact.path
+    SnapshotExportJob.objects.filter(pk=job.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    assert purge_expired() == 1
+    assert not (media / path).exists()
+    assert client.get(f"{JOBS_URL}{job_id}/download/").status_code == 410
+    assert client.post(JOBS_URL, {}, format="json").json()["id"] != job_id
+
+
+def test_unsupported_format_rejected(client, monkeypatch):
+    assert client.post(JOBS_URL, {"format": "pdf"}, format="json").status_code == 400
+    monkeypatch.setattr("core.views.xlsx_available", lambda: False)
+    assert client.post(JOBS_URL, {"format": "xlsx"}, format="json").status_code == 400
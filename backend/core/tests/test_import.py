@@ -0,0 +1,85 @@
+import io
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from core.importers import import_indicators_csv
+from core.models import AuditLog, Indicator, Project
+
+CSV = (
+    "Section,Standard,Indicator,Evidence Required,Responsible Person\n"
+    "S1,STD1,Hand hygiene audit,Checklist,Nurse\n"
+    "S1,STD2,Waste segregation,,\n"
+    "S2,STD1,Fire drill,Drill log,Admin\n"
+)
+
+
+def run(text, project=None):
+    return import_indicators_csv(io.StringIO(text), project=project)
+
+
+@pytest.mark.django_db
+def test_import_creates_then_reimport_is_unchanged():
+    report = run(CSV)
+    assert (report.created, report.updated, report.unchanged, report.skipped) == (3, 0, 0, 0)
+    report = run(CSV)
+    assert (report.created, report.updated, report.unchanged, report.skipped) == (0, 0, 3, 0)
+    assert Indicator.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_import_updates_changed_rows_and_reports_skips():
+    run(CSV)
+    changed = CSV.replace("Checklist,Nurse", "Checklist v2,Matron") + "S3,,Missing standard\n" + "S2,STD1,Fire drill,Drill log,Admin\n"
+    report = run(changed)
+    assert (report.rows_total, report.created, report.updated, report.unchanged, report.skipped) == (5, 0, 1, 2, 2)
+    assert "Row 4: Missing required fields" in report.errors[0]
+    assert "Row 5: Duplicate of row 3" in report.errors[1]
+    ind = Indicator.objects.get(indicator_text="Hand hygiene audit")
+    assert (ind.evidence_required_text, ind.responsible_person) == ("Checklist v2", "Matron")
+
+
+@pytest.mark.django_db
+def test_upsert_key_includes_project():
+    project = Project.objects.create(name="PHC A")
+    run(CSV)
+    report = run(CSV, project=project)
+    assert report.created == 3
+    assert Indicator.objects.filter(project=project).count() == 3
+
+
+@pytest.mark.django_db
+def test_failed_import_leaves_catalog_untouched(monkeypatch):
+    run(CSV)
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(Indicator.objects, "bulk_update", boom)
+    with pytest.raises(RuntimeError):
+        run(CSV.replace("Nurse", "Matron") + "S9,STD9,New indicator,,\n")
+    assert Indicator.objects.count() == 3
+    assert Indicator.objects.get(indicator_text="Hand hygiene audit").responsible_person == "Nurse"
+
+
+@pytest.mark.django_db
+def test_api_and_command_share_the_engine(tmp_path, django_capture_on_commit_callbacks):
+    admin = User.objects.create_user(username="admin", password="pass", is_superuser=True)
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = client.post("/api/indicators/import/", {"file": SimpleUploadedFile("i.csv", CSV.encode("utf-8"))})
+    assert resp.status_code == 200
+    assert resp.json()["created"] == 3
+    log = AuditLog.objects.get(action="IMPORT")
+    assert log.metadata["created"] == 3
+
+    path = tmp_path / "i.csv"
+    path.write_text(CSV, encoding="utf-8")
+    out = io.StringIO()
+    call_command("import_indicators", path=str(path), stdout=out)
+    assert "0 created, 0 updated, 3 unchanged" in out.getvalue()
+    assert Indicator.objects.count() == 3
@@ -0,0 +1,133 @@
+import json
+import multiprocessing
+import re
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.importers import import_indicators
+from core.models import Indicator
+
+METRICS_URL = "/api/metrics/"
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    metrics.store._pid = None  # start this test with empty in-memory totals
+    return tmp_path
+
+
+@pytest.fixture
+def role():
+    return "Admin"
+
+
+def scrape(client, **extra):
+    resp = client.get(METRICS_URL, **extra)
+    assert resp.status_code == 200, resp.status_code
+    assert resp["Content-Type"].startswith("text/plain; version=0.0.4")
+    return resp.content.decode()
+
+
+def sample(text, name, **labels):
+    wanted = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = "^" + re.escape(f"accredcheck_{name}{{{wanted}}}" if labels else f"accredcheck_{name}") + r" (\S+)$"
+    match = re.search(pattern, text, re.M)
+    return float(match.group(1)) if match else None
+
+
+def test_request_counts_latency_and_queries_per_view(client):
+    Indicator.objects.create(section="S", standard="St", indicator_text="I")
+    client.get("/api/indicators/")
+    client.get("/api/indicators/")
+    client.get("/api/indicators/not-a-uuid/")
+
+    text = scrape(client)
+    assert sample(text, "http_requests_total", method="GET", status="2xx", view="indicator.list") == 2
+    assert sample(text, "http_requests_total", method="GET", status="4xx", view="indicator.retrieve") == 1
+    assert sample(text, "http_request_duration_seconds_count", view="indicator.list") == 2
+    assert sample(text, "http_request_duration_seconds_bucket", view="indicator.list", le="+Inf") == 2
+    assert sample(text, "http_request_queries_bucket", view="indicator.list", le="500") == 2
+    assert sample(text, "http_request_queries_sum", view="indicator.list") > 0
+    assert "# TYPE accredcheck_http_request_duration_seconds histogram" in text
+    assert sample(text, "db_connections_open", database="default") == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_audit_evidence_and_import_metrics(client):
+    indicator = Indicator.objects.create(section="S", standard="St", indicator_text="I")
+    resp = client.post("/api/evidence/", {"indicator": str(indicator.pk), "type": "FILE", "file": SimpleUploadedFile("a.pdf", b"x" * 300)})
+    assert resp.status_code == 201
+    b"".join(client.get(f"/api/evidence/{resp.json()['id']}/download/", HTTP_RANGE="bytes=0-99").streaming_content)
+    import_indicators([
+        {"Section": "S", "Standard": "St2", "Indicator": "New"},
+        {"Section": "", "Standard": "St3", "Indicator": "Bad"},
+    ])
+
+    text = scrape(client)
+    assert sample(text, "evidence_uploaded_bytes_total") == 300
+    assert sample(text, "evidence_downloaded_bytes_total") == 100
+    assert sample(text, "audit_rows_written_total", mode="buffered") == 2
+    assert sample(text, "audit_write_seconds_count", mode="buffered") == 2
+    assert sample(text, "import_rows_total", result="created") == 1
+    assert sample(text, "import_rows_total", result="skipped") == 1
+    assert sample(text, "import_duration_seconds_count") == 1
+
+
+def _worker():
+    metrics.inc("import_rows_total", {"result": "created"}, 5)
+    metrics.store.flush()
+
+
+def test_totals_are_summed_across_worker_processes(client, metrics_dir):
+    metrics.inc("import_rows_total", {"result": "created"}, 2)
+    process = multiprocessing.get_context("fork").Process(target=_worker)
+    process.start()
+    process.join()
+    # A worker that has exited: its counters still count, its gauges no longer do.
+    (metrics_dir / "999999999-1.json").write_text(json.dumps({
+        "pid": 999999999,
+        "started": 1,
+        "counters": [["import_rows_total", {"result": "created"}, 10]],
+        "histograms": [],
+        "gauges": [["db_connections_open", {"database": "default"}, 1]],
+    }))
+
+    text = scrape(client)
+    assert process.exitcode == 0
+    assert sample(text, "import_rows_total", result="created") == 17
+    assert sample(text, "db_connections_open", database="default") == 1
+    # Both exited workers were folded into one file, and count once.
+    own = f"{metrics.store._pid}-{metrics.store._started}.json"
+    assert sorted(path.name for path in metrics_dir.glob("*.json")) == sorted([own, metrics.EXITED])
+    assert sample(scrape(client), "import_rows_total", result="created") == 17
+
+
+def test_a_reused_pid_does_not_take_over_a_dead_workers_file(client, metrics_dir):
+    metrics.inc("import_rows_total", {"result": "created"}, 1)
+    metrics.store.flush()
+    # Written by an earlier process that had this pid.
+    (metrics_dir / f"{metrics.store._pid}-0.json").write_text(json.dumps({
+        "pid": metrics.store._pid,
+        "started": 0,
+        "counters": [["import_rows_total", {"result": "created"}, 4]],
+        "histograms": [],
+        "gauges": [["db_connections_open", {"database": "default"}, 1]],
+    }))
+
+    text = scrape(client)
+    assert sample(text, "import_rows_total", result="created") == 5
+    assert sample(text, "db_connections_open", database="default") == 1
+    assert not (metrics_dir / f"{metrics.store._pid}-0.json").exists()
+
+
+def test_scrapes_are_limited_to_the_allowlist(client, settings):
+    assert client.get(METRICS_URL, REMOTE_ADDR="10.1.2.3").status_code == 403
+    assert client.get(METRICS_URL, REMOTE_ADDR="10.1.2.3", HTTP_X_FORWARDED_FOR="127.0.0.1").status_code == 403
+    settings.METRICS_ALLOWED_IPS = ["10.0.0.0/8"]
+    scrape(client, REMOTE_ADDR="10.1.2.3")
+    assert APIClient().get(METRICS_URL, REMOTE_ADDR="127.0.0.1").status_code == 403
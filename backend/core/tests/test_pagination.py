@@ -0,0 +1,123 @@
+import pytest
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import ComplianceRecord, Indicator
+
+
+@pytest.fixture
+def reviewer(db):
+    user = User.objects.create_user(username="reviewer", password="pass")
+    user.groups.add(Group.objects.get_or_create(name="Reviewer")[0])
+    return user
+
+
+def walk(client, url, params):
+    pages, resp = [], client.get(url, params)
+    while True:
+        assert resp.status_code == 200
+        data = resp.json()
+        pages.append(data)
+        if not data["next"]:
+            return pages
+        resp = client.get(data["next"])
+
+
+@pytest.mark.django_db
+def test_indicator_cursor_walk_covers_ties_without_count_or_offset():
+    for section in ("A", "B"):
+        for i in range(7):
+            Indicator.objects.create(section=section, standard="STD", indicator_text=f"{section}{i}")
+    client = APIClient()
+    with CaptureQueriesContext(connection) as ctx:
+        pages = walk(client, "/api/indicators/", {"page_size": 4})
+    sql = " ".join(q["sql"].upper() for q in ctx.captured_queries)
+    assert "COUNT(" not in sql and "OFFSET" not in sql
+
+    ids = [row["id"] for page in pages for row in page["results"]]
+    expected = [str(pk) for pk in Indicator.objects.order_by("section", "standard", "id").values_list("id", flat=True)]
+    assert ids == expected
+    assert len(pages) == 4
+
+    back = client.get(pages[2]["previous"]).json()
+    assert [row["id"] for row in back["results"]] == expected[4:8]
+
+
+@pytest.mark.django_db
+def test_compliance_cursor_follows_mixed_direction_ordering(reviewer):
+    ind = Indicator.objects.create(section="S", standard="STD", indicator_text="I")
+    today = timezone.localdate()
+    for days in (0, 0, 0, 5, 5, 9):
+        ComplianceRecord.objects.create(indicator=ind, compliant_on=today - timezone.timedelta(days=days))
+    client = APIClient()
+    client.force_authenticate(user=reviewer)
+    pages = walk(client, "/api/compliance/", {"page_size": 2})
+    ids = [row["id"] for page in pages for row in page["results"]]
+    expected = ComplianceRecord.objects.order_by("-compliant_on", "-created_at", "id").values_list("id", flat=True)
+    assert ids == [str(pk) for pk in expected]
+
+
+@pytest.mark.django_db
+def test_page_size_is_capped(settings):
+    settings.API_MAX_PAGE_SIZE = 3
+    for i in range(5):
+        Indicator.objects.create(section="S", standard=f"STD{i}", indicator_text="I")
+    resp = APIClient().get("/api/indicators/", {"page_size": 1000})
+    assert len(resp.json()["results"]) == 3
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_is_rejected():
+    resp = APIClient().get("/api/indicators/", {"cursor": "not-a-cursor"})
+    assert resp.status_code == 404
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("ordering", ["next_due_on", "-due_status"])
+def test_indicator_cursor_walk_with_due_ordering(ordering):
+    today = timezone.localdate()
+    for i in range(9):
+        ind = Indicator.objects.create(section="S", standard=f"STD{i % 3}", indicator_text="I")
+        if i % 3:
+            ComplianceRecord.objects.create(indicator=ind, compliant_on=today - timezone.timedelta(days=i), valid_until=today + timezone.timedelta(days=i % 2))
+    pages = walk(APIClient(), "/api/indicators/", {"page_size": 2, "ordering": ordering})
+    ids = [row["id"] for page in pages for row in page["results"]]
+    assert sorted(ids) == sorted(str(pk) for pk in Indicator.objects.values_list("id", flat=True))
+    assert len(ids) == len(set(ids))
+
+
+@pytest.mark.django_db
+def test_audit_logs_cursor_pages_in_timestamp_order(reviewer):
+    from core.models import AuditLog
+    now = timezone.now()
+    for i in range(7):
+        AuditLog.objects.create(action="CREATE", entity_type="Indicator", entity_id=str(i), summary=f"log {i}")
+    AuditLog.objects.update(timestamp=now)  # force ties on timestamp
+    client = APIClient()
+    client.force_authenticate(user=reviewer)
+    with CaptureQueriesContext(connection) as ctx:
+        pages = walk(client, "/api/audit/logs/", {"page_size": 3, "entity_type": "Indicator"})
+    assert all("COUNT(" not in q["sql"].upper() for q in ctx.captured_queries)
+    ids = [row["id"] for page in pages for row in page["results"]]
+    expected = AuditLog.objects.order_by("-timestamp", "-id").values_list("id", flat=True)
+    assert ids == [str(pk) for pk in expected]
+
+
+@pytest.mark.django_db
+def test_audit_log_counts_are_optional_and_cached(reviewer):
+    from core.models import AuditLog
+    for i in range(4):
+        AuditLog.objects.create(action="CREATE", entity_type="Indicator", entity_id=str(i), summary="x")
+    client = APIClient()
+    client.force_authenticate(user=reviewer)
+    data = client.get("/api/audit/logs/", {"count": "estimate"}).json()
+    assert data["count_estimate"] == 4 and data["count_is_exact"] is True
+
+    first = client.get("/api/audit/logs/count/", {"action": "CREATE"}).json()
+    AuditLog.objects.create(action="CREATE", entity_type="Indicator", entity_id="5", summary="x")
+    second = client.get("/api/audit/logs/count/", {"action": "CREATE"}).json()
+    assert (first["count"], first["cached"]) == (4, False)
+    assert (second["count"], second["cached"]) == (4, True)
@@ -0,0 +1,216 @@
+"""Query budgets for every route in core.urls' router.
+
+Each endpoint is requested against 10 and then 1,000 rows per table. The query
+count must be the same at both sizes (a per-row query would add ~990) and must
+stay within the endpoint's declared budget. Failures list the SQL that ran,
+grouped by statement shape, most repeated first. A new route needs an entry in
+ENDPOINTS before this module passes.
+"""
+import hashlib
+import io
+import re
+from collections import Counter
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from core import uploads
+from core.models import (
+    AuditLog, ComplianceRecord, EvidenceItem, Indicator, Project, SnapshotDataVersion, SnapshotExportJob, UploadSession,
+)
+from core.services import refresh_compliance_state
+from core.urls import router
+
+SIZES = (10, 1000)
+
+# route name: (method, path, budget). {indicator}, {compliance}, {evidence}, {user},
+# {project}, {job}, {upload} and {image} are filled in with rows created for the test.
+ENDPOINTS = {
+    "api-root": ("get", "/api/", 0),
+    "indicator-list": ("get", "/api/indicators/?page_size=200", 1),
+    "indicator-detail": ("get", "/api/indicators/{indicator}/", 1),
+    "indicator-import-csv": ("post", "/api/indicators/import/", 6),
+    "compliance-list": ("get", "/api/compliance/?page_size=200", 1),
+    "compliance-detail": ("get", "/api/compliance/{compliance}/", 1),
+    "evidence-list": ("get", "/api/evidence/?page_size=200", 1),
+    "evidence-detail": ("get", "/api/evidence/{evidence}/", 1),
+    "evidence-download": ("get", "/api/evidence/{evidence}/download/", 4),
+    "evidence-thumbnail": ("get", "/api/evidence/{image}/thumbnail/", 1),
+    "evidence-preview": ("get", "/api/evidence/{image}/preview/", 1),
+    "evidence-upload-list": ("post", "/api/evidence-uploads/", 2),
+    "evidence-upload-detail": ("get", "/api/evidence-uploads/{upload}/", 1),
+    "evidence-upload-chunk": ("put", "/api/evidence-uploads/{upload}/chunks/0/", 2),
+    "evidence-upload-finalise": ("post", "/api/evidence-uploads/{upload}/finalise/", 11),
+    "user-list": ("get", "/api/users/", 2),
+    "user-detail": ("get", "/api/users/{user}/", 2),
+    "user-assign-role": ("post", "/api/users/{user}/assign-role/", 6),
+    "user-remove-role": ("post", "/api/users/{user}/remove-role/", 6),
+    "audit-logs": ("get", "/api/audit/logs/?page_size=200", 2),
+    "audit-logs-count": ("get", "/api/audit/logs/count/", 2),
+    "audit-export-logs": ("get", "/api/audit/logs/export/", 5),
+    "audit-summary": ("get", "/api/audit/summary/?period=year", 3),
+    "audit-snapshot": ("get", "/api/audit/snapshot/", 4),
+    "audit-snapshot-export": ("get", "/api/audit/snapshot/export/", 6),
+    "audit-snapshot-export-jobs": ("post", "/api/audit/snapshot/export-jobs/", 3),
+    "audit-snapshot-export-job": ("get", "/api/audit/snapshot/export-jobs/{job}/", 1),
+    "audit-snapshot-export-job-download": ("get", "/api/audit/snapshot/export-jobs/{job}/download/", 1),
+    "audit-snapshot-cache-stats": ("get", "/api/audit/snapshot/cache-stats/", 1),
+    "audit-writer-stats": ("get", "/api/audit/writer-stats/", 0),
+    "project-list": ("get", "/api/projects/", 1),
+    "project-detail": ("get", "/api/projects/{project}/", 1),
+}
+
+UPLOAD_CHUNK = b"%PDF-1.4 chunked upload\n"
+
+POST_DATA = {
+    "evidence-upload-list": lambda: {"indicator": str(Indicator.objects.earliest("created_at").pk), "type": "FILE", "filename": "scan.pdf", "size": 1},
+    "indicator-import-csv": lambda: {"file": SimpleUploadedFile("i.csv", b"Section,Standard,Indicator\nS,Budget,Row\n")},
+    "user-assign-role": lambda: {"role": "Reviewer"},
+    "user-remove-role": lambda: {"role": "Reviewer"},
+    "audit-snapshot-export-jobs": lambda: {"format": "csv"},
+}
+
+
+def open_upload(owner):
+    """An upload session with its only chunk received, ready to finalise."""
+    upload = UploadSession.objects.create(
+        indicator=Indicator.objects.earliest("created_at"), filename="scan.pdf", size=len(UPLOAD_CHUNK),
+        chunk_size=uploads.MIN_CHUNK_SIZE, created_by=owner, expires_at=uploads.expiry(),
+    )
+    uploads.write_chunk(upload, 0, io.BytesIO(UPLOAD_CHUNK), hashlib.sha256(UPLOAD_CHUNK).hexdigest())
+    return upload
+
+
+def change_data():
+    # What a committed write does (core.snapshots): the queued export can no longer be reused.
+    SnapshotDataVersion.objects.update(version=F("version") + 1)
+
+
+# One-shot endpoints: fresh state before every run, so each measures the full path
+# (assembling an upload, queueing an export) rather than the replay shortcut.
+FRESH = {
+    "evidence-upload-finalise": lambda ids, owner: ids.update(upload=open_upload(owner).pk),
+    "audit-snapshot-export-jobs": lambda ids, owner: change_data(),
+}
+
+
+def grow(size, actors):
+    """Top every table up to `size` rows."""
+    start = Indicator.objects.count()
+    if start >= size:
+        return
+    users = User.objects.bulk_create([User(username=f"user{i}", password="!") for i in range(start, size)])
+    reviewer = Group.objects.get_or_create(name="Reviewer")[0]
+    User.groups.through.objects.bulk_create([User.groups.through(user=u, group=reviewer) for u in users])
+    actors.extend(users)
+    projects = Project.objects.bulk_create([Project(name=f"Project {i}") for i in range(start, size)])
+    indicators = Indicator.objects.bulk_create([
+        Indicator(project=projects[i % len(projects)], section=f"S{i % 7}", standard=f"STD{i:05d}", indicator_text=f"I{i}", frequency="MONTHLY")
+        for i in range(size - start)
+    ])
+    today = timezone.localdate()
+    records = ComplianceRecord.objects.bulk_create([
+        ComplianceRecord(indicator=ind, compliant_on=today - timedelta(days=i % 40), valid_until=today + timedelta(days=30 - i % 40), created_by=actors[i % len(actors)])
+        for i, ind in enumerate(indicators)
+    ])
+    EvidenceItem.objects.bulk_create([
+        EvidenceItem(indicator=rec.indicator, compliance_record=rec, type="NOTE", note_text="n", created_by=actors[i % len(actors)])
+        for i, rec in enumerate(records)
+    ])
+    AuditLog.objects.bulk_create([
+        AuditLog(actor=actors[i % len(actors)], action="UPDATE", entity_type="Indicator", entity_id=str(ind.pk), summary=f"Updated {ind.standard}")
+        for i, ind in enumerate(indicators)
+    ])
+    refresh_compliance_state()
+
+
+@pytest.fixture
+def setup(db, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    admin = User.objects.create_user(username="admin", password="p", is_superuser=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+    actors = [admin]
+    grow(SIZES[0], actors)
+
+    indicator = Indicator.objects.earliest("created_at")
+    evidence = EvidenceItem(indicator=indicator, type="FILE", created_by=admin)
+    evidence.file.save("budget.pdf", ContentFile(b"%PDF-1.4\n"))
+    png = io.BytesIO()
+    Image.new("RGB", (400, 300), "teal").save(png, "PNG")
+    image = EvidenceItem(indicator=indicator, type="PHOTO", created_by=admin)
+    image.file.save("budget.png", ContentFile(png.getvalue()))
+    job = SnapshotExportJob(status="DONE", filters={}, filters_digest="x", snapshot_date=timezone.localdate(), expires_at=timezone.now() + timedelta(days=1))
+    job.artifact.save("budget.csv", ContentFile(b"a,b\n"))
+    upload = open_upload(admin)
+    ids = {
+        "indicator": indicator.pk, "evidence": evidence.pk, "job": job.pk, "upload": upload.pk, "image": image.pk,
+        "compliance": ComplianceRecord.objects.values_list("pk", flat=True).first(),
+        "user": actors[1].pk, "project": Project.objects.values_list("pk", flat=True).first(),
+    }
+    return client, actors, ids
+
+
+def shape(sql):
+    """The statement with literals replaced, so per-row repeats group together."""
+    return re.sub(r"'[^']*'|\b\d+(\.\d+)?\b", "?", sql)
+
+
+def explain(queries):
+    counts = Counter(shape(sql) for sql in queries)
+    return "\n".join(f"  {count:>5} x {sql[:400]}" for sql, count in counts.most_common())
+
+
+def run(client, name, ids, owner):
+    FRESH.get(name, lambda ids, owner: None)(ids, owner)
+    method, path, _ = ENDPOINTS[name]
+    data = POST_DATA.get(name, lambda: None)()
+    cache.clear()
+    with CaptureQueriesContext(connection) as captured:
+        if method == "post":
+            resp = client.post(path.format(**ids), data)
+        elif method == "put":
+            resp = client.put(
+                path.format(**ids), UPLOAD_CHUNK, content_type="application/octet-stream",
+                HTTP_X_CHUNK_SHA256=hashlib.sha256(UPLOAD_CHUNK).hexdigest(),
+            )
+        else:
+            resp = client.get(path.format(**ids))
+        if resp.streaming:
+            b"".join(resp.streaming_content)
+    assert resp.status_code < 400, (name, resp.status_code, getattr(resp, "data", None))
+    return [query["sql"] for query in captured.captured_queries]
+
+
+def test_every_route_has_a_budget():
+    names = {pattern.name for pattern in router.urls}
+    assert names - set(ENDPOINTS) == set(), "declare a query budget for new routes in ENDPOINTS"
+    assert set(ENDPOINTS) - names == set()
+
+
+@pytest.mark.parametrize("name", ENDPOINTS)
+def test_query_count_is_flat_and_within_budget(setup, name):
+    client, actors, ids = setup
+    budget = ENDPOINTS[name][2]
+    run(client, name, ids, actors[0])  # first use builds lazy state (compliance trend)
+    small = run(client, name, ids, actors[0])
+    grow(SIZES[1], actors)
+    large = run(client, name, ids, actors[0])
+
+    if len(large) != len(small):
+        pytest.fail(
+            f"{name}: {len(small)} queries with {SIZES[0]} rows but {len(large)} with {SIZES[1]}; "
+            f"queries at {SIZES[1]} rows:\n{explain(large)}"
+        )
+    if len(large) > budget:
+        pytest.fail(f"{name}: {len(large)} queries, budget is {budget}:\n{explain(large)}")
@@ -0,0 +1,95 @@
+"""EXPLAIN the list queries behind the main endpoints and fail on full table scans.
+
+Tables are tiny in tests, so the planner is pushed towards indexes where it can
+be (enable_seqscan=off on PostgreSQL); a scan that remains means no index fits.
+"""
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from core.models import AuditLog, ComplianceRecord, EvidenceItem, Indicator
+
+APP_TABLES = ("core_indicator", "core_compliancerecord", "core_evidenceitem", "core_auditlog")
+
+
+def full_scans(sql, searched=None):
+    """Tables the plan reads in full; `searched` must also not be walked via an index."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql)
+            plan = cursor.fetchone()[0]
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            nodes, scans = [plan[0]["Plan"]], []
+            while nodes:
+                node = nodes.pop()
+                table = node.get("Relation Name")
+                if node["Node Type"] == "Seq Scan" and table in APP_TABLES:
+                    scans.append(table)
+                elif table == searched and not ("Index Cond" in node or "Recheck Cond" in node):
+                    scans.append(f"{table} (no index condition)")
+                nodes.extend(node.get("Plans", []))
+            return scans
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            details = [row[-1] for row in cursor.fetchall()]
+            return [
+                d for d in details
+                if d.startswith("SCAN ") and d.split()[1] in APP_TABLES
+                and ("USING" not in d or d.split()[1] == searched)
+            ]
+    pytest.skip(f"no plan check for {connection.vendor}")
+
+
+@pytest.fixture
+def admin_client(db):
+    user = User.objects.create_user(username="planner", password="pass", is_superuser=True)
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, user
+
+
+@pytest.mark.django_db
+def test_main_endpoints_do_not_full_scan(admin_client):
+    client, user = admin_client
+    indicator = Indicator.objects.create(section="S", standard="STD", indicator_text="I")
+    ComplianceRecord.objects.create(indicator=indicator)
+    EvidenceItem.objects.create(indicator=indicator, type="NOTE")
+    AuditLog.objects.create(actor=user, action="CREATE", entity_type="Indicator", entity_id=str(indicator.id), summary="s")
+
+    # (url, table the filter must reach through an index lookup rather than an ordered walk)
+    cases = [
+        ("/api/indicators/", None),
+        ("/api/indicators/?is_active=true", None),
+        ("/api/indicators/?due_status=OVERDUE", None),
+        ("/api/indicators/?q=indic", None),
+        (f"/api/indicators/?project={indicator.id}", "core_indicator"),
+        ("/api/compliance/", None),
+        (f"/api/compliance/?indicator={indicator.id}", "core_compliancerecord"),
+        ("/api/evidence/", None),
+        (f"/api/evidence/?indicator={indicator.id}", "core_evidenceitem"),
+        ("/api/audit/logs/", None),
+        (f"/api/audit/logs/?actor={user.id}", "core_auditlog"),
+        ("/api/audit/logs/?action=CREATE", "core_auditlog"),
+        ("/api/audit/logs/?entity_type=Indicator", "core_auditlog"),
+        ("/api/audit/logs/?q=created", "core_auditlog"),
+    ]
+    failures = []
+    for url, searched in cases:
+        with CaptureQueriesContext(connection) as ctx:
+            assert client.get(url).status_code == 200, url
+        # Audit pages that are not filled by the table also consult the (small) archive segment index.
+        selects = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].lstrip().upper().startswith("SELECT") and "core_auditarchivesegment" not in q["sql"]
+        ]
+        assert selects, url
+        # Captured SQL has parameters inlined; re-explain the list query (the last SELECT).
+        scans = full_scans(selects[-1], searched)
+        if scans:
+            failures.append(f"{url}: {scans}")
+    assert not failures, "Full table scans:\n" + "\n".join(failures)
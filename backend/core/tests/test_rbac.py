@@ -76,3 +76,77 @@ class TestRBAC:
         api_client.force_authenticate(user=users_with_roles['reviewer'])
         response = api_client.get(url)
         assert response.status_code == 200
+
+
+@pytest.fixture
+def shared_role_cache(settings):
+    # What a shared cache backend (e.g. Redis) turns on by default.
+    settings.RBAC_ROLE_CACHE_SECONDS = 60
+
+
+@pytest.mark.django_db
+class TestRoleCache:
+    def test_off_without_a_shared_cache(self, settings, users_with_roles):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.permissions import is_admin, is_contributor
+
+        assert not settings.CACHE_IS_SHARED and settings.RBAC_ROLE_CACHE_SECONDS == 0
+        user = User.objects.get(username='contrib_user')
+        with CaptureQueriesContext(connection) as first:
+            assert is_contributor(user) and not is_admin(user)  # memoized on the user object
+        assert len(first) == 1
+        with CaptureQueriesContext(connection) as second:
+            assert is_contributor(User.objects.get(username='contrib_user'))
+        assert len(second) == 2  # the user and their groups: nothing kept between requests
+
+    def test_warm_cache_adds_no_role_queries(self, shared_role_cache, users_with_roles):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from core.permissions import is_admin, is_contributor, is_reviewer
+
+        user = User.objects.get(username='contrib_user')
+        with CaptureQueriesContext(connection) as cold:
+            assert is_contributor(user) and not is_admin(user) and not is_reviewer(user)
+        assert len(cold) == 1
+
+        # A fresh user object per request still hits the cross-request cache.
+        user = User.objects.get(username='contrib_user')
+        with CaptureQueriesContext(connection) as warm:
+            assert is_contributor(user) and not is_admin(user)
+        assert len(warm) == 0
+
+    def test_assign_and_remove_role_take_effect_immediately(self, api_client, users_with_roles):
+        reviewer = users_with_roles['reviewer']
+        client = APIClient()
+        client.force_authenticate(user=reviewer)
+        assert client.post('/api/compliance/', {}).status_code == 403
+
+        api_client.force_authenticate(user=users_with_roles['admin'])
+        resp = api_client.post(f'/api/users/{reviewer.id}/assign-role/', {'role': 'Contributor'})
+        assert resp.status_code == 200
+        assert client.post('/api/compliance/', {}).status_code == 400
+
+        resp = api_client.post(f'/api/users/{reviewer.id}/remove-role/', {'role': 'Contributor'})
+        assert resp.status_code == 200
+        assert client.post('/api/compliance/', {}).status_code == 403
+
+    def test_group_membership_changes_invalidate(self, users_with_roles):
+        from core.permissions import get_roles
+
+        reviewer = users_with_roles['reviewer']
+        assert get_roles(reviewer) == {'Reviewer'}
+        reviewer.groups.add(Group.objects.get(name='Contributor'))
+        assert get_roles(User.objects.get(pk=reviewer.pk)) == {'Reviewer', 'Contributor'}
+
+        Group.objects.get(name='Reviewer').user_set.clear()
+        assert get_roles(User.objects.get(pk=reviewer.pk)) == {'Contributor'}
+
+        contributor = Group.objects.get(name='Contributor')
+        contributor.name = 'Contributors'
+        contributor.save()
+        assert get_roles(User.objects.get(pk=reviewer.pk)) == {'Contributors'}
+
+    def test_user_info_uses_cached_roles(self, api_client, users_with_roles):
+        api_client.force_authenticate(user=users_with_roles['admin'])
+        assert api_client.get('/api/auth/user/').json()['roles'] == ['Admin']
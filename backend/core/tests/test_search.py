@@ -0,0 +1,91 @@
+import pytest
+from django.db import connection
+from rest_framework.test import APIClient
+
+from core.models import Indicator
+from core.search import install_search_index, search_indicators
+
+pytestmark = pytest.mark.skipif(
+    connection.vendor not in ("sqlite", "postgresql"), reason="full-text index needs SQLite FTS5 or PostgreSQL"
+)
+
+
+def found(q, **kwargs):
+    return list(search_indicators(Indicator.objects.all(), q, **kwargs).values_list("standard", flat=True))
+
+
+@pytest.fixture
+def catalog(db):
+    return [
+        Indicator.objects.create(section="Infection Control", standard="IC-1", indicator_text="Hand hygiene audits are documented"),
+        Indicator.objects.create(section="Patient Rights", standard="PR-2", indicator_text="Consent forms mention infection risks"),
+        Indicator.objects.create(section="Facility", standard="FS-3", indicator_text="Fire extinguishers are serviced"),
+    ]
+
+
+def test_prefix_terms_must_all_match(catalog):
+    assert sorted(found("infec")) == ["IC-1", "PR-2"]
+    assert found("hand hyg") == ["IC-1"]
+    assert found("hyg hand") == ["IC-1"]
+    assert found("fire hand") == []
+    assert found("Fire-extinguish") == ["FS-3"]
+
+
+def test_section_and_standard_matches_rank_above_text(catalog):
+    ranked = search_indicators(Indicator.objects.all(), "infection", rank=True).order_by("-search_rank")
+    assert [row.standard for row in ranked] == ["IC-1", "PR-2"]
+
+
+def test_index_follows_every_kind_of_write(catalog):
+    ic, pr, fs = catalog
+    fs.indicator_text = "Sharps containers are replaced"
+    fs.save()
+    assert found("sharps") == ["FS-3"] and found("extinguishers") == []
+
+    Indicator.objects.filter(pk=pr.pk).update(section="Consent")
+    assert found("patient") == [] and found("consent") == ["PR-2"]
+
+    Indicator.objects.bulk_create([Indicator(section="Lab", standard="LB-1", indicator_text="Reagent storage")])
+    ic.indicator_text = "Reagent labels"
+    Indicator.objects.bulk_update([ic], ["indicator_text"])
+    assert sorted(found("reagent")) == ["IC-1", "LB-1"]
+
+    ic.delete()
+    assert found("reagent") == ["LB-1"]
+
+
+def test_search_api_is_ranked_and_paginates_past_the_rank_limit(catalog, settings):
+    for i in range(5):
+        Indicator.objects.create(section="Infection Control", standard=f"IC-{i + 10}", indicator_text="Waste bins")
+    client = APIClient()
+    ranked = client.get("/api/indicators/", {"q": "infection"}).json()["results"]
+    assert ranked[-1]["standard"] == "PR-2"
+
+    settings.SEARCH_RANK_MAX_MATCHES = 2
+    seen, resp = [], client.get("/api/indicators/", {"q": "infection", "page_size": 2}).json()
+    while True:
+        seen += [row["standard"] for row in resp["results"]]
+        if not resp["next"]:
+            break
+        resp = client.get(resp["next"]).json()
+    assert sorted(seen) == sorted(["IC-1", "PR-2"] + [f"IC-{i + 10}" for i in range(5)])
+
+
+def test_snapshot_filter_uses_index(catalog, django_user_model):
+    client = APIClient()
+    client.force_authenticate(django_user_model.objects.create_user(username="admin", password="p", is_superuser=True))
+    rows = client.get("/api/audit/snapshot/", {"q": "hand hyg"}).json()["indicators"]
+    assert [row["standard"] for row in rows] == ["IC-1"]
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite table rebuilds drop triggers")
+def test_install_repairs_dropped_triggers(catalog):
+    with connection.cursor() as cursor:
+        for name in ("core_indicator_fts_ai", "core_indicator_fts_ad", "core_indicator_fts_au"):
+            cursor.execute(f"DROP TRIGGER {name}")
+    Indicator.objects.create(section="Lab", standard="LB-1", indicator_text="Reagent storage")
+    assert found("reagent") == []
+
+    assert install_search_index(connection) is True
+    assert found("reagent") == ["LB-1"]
+    assert install_search_index(connection) is False
@@ -0,0 +1,115 @@
+import io
+from datetime import timedelta
+
+import pytest
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.importers import import_indicators_csv
+from core.models import ComplianceRecord, EvidenceItem, Indicator, SnapshotDataVersion
+from core.snapshots import current_version, snapshot_cache
+
+# The data version is bumped when a write commits.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+@pytest.fixture
+def role():
+    return "Admin"
+
+
+def snapshot(client, **params):
+    resp = client.get("/api/audit/snapshot/", params)
+    assert resp.status_code == 200
+    return resp
+
+
+def test_repeat_snapshot_is_served_from_cache(client):
+    indicator = Indicator.objects.create(section="S", standard="STD", indicator_text="I")
+    first = snapshot(client)
+    assert first["X-Snapshot-Cache"] == "MISS"
+
+    with CaptureQueriesContext(connection) as ctx:
+        second = snapshot(client)
+    assert second["X-Snapshot-Cache"] == "HIT"
+    assert not any("core_indicator" in q["sql"] for q in ctx.captured_queries)
+    assert second.json() == first.json()
+    assert second.json()["indicators"][0]["id"] == str(indicator.id)
+
+
+@pytest.mark.parametrize("write", ["indicator", "compliance", "evidence"])
+def test_writes_invalidate_cached_snapshots(client, write):
+    indicator = Indicator.objects.create(section="S", standard="STD", indicator_text="I", frequency="MONTHLY")
+    assert snapshot(client)["X-Snapshot-Cache"] == "MISS"
+    assert snapshot(client)["X-Snapshot-Cache"] == "HIT"
+
+    if write == "indicator":
+        indicator.section = "T"
+        indicator.save()
+    elif write == "compliance":
+        ComplianceRecord.objects.create(indicator=indicator)
+    else:
+        EvidenceItem.objects.create(indicator=indicator, type="NOTE", note_text="n")
+
+    resp = snapshot(client)
+    assert resp["X-Snapshot-Cache"] == "MISS"
+    data = resp.json()
+    if write == "indicator":
+        assert data["indicators"][0]["section"] == "T"
+    elif write == "compliance":
+        assert data["summary"]["COMPLIANT"] == 1
+    else:
+        assert len(data["evidence"]) == 1
+
+
+def test_version_is_shared_through_the_database(client):
+    Indicator.objects.create(section="S", standard="STD", indicator_text="I")
+    assert snapshot(client)["X-Snapshot-Cache"] == "MISS"
+    # A write committed by another worker only bumps the row; this worker's cache is untouched.
+    SnapshotDataVersion.objects.filter(pk=1).update(version=F("version") + 1)
+    assert snapshot(client)["X-Snapshot-Cache"] == "MISS"
+    assert snapshot(client)["X-Snapshot-Cache"] == "HIT"
+
+
+def test_write_rolled_back_keeps_the_version(client):
+    version = current_version()
+    with pytest.raises(RuntimeError), transaction.atomic():
+        Indicator.objects.create(section="S", standard="STD", indicator_text="I")
+        raise RuntimeError
+    assert current_version() == version
+
+
+def test_csv_import_invalidates_cached_snapshots(client):
+    snapshot(client)
+    import_indicators_csv(io.StringIO("Section,Standard,Indicator\nA,S1,I1\n"))
+    resp = snapshot(client)
+    assert resp["X-Snapshot-Cache"] == "MISS"
+    assert len(resp.json()["indicators"]) == 1
+
+
+def test_day_rollover_recomputes_due_status(client, monkeypatch):
+    indicator = Indicator.objects.create(section="S", standard="STD", indicator_text="I", frequency="DAILY")
+    today = timezone.localdate()
+    ComplianceRecord.objects.create(indicator=indicator, compliant_on=today, valid_until=today + timedelta(days=1))
+    assert snapshot(client).json()["summary"]["OVERDUE"] == 0
+
+    later = today + timedelta(days=2)
+    monkeypatch.setattr(timezone, "localdate", lambda *args, **kwargs: later)
+    resp = snapshot(client)
+    assert resp["X-Snapshot-Cache"] == "MISS"
+    assert resp.json()["summary"]["OVERDUE"] == 1
+
+
+def test_filters_are_normalised_and_stats_reported(client):
+    Indicator.objects.create(section="S", standard="STD", indicator_text="I")
+    before = snapshot_cache.stats()
+    assert snapshot(client, section="S")["X-Snapshot-Cache"] == "MISS"
+    resp = snapshot(client, section=" S ", q="")
+    assert resp["X-Snapshot-Cache"] == "HIT"
+    assert resp.json()["filters"]["section"] == " S "
+
+    stats = client.get("/api/audit/snapshot/cache-stats/").json()
+    assert stats["hits"] == before["hits"] + 1
+    assert stats["misses"] == before["misses"] + 1
+    assert 0 < stats["hit_rate"] <= 1
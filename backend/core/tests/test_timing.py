@@ -0,0 +1,75 @@
+import logging
+import re
+
+import pytest
+
+from core.models import AuditLog, Indicator
+
+SERVER_TIMING = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) queries", serialize;dur=([\d.]+), app;dur=[\d.]+, total;dur=([\d.]+)'
+)
+
+
+@pytest.fixture
+def role():
+    return "Admin"
+
+
+def timing_records(caplog):
+    return [r for r in caplog.records if r.name == "core.timing"]
+
+
+def test_viewset_requests_get_server_timing_and_a_tagged_log_line(client, caplog):
+    for i in range(3):
+        Indicator.objects.create(section="S", standard=f"St{i}", indicator_text="I")
+    caplog.set_level(logging.INFO, logger="core.timing")
+
+    resp = client.get("/api/indicators/")
+    match = SERVER_TIMING.fullmatch(resp["Server-Timing"])
+    assert match and int(match.group(1)) > 0 and float(match.group(3)) >= float(match.group(2))
+
+    record, = timing_records(caplog)
+    assert record.levelno == logging.INFO
+    assert record.timing["view"] == "indicator.list" and record.timing["status"] == 200
+    assert record.timing["queries"] == int(match.group(1))
+
+    caplog.clear()
+    client.get("/api/audit/snapshot/")
+    client.get("/api/health/")
+    assert [r.timing["view"] for r in timing_records(caplog)] == ["audit.snapshot", "health_check"]
+
+
+def test_repeated_statements_are_logged_as_warnings(client, caplog, settings):
+    caplog.set_level(logging.INFO, logger="core.timing")
+    indicator = Indicator.objects.create(section="S", standard="St", indicator_text="I")
+    client.get(f"/api/indicators/{indicator.pk}/")
+    record, = timing_records(caplog)
+    assert record.levelno == logging.INFO and record.timing["repeated_queries"] == 1
+
+    caplog.clear()
+    settings.REQUEST_TIMING_REPEATED_QUERIES = 1
+    client.get(f"/api/indicators/{indicator.pk}/")
+    record, = timing_records(caplog)
+    assert record.levelno == logging.WARNING
+    assert "repeated=1 sql=SELECT" in record.getMessage() and "core_indicator" in record.getMessage()
+
+
+def test_streamed_exports_are_measured_until_the_stream_closes(client, caplog):
+    for i in range(5):
+        AuditLog.objects.create(action="CREATE", entity_type="Indicator", entity_id=str(i), summary=f"row {i}")
+    caplog.set_level(logging.INFO, logger="core.timing")
+
+    resp = client.get("/api/audit/logs/export/")
+    assert "Server-Timing" in resp
+    assert timing_records(caplog) == []
+    b"".join(resp.streaming_content)
+    record, = timing_records(caplog)
+    assert record.timing["view"] == "audit.export_logs" and record.timing["queries"] > 0
+
+
+def test_disabled_middleware_adds_nothing(client, caplog, settings):
+    settings.REQUEST_TIMING_ENABLED = False
+    caplog.set_level(logging.INFO, logger="core.timing")
+    resp = client.get("/api/indicators/")
+    assert resp.status_code == 200 and "Server-Timing" not in resp
+    assert timing_records(caplog) == []
@@ -0,0 +1,188 @@
+import io
+import random
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.importers import import_indicators
+from core.models import ComplianceRecord, ComplianceTrendPoint, Indicator, Project
+from core.services import due_status_for
+from core.trends import STATUSES, indicator_spans, rebuild_trend, sample_days, trend_series
+
+SUMMARY_URL = "/api/audit/summary/"
+TODAY = timezone.localdate()
+
+
+def day(offset):
+    return TODAY + timedelta(days=offset)
+
+
+def expected_counts(on, **filters):
+    """Brute force: each active indicator's status on `on` from its records as they stand."""
+    counts = dict.fromkeys(STATUSES, 0)
+    for ind in Indicator.objects.filter(is_active=True, **filters):
+        if timezone.localdate(ind.created_at) > on:
+            continue
+        latest = ind.compliance_records.filter(is_revoked=False, compliant_on__lte=on).order_by("-compliant_on", "-created_at").first()
+        status = due_status_for(latest and latest.compliant_on, latest and latest.valid_until, on)
+        counts[status] += 1
+    return counts
+
+
+def counts_of(point):
+    return {status: point[status] for status in STATUSES}
+
+
+@pytest.fixture
+def catalog(db):
+    lab, ward = Project.objects.create(name="Lab"), Project.objects.create(name="Ward")
+    indicators = [
+        Indicator.objects.create(project=lab if i % 2 else ward, section=f"S{i % 3}", standard="St", indicator_text=f"I{i}")
+        for i in range(6)
+    ]
+    Indicator.objects.update(created_at=timezone.now() - timedelta(days=120))
+    return lab, ward, indicators
+
+
+def test_spans_follow_due_status_thresholds():
+    created = day(-100)
+    records = [(day(-90), day(-60)), (day(-50), day(-40)), (day(-50), day(-20)), (day(-10), None)]
+    spans = indicator_spans(created, records)
+    assert spans == [
+        (day(-100), day(-91), "NOT_STARTED"),
+        (day(-90), day(-64), "COMPLIANT"),
+        (day(-63), day(-60), "DUE_SOON"),
+        (day(-59), day(-51), "OVERDUE"),
+        # Two records on one day: the later one counts.
+        (day(-50), day(-24), "COMPLIANT"),
+        (day(-23), day(-20), "DUE_SOON"),
+        (day(-19), day(-11), "OVERDUE"),
+        (day(-10), None, "COMPLIANT"),
+    ]
+    for offset in range(-100, 1):
+        on = day(offset)
+        latest = max((r for r in records if r[0] <= on), key=lambda r: r[0], default=(None, None))
+        if latest[0] == day(-50):
+            latest = records[2]
+        status = next(s for start, end, s in spans if start <= on and (end is None or on <= end))
+        assert status == due_status_for(latest[0], latest[1], on), on
+
+
+@pytest.mark.django_db(transaction=True)
+def test_incremental_updates_match_recount(catalog):
+    lab, ward, indicators = catalog
+    rebuild_trend()
+    rng = random.Random(7)
+    for _ in range(40):
+        ind = rng.choice(indicators)
+        compliant_on = day(-rng.randrange(0, 120))
+        ComplianceRecord.objects.create(indicator=ind, compliant_on=compliant_on, valid_until=compliant_on + timedelta(days=rng.choice([7, 30, 90])))
+    records = list(ComplianceRecord.objects.all())
+    for record in records[:5]:
+        record.is_revoked = True
+        record.save()
+    records[5].delete()
+    indicators[0].section = "Moved"
+    indicators[0].save()
+    indicators[1].project = ward
+    indicators[1].save()
+    indicators[2].is_active = False
+    indicators[2].save()
+    indicators[3].delete()
+    Indicator.objects.create(project=lab, section="S0", standard="St", indicator_text="New")
+
+    days = sample_days(day(-130), day(1), "day")
+    series = trend_series(day(-130), day(1))
+    assert [point["date"] for point in series] == days
+    for point in series:
+        assert counts_of(point) == expected_counts(point["date"]), point["date"]
+    for point in trend_series(day(-130), day(1), project=lab.pk)[::7]:
+        assert counts_of(point) == expected_counts(point["date"], project=lab), point["date"]
+    for point in trend_series(day(-130), day(1), section="Moved")[::7]:
+        assert counts_of(point) == expected_counts(point["date"], section="Moved"), point["date"]
+
+    incremental = sorted(ComplianceTrendPoint.objects.values_list("scope", "key", "day", "compliant", "due_soon", "overdue", "not_started"))
+    rebuild_trend()
+    rebuilt = sorted(ComplianceTrendPoint.objects.values_list("scope", "key", "day", "compliant", "due_soon", "overdue", "not_started"))
+    assert [row for row in incremental if any(row[3:])] == [row for row in rebuilt if any(row[3:])]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_trend_rolls_forward_and_counts_imports(catalog):
+    lab, _, indicators = catalog
+    rebuild_trend(today=day(-5))
+    ComplianceRecord.objects.create(indicator=indicators[0], compliant_on=day(-3), valid_until=day(27))
+    import_indicators([{"Section": "S9", "Standard": "St", "Indicator": "Imported"}], project=lab)
+
+    series = trend_series(day(-10), day(1))
+    assert series[-1]["date"] == TODAY
+    for point in series:
+        assert counts_of(point) == expected_counts(point["date"]), point["date"]
+    assert series[-1]["NOT_STARTED"] == 6
+
+
+@pytest.mark.django_db(transaction=True)
+def test_writes_refresh_the_trend_once_per_commit(catalog, monkeypatch):
+    _, _, indicators = catalog
+    rebuild_trend()
+    calls = []
+    monkeypatch.setattr("core.trends.refresh_trend", lambda ids: calls.append(sorted(ids)))
+    written = [indicators[0], indicators[1], indicators[5]]
+    with transaction.atomic():
+        for ind in written:
+            ComplianceRecord.objects.create(indicator=ind, compliant_on=day(-2), valid_until=day(28))
+            ComplianceRecord.objects.create(indicator=ind, compliant_on=day(-1), valid_until=day(29))
+        assert calls == []
+    assert calls == [sorted(ind.pk for ind in written)]
+
+    with pytest.raises(RuntimeError), transaction.atomic():
+        ComplianceRecord.objects.create(indicator=indicators[4], compliant_on=day(-1), valid_until=day(29))
+        raise RuntimeError
+    # The indicator and, by cascade, its two records: one refresh.
+    deleted = indicators[5].pk
+    indicators[5].delete()
+    assert calls[1:] == [[deleted]]
+
+
+def test_weekly_buckets_report_each_weeks_last_day():
+    assert sample_days(day(-20), day(1), "week") == [day(-14), day(-7), day(0)]
+    assert sample_days(day(-20), day(-3), "week") == [day(-14), day(-7), day(-4)]
+    assert sample_days(day(1), day(30), "day") == []
+
+
+def test_summary_endpoint_returns_counts_and_series(catalog):
+    lab, _, indicators = catalog
+    ComplianceRecord.objects.create(indicator=indicators[1], compliant_on=day(-40), valid_until=day(-10))
+    ComplianceRecord.objects.create(indicator=indicators[3], compliant_on=day(-2), valid_until=day(28))
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username="root", password="p", is_superuser=True))
+
+    data = client.get(SUMMARY_URL).json()
+    assert data["counts"] == {"COMPLIANT": 1, "DUE_SOON": 0, "OVERDUE": 1, "NOT_STARTED": 4}
+    assert data["bucket"] == "day" and data["end"] == str(day(1))
+    assert len(data["series"]) == 31
+    assert {k: v for k, v in data["series"][-1].items() if k != "date"} == data["counts"]
+
+    data = client.get(SUMMARY_URL, {"period": "year", "project": lab.pk}).json()
+    assert data["bucket"] == "week" and len(data["series"]) == 53
+    assert data["counts"] == {"COMPLIANT": 1, "DUE_SOON": 0, "OVERDUE": 1, "NOT_STARTED": 1}
+    assert data["series"][-1]["OVERDUE"] == 1 and data["series"][-4]["OVERDUE"] == 0
+
+    data = client.get(SUMMARY_URL, {"start": str(day(-45)), "bucket": "week", "group_by": "project"}).json()
+    assert [group["label"] for group in data["groups"]] == ["Lab", "Ward"]
+    assert [point["date"] for point in data["groups"][0]["series"]] == [str(day(-39)), str(day(-32)), str(day(-25)), str(day(-18)), str(day(-15))]
+
+    assert client.get(SUMMARY_URL, {"period": "decade"}).status_code == 400
+    assert client.get(SUMMARY_URL, {"project": "nope"}).status_code == 400
+    assert client.get(SUMMARY_URL, {"project": lab.pk, "section": "S1"}).status_code == 400
+
+
+def test_rebuild_command(catalog):
+    out = io.StringIO()
+    call_command("rebuild_compliance_trend", stdout=out)
+    assert "6 status spans" in out.getvalue()
@@ -0,0 +1,134 @@
+import hashlib
+import os
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from core import uploads
+from core.models import AuditLog, EvidenceItem, UploadSession
+
+CHUNK = uploads.MIN_CHUNK_SIZE
+CONTENT = os.urandom(2 * CHUNK + 1000)  # three chunks, the last one short
+
+
+def sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def part(index, content=CONTENT):
+    return content[index * CHUNK:(index + 1) * CHUNK]
+
+
+def start(client, indicator, **fields):
+    data = {"indicator": str(indicator.id), "type": "FILE", "filename": "scan.pdf", "size": len(CONTENT), "chunk_size": CHUNK}
+    return client.post("/api/evidence-uploads/", {**data, **fields}, format="json")
+
+
+def put(client, session_id, index, data, checksum=None):
+    return client.put(
+        f"/api/evidence-uploads/{session_id}/chunks/{index}/", data,
+        content_type="application/octet-stream", HTTP_X_CHUNK_SHA256=checksum or sha(data),
+    )
+
+
+def test_chunks_are_assembled_into_evidence(client, indicator, media, django_capture_on_commit_callbacks):
+    resp = start(client, indicator, sha256=sha(CONTENT), note_text="Large scan")
+    assert resp.status_code == 201, resp.data
+    session_id = resp.data["id"]
+    assert resp.data["chunk_count"] == 3 and resp.data["received"] == []
+
+    assert put(client, session_id, 2, part(2)).status_code == 200
+    resp = put(client, session_id, 0, part(0), checksum=sha(b"corrupted"))
+    assert resp.status_code == 400 and "checksum" in resp.data["detail"]
+    assert put(client, session_id, 0, part(0)[:-1]).status_code == 400  # short chunk
+    assert put(client, session_id, 0, part(0)).status_code == 200
+
+    # Resuming: the session reports what arrived intact.
+    assert client.get(f"/api/evidence-uploads/{session_id}/").data["received"] == [0, 2]
+    resp = client.post(f"/api/evidence-uploads/{session_id}/finalise/")
+    assert resp.status_code == 400 and "Missing chunks: 1" in resp.data["detail"]
+
+    assert put(client, session_id, 1, part(1)).status_code == 200
+    with django_capture_on_commit_callbacks(execute=True):
+        resp = client.post(f"/api/evidence-uploads/{session_id}/finalise/")
+    assert resp.status_code == 201, resp.data
+    item = EvidenceItem.objects.get(pk=resp.data["id"])
+    assert item.note_text == "Large scan" and item.file.name.endswith(".pdf")
+    assert item.blob.sha256 == sha(CONTENT) and item.file.read() == CONTENT
+    assert AuditLog.objects.get(action="CREATE", entity_id=str(item.id)).metadata["upload_session"] == session_id
+    assert not (media / "upload-sessions" / session_id).exists()
+
+    # A retried finalise (lost response) returns the same evidence.
+    resp = client.post(f"/api/evidence-uploads/{session_id}/finalise/")
+    assert resp.status_code == 200 and resp.data["id"] == str(item.id)
+    assert EvidenceItem.objects.count() == 1
+    assert put(client, session_id, 1, part(1)).status_code == 409
+
+
+def test_whole_file_checksum_is_checked(client, indicator, media):
+    session_id = start(client, indicator, sha256=sha(b"something else")).data["id"]
+    for index in range(3):
+        put(client, session_id, index, part(index))
+    resp = client.post(f"/api/evidence-uploads/{session_id}/finalise/")
+    assert resp.status_code == 400 and not EvidenceItem.objects.exists()
+    assert UploadSession.objects.get(pk=session_id).status == "OPEN"
+
+
+def test_finalise_killed_mid_assembly_is_taken_over_once_stale(client, indicator, media, settings):
+    session_id = start(client, indicator).data["id"]
+    for index in range(3):
+        put(client, session_id, index, part(index))
+    # A worker killed while assembling: no reset ever ran.
+    UploadSession.objects.filter(pk=session_id).update(status="ASSEMBLING", assembling_since=timezone.now())
+    assert client.post(f"/api/evidence-uploads/{session_id}/finalise/").status_code == 409
+    assert put(client, session_id, 0, part(0)).status_code == 409
+
+    UploadSession.objects.filter(pk=session_id).update(
+        assembling_since=timezone.now() - timedelta(seconds=settings.EVIDENCE_UPLOAD_ASSEMBLY_STALE_SECONDS + 1),
+    )
+    assert put(client, session_id, 0, part(0)).status_code == 200
+    resp = client.post(f"/api/evidence-uploads/{session_id}/finalise/")
+    assert resp.status_code == 201, resp.data
+    assert EvidenceItem.objects.get().file.read() == CONTENT
+    assert UploadSession.objects.get(pk=session_id).status == "COMPLETE"
+
+
+def test_size_limit_is_configurable(client, indicator, media, settings):
+    settings.EVIDENCE_UPLOAD_MAX_SIZE = len(CONTENT) - 1
+    assert start(client, indicator).status_code == 400
+    settings.EVIDENCE_UPLOAD_MAX_SIZE = len(CONTENT)
+    assert start(client, indicator).status_code == 201
+
+
+def test_session_validation_and_access(client, client_for, indicator, media):
+    assert start(client, indicator, filename="run.exe").status_code == 400
+    assert start(client, indicator, type="NOTE").status_code == 400
+    assert start(client, indicator, chunk_size=1024).status_code == 400
+    resp = start(client, indicator, filename="C:\\scans\\ward.PNG", type="PHOTO")
+    assert resp.status_code == 201 and resp.data["filename"] == "ward.PNG"
+
+    other = client_for("Contributor", "other")
+    assert other.get(f"/api/evidence-uploads/{resp.data['id']}/").status_code == 404
+    assert client_for("Reviewer").post("/api/evidence-uploads/", {}, format="json").status_code == 403
+    assert put(client, resp.data["id"], 3, b"x").status_code == 400
+
+
+def test_abandoned_sessions_are_purged(client, indicator, media, django_capture_on_commit_callbacks):
+    expired = start(client, indicator).data["id"]
+    live = start(client, indicator).data["id"]
+    put(client, expired, 0, part(0))
+    put(client, live, 0, part(0))
+    UploadSession.objects.filter(pk=expired).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    assert put(client, expired, 1, part(1)).status_code == 410
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("purge_upload_sessions")
+    assert [str(pk) for pk in UploadSession.objects.values_list("pk", flat=True)] == [live]
+    assert not (media / "upload-sessions" / expired).exists()
+    assert (media / "upload-sessions" / live).exists()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert client.delete(f"/api/evidence-uploads/{live}/").status_code == 204
+    assert not (media / "upload-sessions" / live).exists()
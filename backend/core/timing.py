@@ -0,0 +1,199 @@
+"""Per-request instrumentation: SQL count and time, serialization time, total time.
+
+RequestTimingMiddleware (REQUEST_TIMING_ENABLED) reports them on every
+response as a Server-Timing header, which browser devtools display per
+request:
+
+  Server-Timing: db;dur=12.4;desc="14 queries", serialize;dur=3.1, app;dur=8.0, total;dur=23.5
+
+It also logs one line per request on the "core.timing" logger. The line
+is tagged with the DRF view as <basename>.<action> (indicator.list,
+audit.snapshot) or the function view's name. When one SQL statement runs
+REQUEST_TIMING_REPEATED_QUERIES times or more in a request (the shape of
+an N+1), the line is logged at WARNING and names the statement.
+
+SQL is counted through connection execute wrappers. "serialize" is the
+time spent in serializer to_representation (TimedSerializerMixin) plus
+rendering the response body; queries a serializer runs count under db as
+well. Streaming responses (CSV exports) are measured until the stream
+closes, so the log line covers rows produced after the headers went out,
+but their Server-Timing header only has what was known when the headers
+were sent. When disabled the middleware removes itself at startup and the
+serializer hook costs one context variable lookup per object.
+"""
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+  """Counters for one request; also the execute wrapper installed on each connection."""
+
+  def __init__(self):
+    self.started = perf_counter()
+    self.queries = 0
+    self.db = 0.0
+    self.serialize = 0.0
+    self.statements = Counter()
+    self._depth = 0
+    self._mark = 0.0
+
+  def __call__(self, execute, sql, params, many, context):
+    start = perf_counter()
+    try:
+      return execute(sql, params, many, context)
+    finally:
+      self.db += perf_counter() - start
+      self.queries += 1
+      self.statements[sql] += 1
+
+  def enter_serialize(self):
+    # Nested serializers run inside their parent's to_representation; only the outermost counts.
+    self._depth += 1
+    if self._depth == 1:
+      self._mark = perf_counter()
+
+  def exit_serialize(self):
+    self._depth -= 1
+    if self._depth == 0:
+      self.serialize += perf_counter() - self._mark
+
+  def most_repeated(self):
+    """(sql, count) of the statement run most often, or (None, 0)."""
+    if not self.statements:
+      return None, 0
+    return self.statements.most_common(1)[0]
+
+  def server_timing(self, total):
+    app = max(total - self.db - self.serialize, 0.0)
+    return ", ".join([
+      f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+      f"serialize;dur={self.serialize * 1000:.1f}",
+      f"app;dur={app * 1000:.1f}",
+      f"total;dur={total * 1000:.1f}",
+    ])
+
+
+def current_timing():
+  """The RequestTiming of the request being served, or None."""
+  return _current.get()
+
+
+class TimedSerializerMixin:
+  """Counts a serializer's to_representation towards the request's serialize time."""
+
+  def to_representation(self, instance):
+    timing = _current.get()
+    if timing is None:
+      return super().to_representation(instance)
+    timing.enter_serialize()
+    try:
+      return super().to_representation(instance)
+    finally:
+      timing.exit_serialize()
+
+
+def view_name(request):
+  """<basename>.<action> for DRF viewsets, else the view function's name."""
+  match = getattr(request, "resolver_match", None)
+  if match is None:
+    return "unresolved"
+  func = match.func
+  actions = getattr(func, "actions", None)
+  if actions:
+    basename = func.initkwargs.get("basename") or func.cls.__name__
+    return f"{basename}.{actions.get(request.method.lower(), request.method.lower())}"
+  # @api_view functions and class-based views are served by a `view` closure.
+  view_class = getattr(func, "cls", None) or getattr(func, "view_class", None)
+  return view_class.__name__ if view_class else func.__name__
+
+
+class RequestTimingMiddleware:
+  """Measures each request (see module docstring); keep it first in MIDDLEWARE."""
+
+  def __init__(self, get_response):
+    if not settings.REQUEST_TIMING_ENABLED:
+      raise MiddlewareNotUsed
+    self.get_response = get_response
+
+  def __call__(self, request):
+    timing = RequestTiming()
+    token = _current.set(timing)
+    for alias in connections:
+      connections[alias].execute_wrappers.append(timing)
+    response, streaming = None, False
+    try:
+      response = self.get_response(request)
+      response["Server-Timing"] = _join(response.get("Server-Timing"), timing.server_timing(perf_counter() - timing.started))
+      # FileResponse keeps its wsgi.file_wrapper path; file downloads run no SQL while streaming.
+      streaming = response.streaming and not response.is_async and not isinstance(response, FileResponse)
+      if streaming:
+        response.streaming_content = self._measure_stream(response.streaming_content, request, response, timing)
+      return response
+    finally:
+      _current.reset(token)
+      if not streaming:
+        self._finish(request, 500 if response is None else response.status_code, timing)
+
+  def process_template_response(self, request, response):
+    # Runs right before DRF renders the body; the post-render callback closes the span.
+    timing = _current.get()
+    if timing is not None:
+      started = perf_counter()
+
+      def rendered(response):
+        timing.serialize += perf_counter() - started
+
+      response.add_post_render_callback(rendered)
+    return response
+
+  def _measure_stream(self, content, request, response, timing):
+    # The server iterates the body after __call__ returned; serializers running
+    # between chunks still report to this request.
+    previous = _current.get()
+    _current.set(timing)
+    try:
+      yield from content
+    finally:
+      _current.set(previous)
+      self._finish(request, response.status_code, timing)
+
+  def _finish(self, request, status_code, timing):
+    for alias in connections:
+      wrappers = connections[alias].execute_wrappers
+      if timing in wrappers:
+        wrappers.remove(timing)
+    total = perf_counter() - timing.started
+    name = view_name(request)
+    sql, repeated = timing.most_repeated()
+    fields = {
+      "view": name, "method": request.method, "path": request.path, "status": status_code,
+      "queries": timing.queries, "db_ms": round(timing.db * 1000, 1),
+      "serialize_ms": round(timing.serialize * 1000, 1), "total_ms": round(total * 1000, 1),
+      "repeated_queries": repeated,
+    }
+    message = "%s %s %s %s queries=%d db=%.1fms serialize=%.1fms total=%.1fms"
+    args = [name, request.method, request.path, status_code, timing.queries, timing.db * 1000, timing.serialize * 1000, total * 1000]
+    level = logging.INFO
+    if repeated >= settings.REQUEST_TIMING_REPEATED_QUERIES:
+      level = logging.WARNING
+      message += " repeated=%d sql=%s"
+      args += [repeated, sql[:300]]
+    logger.log(level, message, *args, extra={"timing": fields})
+    metrics.observe_request(name, request.method, status_code, total, timing.queries)
+
+
+def _join(existing, value):
+  return f"{existing}, {value}" if existing else value
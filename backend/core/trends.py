@@ -0,0 +1,392 @@
+"""Historical compliance trend: daily status counts per project and section.
+
+An active indicator's status on day D is due_status_for() applied to its
+latest non-revoked record with compliant_on <= D (NOT_STARTED before the
+first one), counted from the day the indicator was created. Each indicator's
+history is stored as status spans (ComplianceStatusSpan), and the spans are
+summed into one ComplianceTrendPoint row per scope ("all", "project",
+"section"), key and day, so a 12-month series is a range scan of a few
+hundred rows.
+
+Both tables are maintained incrementally: once a transaction with compliance
+or indicator writes commits, the spans of the indicators it wrote are
+recomputed and diffed against the stored ones, and counts shift only on the
+days that changed. Days after the last materialised day are rolled forward on
+the next read. Everything is built
+lazily on first use, or by `rebuild_compliance_trend`.
+
+Every key has a row for every materialised day, so range updates never miss
+a day; ComplianceTrendState records that range and is the lock that
+serialises maintenance.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .bulk import insert_rows
+from .models import (
+  ComplianceRecord, ComplianceStatusSpan, ComplianceTrendPoint, ComplianceTrendState, Indicator, Project,
+)
+
+STATUSES = ("COMPLIANT", "DUE_SOON", "OVERDUE", "NOT_STARTED")
+COLUMNS = {"COMPLIANT": "compliant", "DUE_SOON": "due_soon", "OVERDUE": "overdue", "NOT_STARTED": "not_started"}
+SCOPES = ("all", "project", "section")
+BUCKETS = ("day", "week")
+SPAN_COLUMNS = ("indicator_id", "project_id", "section", "status", "start_on", "end_on")
+POINT_COLUMNS = ("scope", "key", "day", *COLUMNS.values())
+STATE_PK = 1
+CHUNK = 2000
+ONE_DAY = timedelta(days=1)
+
+
+def indicator_spans(created_on, records):
+  """[(start_on, end_on or None, status)] for one indicator, merged and in order.
+
+  records are its non-revoked (compliant_on, valid_until) pairs ordered by
+  (compliant_on, created_at); on a day with several, the last one wins,
+  as in latest_compliance_subquery().
+  """
+  effective = {}
+  for compliant_on, valid_until in records:
+    effective[compliant_on] = valid_until
+  dates = sorted(effective)
+  spans = []
+
+  def add(start, end, status):
+    if end is not None and end < start:
+      return
+    if spans and spans[-1][2] == status:
+      spans[-1] = (spans[-1][0], end, status)
+    else:
+      spans.append((start, end, status))
+
+  add(created_on, dates[0] - ONE_DAY if dates else None, "NOT_STARTED")
+  for i, compliant_on in enumerate(dates):
+    start = max(compliant_on, created_on)
+    end = dates[i + 1] - ONE_DAY if i + 1 < len(dates) else None
+    if end is not None and end < start:
+      continue
+    valid_until = effective[compliant_on]
+    if valid_until is None:
+      add(start, end, "COMPLIANT")
+      continue
+    # Same thresholds as due_status_for().
+    interval = max((valid_until - compliant_on).days, 1)
+    due_soon = min(3, max(1, int(interval * 0.2)))
+    pieces = (
+      (None, valid_until - timedelta(days=due_soon + 1), "COMPLIANT"),
+      (valid_until - timedelta(days=due_soon), valid_until, "DUE_SOON"),
+      (valid_until + ONE_DAY, None, "OVERDUE"),
+    )
+    for lo, hi, status in pieces:
+      lo = start if lo is None else max(lo, start)
+      hi = end if hi is None else (hi if end is None else min(hi, end))
+      add(lo, hi, status)
+  return spans
+
+
+def _status_on(spans, day):
+  for start, end, status in spans:
+    if start <= day and (end is None or day <= end):
+      return status
+  return None
+
+
+def span_changes(old, new):
+  """[(start, end or None, old_status, new_status)] for the days two span lists disagree on."""
+  bounds = sorted({s for s, _, _ in old + new} | {e + ONE_DAY for _, e, _ in old + new if e is not None})
+  changes = []
+  for i, start in enumerate(bounds):
+    end = bounds[i + 1] - ONE_DAY if i + 1 < len(bounds) else None
+    before, after = _status_on(old, start), _status_on(new, start)
+    if before == after:
+      continue
+    if changes and changes[-1][2:] == (before, after) and changes[-1][1] == start - ONE_DAY:
+      changes[-1] = (changes[-1][0], end, before, after)
+    else:
+      changes.append((start, end, before, after))
+  return changes
+
+
+def _keys(project_id, section):
+  keys = [("all", ""), ("section", section)]
+  if project_id is not None:
+    keys.append(("project", str(project_id)))
+  return keys
+
+
+def _compute(indicator_ids):
+  """{indicator_id: (project_id, section, spans)} for the active ones among indicator_ids."""
+  result = {}
+  for i in range(0, len(indicator_ids), CHUNK):
+    chunk = indicator_ids[i:i + CHUNK]
+    records = defaultdict(list)
+    rows = ComplianceRecord.objects.filter(indicator_id__in=chunk, is_revoked=False).order_by(
+      "indicator_id", "compliant_on", "created_at"
+    ).values_list("indicator_id", "compliant_on", "valid_until")
+    for indicator_id, compliant_on, valid_until in rows:
+      records[indicator_id].append((compliant_on, valid_until))
+    indicators = Indicator.objects.filter(pk__in=chunk, is_active=True).values_list("id", "project_id", "section", "created_at")
+    for pk, project_id, section, created_at in indicators:
+      created_on = timezone.localdate(created_at)
+      result[pk] = (project_id, section, indicator_spans(created_on, records.get(pk, ())))
+  return result
+
+
+def _span_rows(indicator_id, project_id, section, spans):
+  prep = ComplianceStatusSpan._meta.get_field("indicator_id").get_db_prep_save
+  indicator_id = prep(indicator_id, connection)
+  project_id = prep(project_id, connection)
+  adapt = connection.ops.adapt_datefield_value
+  return [(indicator_id, project_id, section, status, adapt(start), adapt(end)) for start, end, status in spans]
+
+
+def _materialize(first, last):
+  """Insert point rows for every known key on days first..last, counted from the stored spans."""
+  if last < first:
+    return
+  days = (last - first).days + 1
+  deltas = defaultdict(lambda: [[0] * (days + 1) for _ in STATUSES])
+  for scope, key in ComplianceTrendPoint.objects.values_list("scope", "key").distinct():
+    deltas[(scope, key)]
+  spans = ComplianceStatusSpan.objects.filter(
+    Q(end_on__isnull=True) | Q(end_on__gte=first), start_on__lte=last,
+  ).values_list("project_id", "section", "status", "start_on", "end_on")
+  for project_id, section, status, start, end in spans.iterator(chunk_size=CHUNK):
+    lo = (max(start, first) - first).days
+    hi = (min(end or last, last) - first).days + 1
+    index = STATUSES.index(status)
+    for key in _keys(project_id, section):
+      row = deltas[key][index]
+      row[lo] += 1
+      row[hi] -= 1
+
+  adapt = connection.ops.adapt_datefield_value
+  points = []
+  for (scope, key), per_status in deltas.items():
+    running = [0] * len(STATUSES)
+    for offset in range(days):
+      for index, row in enumerate(per_status):
+        running[index] += row[offset]
+      points.append((scope, key, adapt(first + timedelta(days=offset)), *running))
+  insert_rows(ComplianceTrendPoint, POINT_COLUMNS, points, ignore_conflicts=True)
+
+
+def _ensure_key(state, scope, key):
+  """Give a key first seen in an update zero rows across the materialised range."""
+  if ComplianceTrendPoint.objects.filter(scope=scope, key=key, day=state.first_day).exists():
+    return
+  days = (state.through_day - state.first_day).days + 1
+  zeros = (0,) * len(STATUSES)
+  insert_rows(
+    ComplianceTrendPoint, POINT_COLUMNS,
+    ((scope, key, connection.ops.adapt_datefield_value(state.first_day + timedelta(days=i)), *zeros) for i in range(days)), ignore_conflicts=True,
+  )
+
+
+def _apply(state, scope, key, changes):
+  for start, end, before, after in changes:
+    start = max(start, state.first_day)
+    end = state.through_day if end is None else min(end, state.through_day)
+    if end < start:
+      continue
+    updates = {}
+    if before:
+      updates[COLUMNS[before]] = F(COLUMNS[before]) - 1
+    if after:
+      updates[COLUMNS[after]] = F(COLUMNS[after]) + 1
+    ComplianceTrendPoint.objects.filter(scope=scope, key=key, day__gte=start, day__lte=end).update(**updates)
+
+
+def _locked_state():
+  ComplianceTrendState.objects.get_or_create(pk=STATE_PK)
+  return ComplianceTrendState.objects.select_for_update().get(pk=STATE_PK)
+
+
+def rebuild_trend(today=None):
+  """Recompute every span and point from scratch; returns the state."""
+  today = today or timezone.localdate()
+  with transaction.atomic():
+    state = _locked_state()
+    ComplianceTrendPoint.objects.all().delete()
+    ComplianceStatusSpan.objects.all().delete()
+    ids = list(Indicator.objects.filter(is_active=True).values_list("pk", flat=True))
+    first = today
+    for i in range(0, len(ids), CHUNK):
+      for pk, (project_id, section, spans) in _compute(ids[i:i + CHUNK]).items():
+        insert_rows(ComplianceStatusSpan, SPAN_COLUMNS, _span_rows(pk, project_id, section, spans))
+        first = min(first, spans[0][0])
+    _materialize(first, today)
+    state.first_day, state.through_day, state.built_at = first, today, timezone.now()
+    state.save()
+  return state
+
+
+def ensure_trend(today=None):
+  """Build the trend on first use and roll it forward through today; returns the state."""
+  today = today or timezone.localdate()
+  state = ComplianceTrendState.objects.filter(pk=STATE_PK).first()
+  if state and state.through_day and state.through_day >= today:
+    return state
+  with transaction.atomic():
+    state = _locked_state()
+    if state.through_day is None:
+      return rebuild_trend(today)
+    if state.through_day < today:
+      _materialize(state.through_day + ONE_DAY, today)
+      state.through_day = today
+      state.save(update_fields=["through_day"])
+  return state
+
+
+def refresh_trend(indicator_ids):
+  """Bring the spans and points of these indicators up to date after a write.
+
+  A no-op until the trend has been built. Inactive or deleted indicators
+  lose their spans, so they drop out of every day's counts.
+  """
+  indicator_ids = list(dict.fromkeys(indicator_ids))
+  if not indicator_ids or not ComplianceTrendState.objects.filter(pk=STATE_PK, through_day__isnull=False).exists():
+    return
+  with transaction.atomic():
+    state = _locked_state()
+    stored = defaultdict(list)
+    groups = {}
+    rows = ComplianceStatusSpan.objects.filter(indicator_id__in=indicator_ids).order_by("start_on").values_list(
+      "indicator_id", "project_id", "section", "start_on", "end_on", "status"
+    )
+    for indicator_id, project_id, section, start, end, status in rows:
+      stored[indicator_id].append((start, end, status))
+      groups[indicator_id] = (project_id, section)
+    current = _compute(indicator_ids)
+
+    changed, first = [], state.first_day
+    for pk in indicator_ids:
+      old, new = stored.get(pk, []), current.get(pk, (None, None, []))[2]
+      old_keys = _keys(*groups[pk]) if pk in groups else []
+      new_keys = _keys(*current[pk][:2]) if pk in current else []
+      if old == new and old_keys == new_keys:
+        continue
+      changed.append(pk)
+      for scope in SCOPES:
+        old_key = next((k for s, k in old_keys if s == scope), None)
+        new_key = next((k for s, k in new_keys if s == scope), None)
+        if old_key == new_key:
+          if old_key is not None:
+            _ensure_key(state, scope, old_key)
+            _apply(state, scope, old_key, span_changes(old, new))
+          continue
+        if old_key is not None:
+          _apply(state, scope, old_key, span_changes(old, []))
+        if new_key is not None:
+          _ensure_key(state, scope, new_key)
+          _apply(state, scope, new_key, span_changes([], new))
+      if new:
+        first = min(first, new[0][0])
+    if not changed:
+      return
+
+    ComplianceStatusSpan.objects.filter(indicator_id__in=changed).delete()
+    insert_rows(ComplianceStatusSpan, SPAN_COLUMNS, [row for pk in changed if pk in current for row in _span_rows(pk, *current[pk])])
+    if first < state.first_day:
+      # History now starts earlier (e.g. an indicator with a backdated created_at).
+      _materialize(first, state.first_day - ONE_DAY)
+      state.first_day = first
+      state.save(update_fields=["first_day"])
+
+
+class _PendingRefresh:
+  """The indicators written in one transaction, refreshed together once it commits."""
+
+  def __init__(self):
+    self.indicator_ids = {}
+
+  def __call__(self):
+    refresh_trend(self.indicator_ids)
+
+
+def refresh_trend_on_commit(indicator_ids):
+  """refresh_trend() for these indicators once the current transaction commits.
+
+  Writes are collected per transaction, so a cascade or a bulk import refreshes
+  the trend once, and ComplianceTrendState is locked after the writer's
+  transaction instead of inside it. Outside a transaction the refresh runs now.
+  """
+  connection = transaction.get_connection()
+  if not connection.in_atomic_block:
+    refresh_trend(indicator_ids)
+    return
+  pending = getattr(connection, "_pending_trend_refresh", None)
+  # A rolled-back transaction discards the callback; start over then.
+  if pending is None or not any(entry[1] is pending for entry in connection.run_on_commit):
+    pending = connection._pending_trend_refresh = _PendingRefresh()
+    transaction.on_commit(pending)
+  pending.indicator_ids.update(dict.fromkeys(indicator_ids))
+
+
+def sample_days(start, end, bucket, today=None):
+  """Days the series reports for the window [start, end): every day, or each week's last day.
+
+  The window is cut at today; a partial last week reports its last day so far.
+  """
+  today = today or timezone.localdate()
+  last = min(end - ONE_DAY, today)
+  if last < start:
+    return []
+  step = 1 if bucket == "day" else 7
+  days = []
+  day = start + timedelta(days=step - 1)
+  while day < last:
+    days.append(day)
+    day += timedelta(days=step)
+  days.append(last)
+  return days
+
+
+def _series(rows, days):
+  by_day = {row[0]: row[1:] for row in rows}
+  empty = (0,) * len(STATUSES)
+  return [{"date": day, **dict(zip(STATUSES, by_day.get(day, empty)))} for day in days]
+
+
+def trend_series(start, end, bucket="day", project=None, section=None, group_by=None, today=None):
+  """Status counts per sampled day of [start, end).
+
+  Returns a list of {"date", "COMPLIANT", "DUE_SOON", "OVERDUE", "NOT_STARTED"}
+  for all indicators, one project or one section; with group_by="project" or
+  "section", a list of {"key", "label", "series"} per group instead.
+  """
+  days = sample_days(start, end, bucket, today)
+  ensure_trend(today)
+  if not days:
+    return []
+  columns = ["day", *(COLUMNS[status] for status in STATUSES)]
+  points = ComplianceTrendPoint.objects.filter(day__gte=days[0], day__lte=days[-1])
+  if bucket != "day":
+    points = points.filter(day__in=days)
+
+  if group_by is None:
+    if project is not None:
+      points = points.filter(scope="project", key=str(project))
+    elif section is not None:
+      points = points.filter(scope="section", key=section)
+    else:
+      points = points.filter(scope="all", key="")
+    return _series(points.values_list(*columns), days)
+
+  grouped = defaultdict(list)
+  for key, *row in points.filter(scope=group_by).order_by("key", "day").values_list("key", *columns):
+    grouped[key].append(row)
+  labels = {}
+  if group_by == "project":
+    labels = {str(pk): name for pk, name in Project.objects.filter(pk__in=list(grouped)).values_list("pk", "name")}
+  groups = [
+    {"key": key, "label": labels.get(key, key), "series": _series(rows, days)}
+    for key, rows in grouped.items()
+    # Keys whose indicators have all gone stay as zero rows; leave them out.
+    if any(any(row[1:]) for row in rows)
+  ]
+  return sorted(groups, key=lambda group: group["label"])
@@ -0,0 +1,218 @@
+"""Chunked, resumable evidence uploads.
+
+A client opens an UploadSession with the file's name and size, PUTs its chunks
+(numbered from 0, each with its sha256) in any order and as often as needed,
+and finalises it, which assembles the chunks into an EvidenceItem. Chunks are
+streamed from the request to their own file in the session's directory under
+EVIDENCE_UPLOAD_DIR, written under a temporary name and renamed into place only
+once their checksum matches, so the chunk files present on disk are exactly the
+chunks received. Nothing is held in worker memory and a session survives worker
+restarts, including a worker killed while finalising it: the session stays
+ASSEMBLING for EVIDENCE_UPLOAD_ASSEMBLY_STALE_SECONDS, then is open again. Sessions idle past EVIDENCE_UPLOAD_SESSION_TTL_SECONDS are deleted,
+with their chunks, by purge_expired_sessions().
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import EvidenceItem, UploadSession, UploadStatus
+
+MIN_CHUNK_SIZE = 64 * 1024
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+  """A request the session cannot accept; `status` is the HTTP status to answer with."""
+
+  def __init__(self, message, status=400):
+    super().__init__(message)
+    self.status = status
+
+
+def upload_root():
+  return Path(settings.EVIDENCE_UPLOAD_DIR or os.path.join(settings.MEDIA_ROOT, "upload-sessions"))
+
+
+def session_dir(session):
+  return upload_root() / str(session.pk)
+
+
+def chunk_count(session):
+  return max(1, -(-session.size // session.chunk_size))
+
+
+def chunk_length(session, index):
+  if index == chunk_count(session) - 1:
+    return session.size - index * session.chunk_size
+  return session.chunk_size
+
+
+def _chunk_path(session, index):
+  return session_dir(session) / f"{index:06d}.part"
+
+
+def received_chunks(session):
+  """Indexes of the chunks on disk, in order."""
+  try:
+    names = os.listdir(session_dir(session))
+  except FileNotFoundError:
+    return []
+  return sorted(int(name[:-5]) for name in names if name.endswith(".part") and name[:-5].isdigit())
+
+
+def missing_chunks(session):
+  received = set(received_chunks(session))
+  return [index for index in range(chunk_count(session)) if index not in received]
+
+
+def expiry():
+  return timezone.now() + timedelta(seconds=settings.EVIDENCE_UPLOAD_SESSION_TTL_SECONDS)
+
+
+def _stale_assembly():
+  return timezone.now() - timedelta(seconds=settings.EVIDENCE_UPLOAD_ASSEMBLY_STALE_SECONDS)
+
+
+def check_open(session):
+  if session.expires_at <= timezone.now():
+    raise UploadError("Upload session has expired", status=410)
+  if session.status == UploadStatus.ASSEMBLING and session.assembling_since and session.assembling_since < _stale_assembly():
+    return  # its finalise died with its worker
+  if session.status != UploadStatus.OPEN:
+    raise UploadError(f"Upload session is {session.status.lower()}", status=409)
+
+
+def write_chunk(session, index, stream, checksum):
+  """Stream one chunk from `stream` to disk, replacing any earlier copy of it.
+
+  The chunk is kept only if it has exactly the expected length and `checksum`
+  (sha256, hex) matches.
+  """
+  check_open(session)
+  if not 0 <= index < chunk_count(session):
+    raise UploadError(f"Chunk index must be between 0 and {chunk_count(session) - 1}")
+  checksum = (checksum or "").strip().lower()
+  if len(checksum) != 64:
+    raise UploadError("X-Chunk-SHA256 header with the chunk's sha256 (hex) is required")
+  expected = chunk_length(session, index)
+  directory = session_dir(session)
+  directory.mkdir(parents=True, exist_ok=True)
+  digest, written = hashlib.sha256(), 0
+  fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+  try:
+    with os.fdopen(fd, "wb") as out:
+      while stream is not None:
+        data = stream.read(min(READ_SIZE, expected + 1 - written))
+        if not data:
+          break
+        written += len(data)
+        if written > expected:
+          break
+        digest.update(data)
+        out.write(data)
+    if written != expected:
+      raise UploadError(f"Chunk {index} must be {expected} bytes")
+    if digest.hexdigest() != checksum:
+      raise UploadError(f"Chunk {index} does not match its checksum")
+    os.replace(tmp, _chunk_path(session, index))
+  except BaseException:
+    if os.path.exists(tmp):
+      os.remove(tmp)
+    raise
+  UploadSession.objects.filter(pk=session.pk).update(expires_at=expiry())
+
+
+def finalise(session):
+  """Assemble the chunks into a new EvidenceItem; returns (evidence, created).
+
+  Finalising a completed session again returns the same evidence. A session
+  being assembled by another request answers 409 until that claim is stale.
+  """
+  if session.status == UploadStatus.COMPLETE and session.evidence_id:
+    return session.evidence, False
+  check_open(session)
+  missing = missing_chunks(session)
+  if missing:
+    raise UploadError(f"Missing chunks: {', '.join(map(str, missing[:20]))}{' ...' if len(missing) > 20 else ''}")
+  # Conditional UPDATE: only one request assembles a session. One left
+  # ASSEMBLING by a killed worker is taken over once it is stale.
+  claim = timezone.now()
+  claimable = Q(status=UploadStatus.OPEN) | Q(status=UploadStatus.ASSEMBLING, assembling_since__lt=_stale_assembly())
+  if not UploadSession.objects.filter(claimable, pk=session.pk).update(status=UploadStatus.ASSEMBLING, assembling_since=claim):
+    raise UploadError("Upload session is already being finalised", status=409)
+  owned = UploadSession.objects.filter(pk=session.pk, status=UploadStatus.ASSEMBLING, assembling_since=claim)
+  directory = session_dir(session)
+  assembled = None
+  try:
+    # Named per claim: a worker that was taken over may still be writing its own.
+    fd, assembled = tempfile.mkstemp(dir=directory, prefix="assembled-", suffix=".tmp")
+    digest = hashlib.sha256()
+    with os.fdopen(fd, "wb") as out:
+      for index in range(chunk_count(session)):
+        with open(_chunk_path(session, index), "rb") as part:
+          while data := part.read(READ_SIZE):
+            digest.update(data)
+            out.write(data)
+    if session.sha256 and digest.hexdigest() != session.sha256:
+      raise UploadError("Assembled file does not match the session's sha256; re-send the chunks")
+    with transaction.atomic(), open(assembled, "rb") as fh:
+      upload = File(fh, name=session.filename)
+      upload.sha256 = digest.hexdigest()  # core.blobs stores it without hashing it again
+      item = EvidenceItem.objects.create(
+        indicator_id=session.indicator_id, compliance_record_id=session.compliance_record_id,
+        type=session.type, note_text=session.note_text, file=upload, created_by=session.created_by,
+      )
+      # Rolls the evidence back if another request took the session over meanwhile.
+      if not owned.update(status=UploadStatus.COMPLETE, evidence=item, expires_at=expiry()):
+        raise UploadError("Upload session was taken over by another finalise", status=409)
+  except BaseException:
+    owned.update(status=UploadStatus.OPEN, assembling_since=None)
+    raise
+  finally:
+    if assembled and os.path.exists(assembled):
+      os.remove(assembled)
+  remove_chunks(directory)
+  return item, True
+
+
+def remove_chunks(directory):
+  shutil.rmtree(directory, ignore_errors=True)
+
+
+def purge_expired_sessions(now=None):
+  """Delete sessions past their expiry and their chunks, plus chunk directories no session owns.
+
+  Returns the number of sessions deleted.
+  """
+  now = now or timezone.now()
+  # Deleted row by row so core.signals removes each session's chunks.
+  expired = UploadSession.objects.filter(expires_at__lte=now).delete()[0]
+  root = upload_root()
+  if root.is_dir():
+    # Left when a chunk was still being written as its session was deleted.
+    cutoff = time.time() - settings.EVIDENCE_UPLOAD_SESSION_TTL_SECONDS
+    names = {entry.name for entry in root.iterdir() if entry.is_dir()}
+    live = {str(pk) for pk in UploadSession.objects.filter(pk__in=[n for n in names if _is_uuid(n)]).values_list("pk", flat=True)}
+    for name in names - live:
+      path = root / name
+      if path.stat().st_mtime < cutoff:
+        shutil.rmtree(path, ignore_errors=True)
+  return expired
+
+
+def _is_uuid(name):
+  try:
+    return str(uuid.UUID(name)) == name
+  except ValueError:
+    return False
@@ -1,34 +1,15 @@
-import json
-from django.core.serializers.json import DjangoJSONEncoder
-from .models import AuditLog
+from . import audit
 
 def log_audit(actor, action, entity_type, entity_id=None, summary="", before=None, after=None, metadata=None, request=None):
-    ip_address = None
-    user_agent = None
-    if request:
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip_address = x_forwarded_for.split(',')[0]
-        else:
-            ip_address = request.META.get('REMOTE_ADDR')
-        user_agent = request.META.get('HTTP_USER_AGENT')
-
-    def sanitize(obj):
-        if obj is None: return None
-        try:
-            return json.loads(json.dumps(obj, cls=DjangoJSONEncoder))
-        except Exception:
-            return str(obj)
-
-    return AuditLog.objects.create(
+    """Positional-friendly wrapper over core.audit.log_audit used by the views."""
+    return audit.log_audit(
         actor=actor,
         action=action,
         entity_type=entity_type,
-        entity_id=str(entity_id) if entity_id else None,
+        entity_id=entity_id if entity_id is not None else "",
         summary=summary,
-        before_snapshot=sanitize(before),
-        after_snapshot=sanitize(after),
-        metadata=sanitize(metadata),
-        ip_address=ip_address,
-        user_agent=user_agent
+        before=before,
+        after=after,
+        metadata=metadata,
+        request=request,
     )
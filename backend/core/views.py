@@ -1,20 +1,54 @@
 import csv
+import hashlib
+import heapq
+import json
 import os
+from datetime import date, datetime, time, timedelta
 from io import TextIOWrapper
-from django.db.models import Q
-from django.http import HttpResponse
+from operator import itemgetter
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.db.models.fields.files import FieldFile
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from rest_framework import viewsets, permissions, pagination
-from rest_framework.decorators import action, api_view, permission_classes
-from .permissions import IsAdmin, IsContributorOrAdmin, IsReviewerOrHigher, ReadOnly, IsAdminOrReviewer, ReadOnlyOrAdminContributor
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import mixins, viewsets, permissions, pagination
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
+from .audit import audit_sink
+from .audit_archive import count_archived, estimate_archived, iter_archived, row_key
+from .audit_search import audit_search_q
+from .downloads import serve_file
+from .exports import enqueue_export, xlsx_available
+from .importers import import_indicators_csv
+from . import derivatives, metrics, uploads
+from .pagination import (
+    IndicatorPagination, ComplianceRecordPagination, EvidenceItemPagination,
+    AuditLogPagination, estimate_count,
+)
+from .permissions import (
+    IsAdmin, IsContributorOrAdmin, IsReviewerOrHigher, ReadOnly, IsAdminOrReviewer, ReadOnlyOrAdminContributor,
+    IsMetricsScraper,
+    get_roles, invalidate_roles,
+)
 from rest_framework.response import Response
 
-from .models import Indicator, ComplianceRecord, EvidenceItem, User, AuditLog, AuditAction, Project
+from .models import (
+    Indicator, ComplianceRecord, EvidenceItem, User, AuditLog, AuditAction, Project,
+    ExportFormat, ExportStatus, SnapshotExportJob, UploadSession,
+)
 from .serializers import (
     IndicatorSerializer, ComplianceRecordSerializer, EvidenceItemSerializer, 
-    UserSerializer, AuditLogSerializer, ProjectSerializer
+    UserSerializer, AuditLogSerializer, ProjectSerializer, SnapshotExportJobSerializer, UploadSessionSerializer
 )
-from .services import compute_valid_until, compute_due_status
+from .search import ranked_search, search_indicators
+from .trends import BUCKETS as TREND_BUCKETS, trend_series
+from .snapshots import SNAPSHOT_CSV_HEADER, build_snapshot_payload, snapshot_cache, snapshot_csv_row
+from .services import compute_valid_until, annotate_due_status, due_status_counts, due_status_q
 from .utils import log_audit
 from django.contrib.auth.models import Group
 from django.http import HttpResponse
@@ -24,6 +58,13 @@ class UserViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
     permission_classes = [IsAdmin]
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action in ("list", "retrieve"):
+            # UserSerializer.roles reads every user's groups.
+            qs = qs.prefetch_related("groups")
+        return qs
+
     @action(detail=True, methods=["post"], url_path="assign-role")
     def assign_role(self, request, pk=None):
         user = self.get_object()
@@ -34,6 +75,7 @@ class UserViewSet(viewsets.ModelViewSet):
         try:
             group = Group.objects.get(name=role_name)
             user.groups.add(group)
+            invalidate_roles(user.pk)
             log_audit(
                 actor=request.user,
                 action="ASSIGN_ROLE",
@@ -57,6 +99,7 @@ class UserViewSet(viewsets.ModelViewSet):
         try:
             group = Group.objects.get(name=role_name)
             user.groups.remove(group)
+            invalidate_roles(user.pk)
             log_audit(
                 actor=request.user,
                 action="REMOVE_ROLE",
@@ -71,8 +114,21 @@ class UserViewSet(viewsets.ModelViewSet):
             return Response({"detail": f"Role {role_name} does not exist"}, status=400)
 
 class IndicatorViewSet(viewsets.ModelViewSet):
-  queryset = Indicator.objects.all().order_by("section","standard")
+  queryset = Indicator.objects.all().order_by("section","standard","id")
   serializer_class = IndicatorSerializer
+  pagination_class = IndicatorPagination
+  due_orderings = {
+    "due_status": "due_severity",
+    "-due_status": "-due_severity",
+    "next_due_on": "due_sort_date",
+    "-next_due_on": "-due_sort_date",
+  }
+
+  def get_cursor_ordering(self):
+    ordering = self.due_orderings.get(self.request.query_params.get("ordering"))
+    if ordering:
+      return (ordering, "section", "standard", "id")
+    return getattr(self, "search_ordering", None) or self.pagination_class.ordering
 
 
   def get_permissions(self):
@@ -93,8 +149,10 @@ class IndicatorViewSet(viewsets.ModelViewSet):
 
     if active is not None:
       qs = qs.filter(is_active=active.lower()=="true")
-    if q:
-      qs = qs.filter(Q(indicator_text__icontains=q) | Q(standard__icontains=q) | Q(section__icontains=q))
+    if q and self.action == "list":
+      qs, self.search_ordering = ranked_search(qs, q)
+    elif q:
+      qs = search_indicators(qs, q)
     if freq:
       qs = qs.filter(frequency=freq)
     if section:
@@ -102,83 +160,61 @@ class IndicatorViewSet(viewsets.ModelViewSet):
     if project:
       qs = qs.filter(project_id=project)
     if due:
-      ids = [ind.id for ind in qs if compute_due_status(ind)[2] == due]
-      qs = qs.filter(id__in=ids)
+      qs = qs.filter(due_status_q(due))
+    if self.action == "list":
+      # due_sort_date keeps open-ended (NOT_STARTED / one-time) rows orderable by keyset.
+      qs = annotate_due_status(qs, stored=True).annotate(
+        due_sort_date=Coalesce("due_next_due_on", Value(date.max))
+      )
     return qs
 
   @action(detail=False, methods=["post"], url_path="import")
   def import_csv(self, request):
     if "file" not in request.FILES:
       return Response({"detail":"file is required"}, status=400)
-    
+
+    project = None
+    project_id = request.data.get("project")
+    if project_id:
+      try:
+        project = Project.objects.filter(pk=project_id).first()
+      except DjangoValidationError:
+        project = None
+      if project is None:
+        return Response({"detail": f"Project {project_id} does not exist"}, status=400)
+
     try:
-      f = TextIOWrapper(request.FILES["file"].file, encoding="utf-8")
-      reader = csv.DictReader(f)
-      created = 0
-      errors = []
-      total = 0
-      
-      for i, row in enumerate(reader):
-        total += 1
-        sec = (row.get("Section") or "").strip()
-        std = (row.get("Standard") or "").strip()
-        ind = (row.get("Indicator") or "").strip()
-        
-        if not sec or not std or not ind:
-          errors.append(f"Row {i+1}: Missing required fields (Section, Standard, or Indicator)")
-          continue
-          
-        Indicator.objects.create(
-          section=sec,
-          standard=std,
-          indicator_text=ind,
-          evidence_required_text=(row.get("Evidence Required") or "").strip() or None,
-          responsible_person=(row.get("Responsible Person") or "").strip() or None,
-        )
-        created += 1
-      metadata = {
-        "rows_total": total,
-        "created": created,
-        "updated": 0,
-        "skipped": len(errors),
-        "errors_count": len(errors),
-        "error_samples": errors[:5],
-      }
-      log_audit(
-        actor=request.user,
-        action=AuditAction.IMPORT,
-        entity_type="Indicator",
-        entity_id="import",
-        summary=f"Imported indicators from CSV (created={created}, errors={len(errors)})",
-        metadata=metadata,
-        request=request,
-      )
-      if errors:
-        log_audit(
-            actor=request.user,
-            action="IMPORT",
-            entity_type="Indicator",
-            summary=f"Bulk import finished with {created} successes and {len(errors)} errors",
-            metadata={"errors": errors, "created_count": created},
-            request=request
-        )
-        return Response({"created": created, "errors": errors}, status=207 if created > 0 else 400)
-      
-      log_audit(
-          actor=request.user,
-          action="IMPORT",
-          entity_type="Indicator",
-          summary=f"Bulk import finished successfully: {created} indicators created",
-          metadata={"created_count": created},
-          request=request
-      )
-      return Response({"created": created})
-    except Exception as e:
+      f = TextIOWrapper(request.FILES["file"].file, encoding="utf-8-sig")
+      report = import_indicators_csv(f, project=project)
+    except (csv.Error, UnicodeDecodeError, ValueError) as e:
       return Response({"detail": f"CSV Parse Error: {str(e)}"}, status=400)
 
+    metadata = report.as_dict()
+    metadata["errors_count"] = len(report.errors)
+    metadata["error_samples"] = metadata.pop("errors")[:5]
+    metadata["project"] = str(project.id) if project else None
+    log_audit(
+      actor=request.user,
+      action=AuditAction.IMPORT,
+      entity_type="Indicator",
+      entity_id="import",
+      summary=(
+        f"Imported indicators from CSV (created={report.created}, updated={report.updated}, "
+        f"unchanged={report.unchanged}, skipped={report.skipped})"
+      ),
+      metadata=metadata,
+      request=request,
+    )
+    body = report.as_dict()
+    if report.errors:
+      imported = report.created + report.updated + report.unchanged
+      return Response(body, status=207 if imported else 400)
+    return Response(body)
+
 class ComplianceRecordViewSet(viewsets.ModelViewSet):
-  queryset = ComplianceRecord.objects.select_related("indicator").all().order_by("-compliant_on","-created_at")
+  queryset = ComplianceRecord.objects.select_related("indicator").all().order_by("-compliant_on","-created_at","id")
   serializer_class = ComplianceRecordSerializer
+  pagination_class = ComplianceRecordPagination
   permission_classes = [IsReviewerOrHigher]
 
   def get_permissions(self):
@@ -193,6 +229,9 @@ class ComplianceRecordViewSet(viewsets.ModelViewSet):
       qs = qs.filter(indicator_id=ind)
     return qs
 
+  # Writes run in one transaction so Indicator.latest_* (synced by core.signals)
+  # always commits together with the record that changed it.
+  @transaction.atomic
   def perform_create(self, serializer):
     indicator = serializer.validated_data["indicator"]
     compliant_on = serializer.validated_data.get("compliant_on") or timezone.localdate()
@@ -210,6 +249,7 @@ class ComplianceRecordViewSet(viewsets.ModelViewSet):
         request=self.request
     )
 
+  @transaction.atomic
   def perform_update(self, serializer):
     before = ComplianceRecordSerializer(serializer.instance).data
     if serializer.validated_data.get("is_revoked") and not serializer.instance.is_revoked:
@@ -232,9 +272,14 @@ class ComplianceRecordViewSet(viewsets.ModelViewSet):
         request=self.request
     )
 
+  @transaction.atomic
+  def perform_destroy(self, instance):
+    instance.delete()
+
 class EvidenceItemViewSet(viewsets.ModelViewSet):
-  queryset = EvidenceItem.objects.select_related("indicator","compliance_record").all().order_by("-created_at")
+  queryset = EvidenceItem.objects.select_related("indicator","compliance_record").all().order_by("-created_at","id")
   serializer_class = EvidenceItemSerializer
+  pagination_class = EvidenceItemPagination
   permission_classes = [IsReviewerOrHigher]
 
   def get_permissions(self):
@@ -249,8 +294,12 @@ class EvidenceItemViewSet(viewsets.ModelViewSet):
       qs = qs.filter(indicator_id=ind)
     return qs
 
+  # The blob reference (core.signals) commits with the row, or neither does.
+  @transaction.atomic
   def perform_create(self, serializer):
     instance = serializer.save(created_by=self.request.user)
+    if instance.file:
+      metrics.inc("evidence_uploaded_bytes_total", value=instance.file.size)
     log_audit(
         actor=self.request.user,
         action="CREATE",
@@ -272,6 +321,7 @@ class EvidenceItemViewSet(viewsets.ModelViewSet):
         entity_id=entity_id,
         summary=f"Deleted evidence item {entity_id}",
         before=before,
+        metadata={"file_deleted": instance._file_deleted},
         request=self.request
     )
 
@@ -283,177 +333,233 @@ class EvidenceItemViewSet(viewsets.ModelViewSet):
     
     # We rely on ViewSet permission classes (IsReviewerOrHigher) for access control
     
-    file_handle = instance.file.open()
-    response = HttpResponse(file_handle, content_type='application/octet-stream')
-    response['Content-Disposition'] = f'attachment; filename="{instance.file.name.split("/")[-1]}"'
-    
-    log_audit(
-        actor=request.user,
-        action="DOWNLOAD_EVIDENCE",
-        entity_type="EvidenceItem",
-        entity_id=instance.id,
-        summary=f"Downloaded evidence file for indicator {instance.indicator.id}",
-        request=request
-    )
+    response, served = serve_file(request, instance.file, fallback_mtime=instance.created_at)
+    if served is not None:
+      start, end = served
+      metrics.inc("evidence_downloaded_bytes_total", value=end - start + 1)
+      log_audit(
+          actor=request.user,
+          action="DOWNLOAD_EVIDENCE",
+          entity_type="EvidenceItem",
+          entity_id=instance.id,
+          summary=f"Downloaded evidence file for indicator {instance.indicator.id}",
+          metadata={"range": [start, end], "partial": response.status_code == 206},
+          request=request
+      )
     
     return response
 
+  @action(detail=True, methods=["get"], url_path="thumbnail")
+  def thumbnail(self, request, pk=None):
+    return self._derivative(request, "thumb")
+
+  @action(detail=True, methods=["get"], url_path="preview")
+  def preview(self, request, pk=None):
+    return self._derivative(request, "preview")
+
+  def _derivative(self, request, kind):
+    """Serve a cached thumbnail/preview (core.derivatives), making it first if it is missing."""
+    instance = self.get_object()
+    if not instance.file or not derivatives.supported(instance.file.name):
+      return Response({"detail": "No preview for this record"}, status=404)
+    try:
+      name = derivatives.ensure(instance.file.name)[kind]
+    except Exception:
+      return Response({"detail": "Preview could not be generated"}, status=404)
+    fieldfile = FieldFile(instance, EvidenceItem._meta.get_field("file"), name)
+    response, _ = serve_file(request, fieldfile, fallback_mtime=instance.created_at, as_attachment=False)
+    return response
+
+class EvidenceUploadViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+  """Chunked evidence uploads (core.uploads): open a session, PUT its chunks, finalise.
+
+  GET on a session lists the chunks received so far, so an interrupted client
+  resumes with the missing ones; DELETE abandons it.
+  """
+  serializer_class = UploadSessionSerializer
+  permission_classes = [IsContributorOrAdmin]
+
+  def get_queryset(self):
+    # Sessions are private to the user who opened them.
+    return UploadSession.objects.filter(created_by=self.request.user)
+
+  def perform_create(self, serializer):
+    chunk_size = serializer.validated_data.get("chunk_size") or settings.EVIDENCE_UPLOAD_CHUNK_SIZE
+    serializer.save(created_by=self.request.user, chunk_size=chunk_size, expires_at=uploads.expiry())
+
+  @action(detail=True, methods=["put"], url_path=r"chunks/(?P<index>\d+)")
+  def chunk(self, request, pk=None, index=None):
+    """The raw request body is chunk `index`; X-Chunk-SHA256 carries its sha256 (hex)."""
+    session = self.get_object()
+    try:
+      # request.stream reads the body straight from the socket; request.data would buffer it.
+      uploads.write_chunk(session, int(index), request.stream, request.headers.get("X-Chunk-SHA256"))
+    except uploads.UploadError as exc:
+      return Response({"detail": str(exc)}, status=exc.status)
+    return Response({"index": int(index), "received": uploads.received_chunks(session), "chunk_count": uploads.chunk_count(session)})
+
+  @action(detail=True, methods=["post"], url_path="finalise")
+  def finalise(self, request, pk=None):
+    session = self.get_object()
+    try:
+      item, created = uploads.finalise(session)
+    except uploads.UploadError as exc:
+      return Response({"detail": str(exc)}, status=exc.status)
+    data = EvidenceItemSerializer(item).data
+    if created:
+      metrics.inc("evidence_uploaded_bytes_total", value=session.size)
+      log_audit(
+          actor=request.user,
+          action="CREATE",
+          entity_type="EvidenceItem",
+          entity_id=item.id,
+          summary=f"Uploaded evidence for indicator {item.indicator_id}",
+          after=data,
+          metadata={"upload_session": str(session.pk), "chunks": uploads.chunk_count(session)},
+          request=request
+      )
+    return Response(data, status=201 if created else 200)
+
+TREND_PERIOD_DAYS = {"month": 31, "quarter": 92, "year": 365}
+
 class AuditViewSet(viewsets.ViewSet):
   permission_classes = [IsReviewerOrHigher]
 
   @action(detail=False, methods=["get"], url_path="logs")
   def logs(self, request):
-    queryset = AuditLog.objects.all()
-    
-    actor = request.query_params.get("actor")
-    action_type = request.query_params.get("action")
-    entity_type = request.query_params.get("entity_type")
-    q = request.query_params.get("q")
-    start_date = request.query_params.get("start_date")
-    end_date = request.query_params.get("end_date")
-
-    if actor: queryset = queryset.filter(actor_id=actor)
-    if action_type: queryset = queryset.filter(action=action_type)
-    if entity_type: queryset = queryset.filter(entity_type=entity_type)
-    if q: queryset = queryset.filter(summary__icontains=q)
-    if start_date: queryset = queryset.filter(timestamp__date__gte=start_date)
-    if end_date: queryset = queryset.filter(timestamp__date__lte=end_date)
-
-    from django.core.paginator import Paginator
-    page_size = request.query_params.get("page_size", 50)
-    page_number = request.query_params.get("page", 1)
-    paginator = Paginator(queryset, page_size)
-    page_obj = paginator.get_page(page_number)
-
-    serializer = AuditLogSerializer(page_obj, many=True)
-    return Response({
-        "results": serializer.data,
-        "count": paginator.count,
-        "num_pages": paginator.num_pages,
-        "current_page": page_obj.number
-    })
+    queryset = _filter_audit_logs(request, AuditLog.objects.select_related("actor"))
+    archive_filters = _audit_log_filters(request) if _include_archived(request) else None
+    paginator = AuditLogPagination(archive_filters)
+    page = paginator.paginate_queryset(queryset, request, view=self)
+    response = paginator.get_paginated_response(AuditLogSerializer(page, many=True).data)
+    if request.query_params.get("count") == "estimate":
+      count, exact = estimate_count(queryset)
+      archived = estimate_archived(archive_filters) if archive_filters is not None else 0
+      response.data["count_estimate"] = count + archived
+      response.data["count_is_exact"] = exact and not archived
+    return response
+
+  @action(detail=False, methods=["get"], url_path="logs/count")
+  def logs_count(self, request):
+    filters = _audit_log_filters(request)
+    include_archived = _include_archived(request)
+    key = "audit:logs:count:" + hashlib.sha1(json.dumps([filters, include_archived], sort_keys=True).encode()).hexdigest()
+    result = cache.get(key)
+    cached = result is not None
+    if not cached:
+      count, exact = _filter_audit_logs(request, AuditLog.objects.all()).count(), True
+      if include_archived:
+        archived, exact = count_archived(filters)
+        count += archived
+      result = (count, exact)
+      cache.set(key, result, settings.AUDIT_LOG_COUNT_CACHE_SECONDS)
+    count, exact = result
+    return Response({"count": count, "count_is_exact": exact, "cached": cached, "filters": filters})
 
   @action(detail=False, methods=["get"], url_path="logs/export")
   def export_logs(self, request):
-    queryset = AuditLog.objects.all()
-    actor = request.query_params.get("actor")
-    action_type = request.query_params.get("action")
-    entity_type = request.query_params.get("entity_type")
-    q = request.query_params.get("q")
-    start_date = request.query_params.get("start_date")
-    end_date = request.query_params.get("end_date")
-
-    if actor: queryset = queryset.filter(actor_id=actor)
-    if action_type: queryset = queryset.filter(action=action_type)
-    if entity_type: queryset = queryset.filter(entity_type=entity_type)
-    if q: queryset = queryset.filter(summary__icontains=q)
-    if start_date: queryset = queryset.filter(timestamp__date__gte=start_date)
-    if end_date: queryset = queryset.filter(timestamp__date__lte=end_date)
-
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="audit_logs.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Timestamp', 'Actor', 'Action', 'Entity', 'Summary', 'IP Address'])
-    
-    for log in queryset:
-        writer.writerow([
-            log.timestamp.isoformat(),
-            log.actor.username if log.actor else "System",
-            log.action,
-            f"{log.entity_type} ({log.entity_id})",
-            log.summary,
-            log.ip_address or ""
-        ])
-    
+    rows = _filter_audit_logs(request, AuditLog.objects.order_by("-timestamp", "-id")).values_list(
+      "timestamp", "actor__username", "action", "entity_type", "entity_id", "summary", "ip_address", "id",
+    )
+    archived = iter_archived(_audit_log_filters(request)) if _include_archived(request) else ()
     log_audit(
         actor=request.user,
         action="EXPORT_LOGS",
         entity_type="AuditLog",
         summary="Exported audit logs to CSV",
+        metadata={"filters": _audit_log_filters(request)},
         request=request
     )
-    
+
+    def stream():
+      # csv.writer over an echo buffer hands each encoded row straight to the
+      # response, and iterator() reads the rows in chunks, so memory stays flat.
+      writer = csv.writer(_Echo())
+      yield writer.writerow(['Timestamp', 'Actor', 'Action', 'Entity', 'Summary', 'IP Address'])
+      table = ((row_key(row[0], row[-1]), row[:-1]) for row in rows.iterator(chunk_size=2000))
+      # Archived rows are merged in by (timestamp, id), newest first like the table's.
+      segments = ((key, _archived_export_row(record)) for key, record in archived)
+      for _, row in heapq.merge(table, segments, key=itemgetter(0), reverse=True):
+        timestamp, username, action_type, entity_type, entity_id, summary, ip_address = row
+        yield writer.writerow([
+            timestamp.isoformat(),
+            username or "System",
+            action_type,
+            f"{entity_type} ({entity_id})",
+            summary,
+            ip_address or ""
+        ])
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="audit_logs.csv"'
     return response
 
-  @action(detail=False, methods=["get"], url_path="snapshot")
-  def snapshot(self, request):
-    indicators = Indicator.objects.filter(is_active=True).order_by("section", "standard")
-    
-    snapshot_data = []
-    summary_counts = {"COMPLIANT": 0, "DUE_SOON": 0, "OVERDUE": 0, "NOT_STARTED": 0}
-    
-    for ind in indicators:
-      last_date, next_due, status = compute_due_status(ind)
-      summary_counts[status] += 1
-      
-      # Get latest compliance records
-      recs = ind.compliance_records.filter(is_revoked=False).order_by("-compliant_on")[:3]
-      rec_data = ComplianceRecordSerializer(recs, many=True).data
-      
-      # Get evidence pointers
-      evs = ind.evidence_items.all().order_by("-created_at")
-      ev_data = []
-      for ev in evs:
-          ev_data.append({
-              "id": ev.id,
-              "type": ev.type,
-              "created_at": ev.created_at,
-              "filename": ev.file.name.split('/')[-1] if ev.file else None,
-              "url": ev.url
-          })
-          
-      snapshot_data.append({
-          "indicator_id": ind.id,
-          "section": ind.section,
-          "standard": ind.standard,
-          "text": ind.indicator_text,
-          "status": status,
-          "last_compliant": last_date,
-          "next_due": next_due,
-          "compliance_history": rec_data,
-          "evidence": ev_data
-      })
-      
-    log_audit(
-        actor=request.user,
-        action="EXPORT_SNAPSHOT",
-        entity_type="AuditLog",
-        summary="Generated compliance snapshot",
-        request=request
-    )
-    
-    return Response({
-        "timestamp": timezone.now(),
-        "summary": summary_counts,
-        "indicators": snapshot_data
-    })
+  @action(detail=False, methods=["get"], url_path="writer-stats", permission_classes=[IsAdmin])
+  def writer_stats(self, request):
+    return Response(audit_sink.stats())
 
   @action(detail=False, methods=["get"], url_path="summary")
   def summary(self, request):
-    period = request.query_params.get("period","month")
-    start = request.query_params.get("start")
-    if not start:
-      start_date = timezone.localdate().replace(day=1)
-    else:
-      start_date = timezone.datetime.fromisoformat(start).date()
-    end_date = start_date + timezone.timedelta(days=(31 if period=="month" else 92))
+    """Today's status counts plus a daily or weekly trend over the period.
+
+    ?period=month|quarter|year (31/92/365 days from ?start, default ending today),
+    ?bucket=day|week, and either ?project=<id> / ?section=<name> to narrow it or
+    ?group_by=project|section for one series per group.
+    """
+    params = request.query_params
+    period = params.get("period", "month")
+    if period not in TREND_PERIOD_DAYS:
+      return Response({"detail": f"period must be one of {', '.join(TREND_PERIOD_DAYS)}"}, status=400)
+    bucket = params.get("bucket") or ("day" if period == "month" else "week")
+    if bucket not in TREND_BUCKETS:
+      return Response({"detail": f"bucket must be one of {', '.join(TREND_BUCKETS)}"}, status=400)
+    group_by = params.get("group_by") or None
+    if group_by not in (None, "project", "section"):
+      return Response({"detail": "group_by must be project or section"}, status=400)
+    project, section = params.get("project") or None, params.get("section") or None
+    if project and section:
+      return Response({"detail": "Filter by project or by section, not both"}, status=400)
+    if group_by and (project or section):
+      return Response({"detail": "group_by cannot be combined with a project or section filter"}, status=400)
+
+    today = timezone.localdate()
+    days = TREND_PERIOD_DAYS[period]
+    start = params.get("start")
+    start_date = parse_date(start) if start else today - timedelta(days=days - 1)
+    if start_date is None:
+      return Response({"detail": "start must be a date in YYYY-MM-DD format"}, status=400)
+    end_date = start_date + timedelta(days=days)
 
     indicators = Indicator.objects.filter(is_active=True)
-    counts = {"COMPLIANT":0,"DUE_SOON":0,"OVERDUE":0,"NOT_STARTED":0}
-    for ind in indicators:
-      st = compute_due_status(ind)[2]
-      counts[st] = counts.get(st,0)+1
-    return Response({"period":period,"start":start_date,"end":end_date,"counts":counts})
+    if project:
+      try:
+        project = Project.objects.filter(pk=project).values_list("pk", flat=True).first()
+      except DjangoValidationError:
+        project = None
+      if project is None:
+        return Response({"detail": f"Project {params['project']} does not exist"}, status=400)
+      indicators = indicators.filter(project_id=project)
+    if section:
+      indicators = indicators.filter(section=section)
+
+    series = trend_series(start_date, end_date, bucket, project=project, section=section, group_by=group_by, today=today)
+    data = {
+      "period": period, "start": start_date, "end": end_date, "bucket": bucket,
+      "counts": due_status_counts(indicators, today),
+    }
+    data["groups" if group_by else "series"] = series
+    return Response(data)
 
   @action(detail=False, methods=["get"], url_path="snapshot", permission_classes=[IsAdminOrReviewer])
   def snapshot(self, request):
-    data = build_snapshot_payload(request)
-    return Response(data)
+    data, hit = snapshot_payload(request)
+    response = Response(data)
+    response["X-Snapshot-Cache"] = "HIT" if hit else "MISS"
+    return response
 
   @action(detail=False, methods=["get"], url_path="snapshot/export", permission_classes=[IsAdminOrReviewer])
   def snapshot_export(self, request):
-    data = build_snapshot_payload(request)
+    data, _ = snapshot_payload(request)
     log_audit(
       actor=request.user,
       action=AuditAction.EXPORT_SNAPSHOT,
@@ -466,16 +572,64 @@ class AuditViewSet(viewsets.ViewSet):
     response = HttpResponse(content_type="text/csv")
     response["Content-Disposition"] = "attachment; filename=snapshot-export.csv"
     writer = csv.writer(response)
-    writer.writerow(["id","section","standard","status","due_date"])
+    writer.writerow(SNAPSHOT_CSV_HEADER)
     for row in data["indicators"]:
-      writer.writerow([row["id"], row["section"], row["standard"], row["status"], row.get("due_date") or ""])
+      writer.writerow(snapshot_csv_row(row))
     return response
 
+  @action(detail=False, methods=["post"], url_path="snapshot/export-jobs", permission_classes=[IsAdminOrReviewer])
+  def snapshot_export_jobs(self, request):
+    fmt = request.data.get("format") or ExportFormat.CSV
+    if fmt not in ExportFormat.values:
+      return Response({"detail": f"Unsupported format {fmt}"}, status=400)
+    if fmt == ExportFormat.XLSX and not xlsx_available():
+      return Response({"detail": "XLSX export is not available on this server"}, status=400)
+    filters = _snapshot_filters(request, request.data)
+    job, reused = enqueue_export(filters, fmt, request.user)
+    log_audit(
+      actor=request.user,
+      action=AuditAction.EXPORT_SNAPSHOT,
+      entity_type="SnapshotExportJob",
+      entity_id=job.id,
+      summary=f"Snapshot {fmt} export {'reused' if reused else 'queued'}",
+      metadata={"filters": filters, "format": fmt, "reused": reused},
+      request=request,
+    )
+    data = SnapshotExportJobSerializer(job, context={"request": request}).data
+    return Response(data, status=200 if job.status == ExportStatus.DONE else 202)
+
+  @action(detail=False, methods=["get"], url_path=r"snapshot/export-jobs/(?P<job_id>[0-9a-f-]{36})", permission_classes=[IsAdminOrReviewer])
+  def snapshot_export_job(self, request, job_id=None):
+    job = get_object_or_404(SnapshotExportJob, pk=job_id)
+    return Response(SnapshotExportJobSerializer(job, context={"request": request}).data)
+
+  @action(detail=False, methods=["get"], url_path=r"snapshot/export-jobs/(?P<job_id>[0-9a-f-]{36})/download", permission_classes=[IsAdminOrReviewer])
+  def snapshot_export_job_download(self, request, job_id=None):
+    job = get_object_or_404(SnapshotExportJob, pk=job_id)
+    if job.status == ExportStatus.EXPIRED:
+      return Response({"detail": "Export has expired"}, status=410)
+    if job.status != ExportStatus.DONE or not job.artifact:
+      return Response({"detail": f"Export is {job.status.lower()}"}, status=409)
+    response, _ = serve_file(
+      request, job.artifact, filename=f"snapshot-export-{job.snapshot_date}.{job.format}", fallback_mtime=job.finished_at,
+    )
+    return response
+
+  @action(detail=False, methods=["get"], url_path="snapshot/cache-stats", permission_classes=[IsAdmin])
+  def snapshot_cache_stats(self, request):
+    return Response(snapshot_cache.stats())
+
 @api_view(["GET"])
 @permission_classes([permissions.AllowAny])
 def health_check(request):
   return Response({"status": "ok"})
 
+@api_view(["GET"])
+@authentication_classes([])
+@permission_classes([IsMetricsScraper])
+def metrics_view(request):
+  return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 from django.contrib.auth import authenticate, login, logout
 
 @api_view(["POST"])
@@ -486,7 +640,7 @@ def login_view(request):
     user = authenticate(request, username=username, password=password)
     if user:
         login(request, user)
-        roles = list(user.groups.values_list('name', flat=True))
+        roles = sorted(get_roles(user))
         return Response({"detail": "Logged in", "username": user.username, "roles": roles})
     return Response({"detail": "Invalid credentials"}, status=400)
 
@@ -558,11 +712,17 @@ def user_info(request):
     from django.middleware.csrf import get_token
     csrf_token = get_token(request)
     if request.user.is_authenticated:
-        roles = list(request.user.groups.values_list('name', flat=True))
+        roles = sorted(get_roles(request.user))
         return Response({"isAuthenticated": True, "username": request.user.username, "roles": roles, "csrfToken": csrf_token})
     return Response({"isAuthenticated": False, "csrfToken": csrf_token})
 
 
+class _Echo:
+  """File-like sink for csv.writer that returns the formatted row instead of storing it."""
+  def write(self, value):
+    return value
+
+
 def _compliance_audit_data(instance: ComplianceRecord):
   return {
     "id": str(instance.id),
@@ -608,70 +768,55 @@ def _parse_datetime(value: str, end_of_day: bool = False):
       return None
 
 
-def _snapshot_filters(request):
-  return {
-    "status": request.query_params.get("status"),
-    "q": request.query_params.get("q"),
-    "section": request.query_params.get("section"),
-    "standard": request.query_params.get("standard"),
-  }
+AUDIT_LOG_FILTER_PARAMS = ("actor", "action", "entity_type", "q", "start_date", "end_date")
 
 
-def build_snapshot_payload(request):
-  qs = Indicator.objects.filter(is_active=True)
-  q = request.query_params.get("q")
-  section = request.query_params.get("section")
-  standard = request.query_params.get("standard")
-  status = request.query_params.get("status")
-
-  if q:
-    qs = qs.filter(Q(indicator_text__icontains=q) | Q(standard__icontains=q) | Q(section__icontains=q))
-  if section:
-    qs = qs.filter(section=section)
-  if standard:
-    qs = qs.filter(standard=standard)
-
-  indicators = []
-  counts = {"COMPLIANT":0,"DUE_SOON":0,"OVERDUE":0,"NOT_STARTED":0}
-  for ind in qs:
-    last_compliant_on, next_due_on, due_status = compute_due_status(ind)
-    if status and due_status != status:
-      continue
-    counts[due_status] = counts.get(due_status, 0) + 1
-    indicators.append({
-      "id": str(ind.id),
-      "section": ind.section,
-      "standard": ind.standard,
-      "status": due_status,
-      "due_date": next_due_on,
-      "last_compliant_on": last_compliant_on,
-    })
-
-  latest_compliance = list(
-    ComplianceRecord.objects.select_related("indicator")
-    .order_by("-created_at")[:50]
-    .values(
-      "id","indicator_id","compliant_on","valid_until","is_revoked","revoked_at","created_at"
-    )
+def _audit_log_filters(request):
+  return {name: request.query_params.get(name) or None for name in AUDIT_LOG_FILTER_PARAMS}
+
+
+def _local_midnight(value, days=0):
+  day = parse_date(value or "")
+  return timezone.make_aware(datetime.combine(day + timedelta(days=days), time.min)) if day else None
+
+
+def _include_archived(request):
+  return request.query_params.get("archived") != "exclude"
+
+
+def _archived_export_row(record):
+  return (
+    parse_datetime(record["timestamp"]), record["actor_username"], record["action"], record["entity_type"],
+    record["entity_id"], record["summary"], record["ip_address"],
   )
 
-  evidence_items = []
-  for item in EvidenceItem.objects.select_related("indicator").order_by("-created_at")[:50]:
-    filename = os.path.basename(item.file.name) if item.file else None
-    evidence_items.append({
-      "id": str(item.id),
-      "indicator_id": str(item.indicator_id),
-      "type": item.type,
-      "created_at": item.created_at,
-      "filename": filename,
-      "url": item.url,
-      "file_url": item.file.url if item.file else None,
-    })
 
+def _filter_audit_logs(request, queryset):
+  filters = _audit_log_filters(request)
+  if filters["actor"]: queryset = queryset.filter(actor_id=filters["actor"])
+  if filters["action"]: queryset = queryset.filter(action=filters["action"])
+  if filters["entity_type"]: queryset = queryset.filter(entity_type=filters["entity_type"])
+  if filters["q"]: queryset = queryset.filter(audit_search_q(filters["q"], using=queryset.db))
+  # Local days as timestamp ranges, so the (timestamp, id) index can serve them.
+  start, end = _local_midnight(filters["start_date"]), _local_midnight(filters["end_date"], days=1)
+  if start: queryset = queryset.filter(timestamp__gte=start)
+  elif filters["start_date"]: queryset = queryset.filter(timestamp__date__gte=filters["start_date"])
+  if end: queryset = queryset.filter(timestamp__lt=end)
+  elif filters["end_date"]: queryset = queryset.filter(timestamp__date__lte=filters["end_date"])
+  return queryset
+
+
+def _snapshot_filters(request, params=None):
+  params = request.query_params if params is None else params
   return {
-    "summary": counts,
-    "indicators": indicators,
-    "latest_compliance": latest_compliance,
-    "evidence": evidence_items,
-    "filters": _snapshot_filters(request),
+    "status": params.get("status"),
+    "q": params.get("q"),
+    "section": params.get("section"),
+    "standard": params.get("standard"),
   }
+
+
+def snapshot_payload(request):
+  """(payload, cache hit) for the request's snapshot filters."""
+  payload, hit = snapshot_cache.get_or_build(_snapshot_filters(request), build_snapshot_payload)
+  return {**payload, "filters": _snapshot_filters(request)}, hit
@@ -106,6 +106,9 @@ export type EvidenceItem = {
   note_text: string | null;
   url: string | null;
   file: string | null;
+  // Set for images (and PDFs where the server can render them); served inline.
+  thumbnail_url: string | null;
+  preview_url: string | null;
   created_by?: string;
   created_at: string;
 };
@@ -133,21 +136,32 @@ export type AuditLog = {
   user_agent: string | null;
 };
 
-export type PaginatedResponse<T> = {
+export type CursorPage<T> = {
+  next: string | null;
+  previous: string | null;
   results: T[];
-  count: number;
-  num_pages: number;
-  current_page: number;
+};
+
+// One page of a keyset-paginated list endpoint. Pass a page's `next` link to
+// get the following page; lists load more on demand rather than all at once.
+export async function fetchPage<T>(path: string): Promise<CursorPage<T>> {
+  return request(path);
+}
+
+export type PaginatedResponse<T> = CursorPage<T> & {
+  count_estimate?: number;
+  count_is_exact?: boolean;
 };
 
 // -- API Calls --
 
-export async function fetchIndicators(q?: string, status?: string, projectId?: string): Promise<Indicator[]> {
-  const params = new URLSearchParams();
+// First page of indicators; searches (q) come back best-ranked first.
+export async function fetchIndicators(q?: string, status?: string, projectId?: string, pageSize = 100): Promise<CursorPage<Indicator>> {
+  const params = new URLSearchParams({ page_size: String(pageSize) });
   if (q) params.set("q", q);
   if (status) params.set("due_status", status);
   if (projectId) params.set("project", projectId);
-  return request(`/api/indicators/?${params.toString()}`);
+  return fetchPage<Indicator>(`/api/indicators/?${params.toString()}`);
 }
 
 export async function fetchIndicator(id: string): Promise<Indicator> {
@@ -239,6 +253,73 @@ export async function uploadEvidence(formData: FormData): Promise<EvidenceItem>
   });
 }
 
+export type UploadSession = {
+  id: string;
+  chunk_size: number;
+  chunk_count: number;
+  received: number[];
+  status: "OPEN" | "ASSEMBLING" | "COMPLETE";
+  expires_at: string;
+};
+
+const CHUNK_RETRIES = 5;
+
+async function sha256Hex(data: ArrayBuffer) {
+  const digest = await crypto.subtle.digest("SHA-256", data);
+  return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, "0")).join("");
+}
+
+// Chunked, resumable upload through /api/evidence-uploads/. The session id is kept in
+// localStorage per file, so retrying after a dropped connection or a page reload only
+// sends the chunks the server does not have yet. Failed chunks are retried with backoff.
+export async function uploadEvidenceChunked(
+  file: File,
+  fields: { indicator: string; type: EvidenceItem["type"]; note_text?: string; compliance_record?: string },
+  onProgress?: (done: number, total: number) => void,
+): Promise<EvidenceItem> {
+  const key = `evidence-upload:${fields.indicator}:${file.name}:${file.size}:${file.lastModified}`;
+  let session: UploadSession | null = null;
+  const saved = localStorage.getItem(key);
+  if (saved) {
+    session = await request(`/api/evidence-uploads/${saved}/`).catch(() => null);
+    if (session && (session.status === "ASSEMBLING" || new Date(session.expires_at) <= new Date())) session = null;
+  }
+  if (!session) {
+    session = await request("/api/evidence-uploads/", {
+      method: "POST",
+      body: JSON.stringify({ ...fields, filename: file.name, size: file.size }),
+    }) as UploadSession;
+    localStorage.setItem(key, session.id);
+  }
+
+  const received = new Set(session.received);
+  let done = received.size;
+  onProgress?.(done, session.chunk_count);
+  for (let index = 0; index < session.chunk_count && session.status === "OPEN"; index++) {
+    if (received.has(index)) continue;
+    const body = await file.slice(index * session.chunk_size, (index + 1) * session.chunk_size).arrayBuffer();
+    const checksum = await sha256Hex(body);
+    for (let attempt = 1; ; attempt++) {
+      try {
+        await request(`/api/evidence-uploads/${session.id}/chunks/${index}/`, {
+          method: "PUT",
+          body,
+          headers: { "Content-Type": "application/octet-stream", "X-Chunk-SHA256": checksum },
+        });
+        break;
+      } catch (err) {
+        if (attempt >= CHUNK_RETRIES) throw err;
+        await new Promise(resolve => setTimeout(resolve, 1000 * 2 ** attempt));
+      }
+    }
+    onProgress?.(++done, session.chunk_count);
+  }
+
+  const item = await request(`/api/evidence-uploads/${session.id}/finalise/`, { method: "POST" });
+  localStorage.removeItem(key);
+  return item;
+}
+
 export async function updateEvidence(id: string, data: Partial<EvidenceItem>): Promise<EvidenceItem> {
   return request(`/api/evidence/${id}/`, {
     method: "PATCH",
@@ -285,20 +366,23 @@ export function getSecureDownloadUrl(id: string) {
   return `${API_BASE}/api/evidence/${id}/download/`;
 }
 
-export async function fetchComplianceRecords(indicatorId: string): Promise<ComplianceRecord[]> {
-  return request(`/api/compliance/?indicator=${indicatorId}`);
+export async function fetchComplianceRecords(indicatorId: string): Promise<CursorPage<ComplianceRecord>> {
+  return fetchPage<ComplianceRecord>(`/api/compliance/?indicator=${indicatorId}`);
 }
 
 export async function fetchComplianceRecord(id: string): Promise<ComplianceRecord> {
   return request(`/api/compliance/${id}/`);
 }
 
-export async function fetchEvidenceItems(indicatorId: string): Promise<EvidenceItem[]> {
-  return request(`/api/evidence/?indicator=${indicatorId}`);
+export async function fetchEvidenceItems(indicatorId: string): Promise<CursorPage<EvidenceItem>> {
+  return fetchPage<EvidenceItem>(`/api/evidence/?indicator=${indicatorId}`);
 }
 
 export async function fetchAuditLogs(params: Record<string, any>): Promise<PaginatedResponse<AuditLog>> {
-  const searchParams = new URLSearchParams(params as any);
+  const searchParams = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value) searchParams.set(key, value);
+  });
   return request(`/api/audit/logs/?${searchParams.toString()}`);
 }
 
@@ -9,9 +9,9 @@ export default function AuditLogs() {
         action: '',
         entity_type: '',
         q: '',
-        page: 1
+        cursor: ''
     });
-    const [pagination, setPagination] = useState({ count: 0, num_pages: 1 });
+    const [pagination, setPagination] = useState<{ next: string | null; previous: string | null }>({ next: null, previous: null });
     const { showToast: addToast } = useToast();
 
     useEffect(() => {
@@ -23,7 +23,7 @@ export default function AuditLogs() {
         try {
             const data = await fetchAuditLogs(filters);
             setLogs(data.results);
-            setPagination({ count: data.count, num_pages: data.num_pages });
+            setPagination({ next: cursorOf(data.next), previous: cursorOf(data.previous) });
         } catch (err: any) {
             addToast(err.message, 'error');
         } finally {
@@ -31,8 +31,13 @@ export default function AuditLogs() {
         }
     }
 
+    function cursorOf(link: string | null) {
+        return link === null ? null : new URL(link).searchParams.get('cursor') || '';
+    }
+
     function handleExport() {
-        window.location.href = getExportLogsUrl(filters);
+        const { cursor, ...exportFilters } = filters;
+        window.location.href = getExportLogsUrl(exportFilters);
     }
 
     return (
@@ -52,7 +57,7 @@ export default function AuditLogs() {
                     <label className="block text-sm font-medium text-gray-700">Action</label>
                     <select
                         value={filters.action}
-                        onChange={e => setFilters({ ...filters, action: e.target.value, page: 1 })}
+                        onChange={e => setFilters({ ...filters, action: e.target.value, cursor: '' })}
                         className="mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500"
                     >
                         <option value="">All Actions</option>
@@ -69,7 +74,7 @@ export default function AuditLogs() {
                     <label className="block text-sm font-medium text-gray-700">Entity Type</label>
                     <select
                         value={filters.entity_type}
-                        onChange={e => setFilters({ ...filters, entity_type: e.target.value, page: 1 })}
+                        onChange={e => setFilters({ ...filters, entity_type: e.target.value, cursor: '' })}
                         className="mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500"
                     >
                         <option value="">All Entities</option>
@@ -84,7 +89,7 @@ export default function AuditLogs() {
                     <input
                         type="text"
                         value={filters.q}
-                        onChange={e => setFilters({ ...filters, q: e.target.value, page: 1 })}
+                        onChange={e => setFilters({ ...filters, q: e.target.value, cursor: '' })}
                         placeholder="Search summary..."
                         className="mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring-indigo-500"
                     />
@@ -136,17 +141,22 @@ export default function AuditLogs() {
                 </table>
             </div>
 
-            {pagination.num_pages > 1 && (
+            {(pagination.previous !== null || pagination.next !== null) && (
                 <div className="flex justify-center gap-2">
-                    {Array.from({ length: pagination.num_pages }).map((_, i) => (
-                        <button
-                            key={i}
-                            onClick={() => setFilters({ ...filters, page: i + 1 })}
-                            className={`px-3 py-1 rounded ${filters.page === i + 1 ? 'bg-indigo-600 text-white' : 'bg-gray-200'}`}
-                        >
-                            {i + 1}
-                        </button>
-                    ))}
+                    <button
+                        disabled={pagination.previous === null}
+                        onClick={() => setFilters({ ...filters, cursor: pagination.previous || '' })}
+                        className="px-3 py-1 rounded bg-gray-200 disabled:opacity-50"
+                    >
+                        Newer
+                    </button>
+                    <button
+                        disabled={pagination.next === null}
+                        onClick={() => setFilters({ ...filters, cursor: pagination.next || '' })}
+                        className="px-3 py-1 rounded bg-gray-200 disabled:opacity-50"
+                    >
+                        Older
+                    </button>
                 </div>
             )}
         </div>
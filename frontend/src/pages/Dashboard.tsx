@@ -1,11 +1,14 @@
-import React, { useEffect, useState, useMemo } from "react";
+import React, { useEffect, useState, useMemo, useRef } from "react";
 import { Link } from "react-router-dom";
-import { fetchIndicators, Indicator } from "../api";
+import { fetchIndicators, fetchPage, Indicator } from "../api";
 import { useAuth } from "../auth";
 
 export default function Dashboard() {
     const { canMutate } = useAuth();
     const [items, setItems] = useState<Indicator[]>([]);
+    // Cursor link of the next unloaded page; pages load as Next reaches them.
+    const [nextUrl, setNextUrl] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [q, setQ] = useState("");
     const [statusFilter, setStatusFilter] = useState("");
     const [loading, setLoading] = useState(true);
@@ -14,20 +17,40 @@ export default function Dashboard() {
     const [currentPage, setCurrentPage] = useState(1);
     const [pageSize, setPageSize] = useState(25);
 
+    // Only the latest request may update the list; typing fires many.
+    const requestSeq = useRef(0);
+    const mounted = useRef(false);
+
     useEffect(() => {
         load();
     }, [statusFilter]); // Reload when filter changes
 
+    // Search as you type: best-ranked matches after a short pause.
+    useEffect(() => {
+        if (!mounted.current) {
+            mounted.current = true; // the status effect does the initial load
+            return;
+        }
+        const query = q.trim();
+        if (query.length === 1) return;
+        const timer = setTimeout(() => load(query), 250);
+        return () => clearTimeout(timer);
+    }, [q]);
+
     async function load(query?: string) {
+        const seq = ++requestSeq.current;
+        const text = query ?? q;
         setLoading(true);
         try {
-            const data = await fetchIndicators(query || q, statusFilter);
-            setItems(data);
+            const page = await fetchIndicators(text, statusFilter);
+            if (seq !== requestSeq.current) return;
+            setItems(page.results);
+            setNextUrl(page.next);
             setCurrentPage(1); // Reset to first page on new search/filter
         } catch (e) {
             console.error(e);
         } finally {
-            setLoading(false);
+            if (seq === requestSeq.current) setLoading(false);
         }
     }
 
@@ -43,6 +66,27 @@ export default function Dashboard() {
     }, [items, currentPage, pageSize]);
 
     const totalPages = Math.ceil(items.length / pageSize);
+    const hasNext = currentPage < totalPages || nextUrl !== null;
+
+    async function nextPage() {
+        if (currentPage * pageSize >= items.length && nextUrl) {
+            const seq = requestSeq.current;
+            setLoadingMore(true);
+            try {
+                const page = await fetchPage<Indicator>(nextUrl);
+                if (seq !== requestSeq.current) return; // a new search replaced the list
+                setItems(prev => [...prev, ...page.results]);
+                setNextUrl(page.next);
+                if (page.results.length === 0) return;
+            } catch (e) {
+                console.error(e);
+                return;
+            } finally {
+                setLoadingMore(false);
+            }
+        }
+        setCurrentPage(p => p + 1);
+    }
 
     return (
         <div style={{ paddingBottom: 40 }}>
@@ -175,10 +219,10 @@ export default function Dashboard() {
                     </div>
 
                     {/* Pagination Controls */}
-                    {totalPages > 1 && (
+                    {(totalPages > 1 || nextUrl !== null) && (
                         <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', marginTop: 20 }}>
                             <div style={{ fontSize: '0.9rem', color: '#6b7280' }}>
-                                Showing {((currentPage - 1) * pageSize) + 1} to {Math.min(currentPage * pageSize, items.length)} of {items.length} indicators
+                                Showing {((currentPage - 1) * pageSize) + 1} to {Math.min(currentPage * pageSize, items.length)} of {items.length}{nextUrl !== null ? '+' : ''} indicators
                             </div>
                             <div style={{ display: 'flex', gap: 8, alignItems: 'center' }}>
                                 <select
@@ -207,18 +251,18 @@ export default function Dashboard() {
                                         Prev
                                     </button>
                                     <div style={{ padding: '6px 16px', background: '#f9fafb', fontSize: '0.9rem', fontWeight: 600 }}>
-                                        {currentPage} / {totalPages}
+                                        {currentPage} / {totalPages}{nextUrl !== null ? '+' : ''}
                                     </div>
                                     <button
-                                        onClick={() => setCurrentPage(p => Math.min(totalPages, p + 1))}
-                                        disabled={currentPage === totalPages}
+                                        onClick={nextPage}
+                                        disabled={!hasNext || loadingMore}
                                         style={{
                                             padding: '6px 16px', background: 'white', border: 'none',
-                                            cursor: currentPage === totalPages ? 'default' : 'pointer',
-                                            color: currentPage === totalPages ? '#d1d5db' : '#374151'
+                                            cursor: !hasNext || loadingMore ? 'default' : 'pointer',
+                                            color: !hasNext || loadingMore ? '#d1d5db' : '#374151'
                                         }}
                                     >
-                                        Next
+                                        {loadingMore ? 'Loading...' : 'Next'}
                                     </button>
                                 </div>
                             </div>
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from "react";
 import { useSearchParams, useNavigate } from "react-router-dom";
-import { uploadEvidence, fetchIndicator, Indicator } from "../api";
+import { uploadEvidence, uploadEvidenceChunked, fetchIndicator, Indicator } from "../api";
 import { useToast } from "../components/Toast";
 
 export default function EvidenceUpload() {
@@ -13,6 +13,7 @@ export default function EvidenceUpload() {
     const [file, setFile] = useState<File | null>(null);
     const [note, setNote] = useState("");
     const [loading, setLoading] = useState(false);
+    const [progress, setProgress] = useState<[number, number] | null>(null);
     const [fetching, setFetching] = useState(true);
 
     useEffect(() => {
@@ -33,24 +34,29 @@ export default function EvidenceUpload() {
 
         setLoading(true);
 
-        const fd = new FormData();
-        fd.append("indicator", indicatorId);
-        if (file) {
-            fd.append("file", file);
-            fd.append("type", "FILE");
-        } else {
-            fd.append("type", "NOTE");
-        }
-        if (note) fd.append("note_text", note);
-
         try {
-            await uploadEvidence(fd);
+            if (file) {
+                // Files go up in resumable chunks: on a dropped connection, submitting
+                // again continues where the upload stopped.
+                await uploadEvidenceChunked(
+                    file,
+                    { indicator: indicatorId, type: "FILE", ...(note ? { note_text: note } : {}) },
+                    (done, total) => setProgress([done, total]),
+                );
+            } else {
+                const fd = new FormData();
+                fd.append("indicator", indicatorId);
+                fd.append("type", "NOTE");
+                fd.append("note_text", note);
+                await uploadEvidence(fd);
+            }
             showToast("Evidence uploaded successfully", "success");
             navigate(`/indicators/${indicatorId}`);
         } catch (err: any) {
             console.error(err);
             showToast(err.message || "Upload failed", "error");
             setLoading(false);
+            setProgress(null);
         }
     }
 
@@ -67,7 +73,7 @@ export default function EvidenceUpload() {
             <form onSubmit={handleSubmit} style={{ display: "flex", flexDirection: "column", gap: 20 }}>
                 <label style={{ display: 'flex', flexDirection: 'column', gap: 6, fontWeight: 500 }}>
                     File
-                    <div style={{ fontSize: '0.8rem', color: '#888', fontWeight: 'normal' }}>Supported: PDF, DOCX, JPG, PNG, XLSX (Max 10MB)</div>
+                    <div style={{ fontSize: '0.8rem', color: '#888', fontWeight: 'normal' }}>Supported: PDF, DOCX, JPG, PNG, XLSX. Interrupted uploads resume when submitted again.</div>
                     <input type="file" onChange={e => setFile(e.target.files ? e.target.files[0] : null)} style={{ width: "100%", padding: 8, borderRadius: 6, border: '1px solid #ddd' }} />
                 </label>
                 <label style={{ display: 'flex', flexDirection: 'column', gap: 6, fontWeight: 500 }}>
@@ -80,7 +86,7 @@ export default function EvidenceUpload() {
                         flex: 1, padding: "12px", backgroundColor: "#2563eb", color: "#fff",
                         border: "none", borderRadius: 6, cursor: "pointer", fontWeight: 'bold'
                     }}>
-                        {loading ? "Uploading..." : "Upload Evidence"}
+                        {loading ? (progress ? `Uploading... ${Math.round(100 * progress[0] / progress[1])}%` : "Uploading...") : "Upload Evidence"}
                     </button>
                     <button type="button" onClick={() => navigate(-1)} style={{
                         padding: "12px 24px", backgroundColor: "#fff", color: "#666",
@@ -1,7 +1,7 @@
 import React, { useEffect, useState, useCallback } from 'react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
 import {
-    fetchIndicator, fetchComplianceRecords, fetchEvidenceItems,
+    fetchIndicator, fetchComplianceRecords, fetchEvidenceItems, fetchPage,
     Indicator, ComplianceRecord, EvidenceItem, getSecureDownloadUrl,
     revokeCompliance, deleteEvidence, updateEvidence
 } from '../api';
@@ -17,6 +17,9 @@ export default function IndicatorDetail() {
     const [indicator, setIndicator] = useState<Indicator | null>(null);
     const [records, setRecords] = useState<ComplianceRecord[]>([]);
     const [evidence, setEvidence] = useState<EvidenceItem[]>([]);
+    // Both lists show their first page; "Load more" follows the cursor link.
+    const [recordsNext, setRecordsNext] = useState<string | null>(null);
+    const [evidenceNext, setEvidenceNext] = useState<string | null>(null);
 
     const [loadingInd, setLoadingInd] = useState(true);
     const [loadingRecs, setLoadingRecs] = useState(false);
@@ -49,9 +52,10 @@ export default function IndicatorDetail() {
         if (!id) return;
         setLoadingRecs(true);
         try {
-            const recs = await fetchComplianceRecords(id);
-            // Sort by date descending
-            setRecords(recs.sort((a, b) => new Date(b.compliant_on).getTime() - new Date(a.compliant_on).getTime()));
+            // Newest first, as the endpoint orders them.
+            const page = await fetchComplianceRecords(id);
+            setRecords(page.results);
+            setRecordsNext(page.next);
         } catch (err) {
             console.error('Failed to load records', err);
         } finally {
@@ -63,9 +67,37 @@ export default function IndicatorDetail() {
         if (!id) return;
         setLoadingEvs(true);
         try {
-            const evs = await fetchEvidenceItems(id);
-            // Sort by newest first
-            setEvidence(evs.sort((a, b) => new Date(b.created_at).getTime() - new Date(a.created_at).getTime()));
+            const page = await fetchEvidenceItems(id);
+            setEvidence(page.results);
+            setEvidenceNext(page.next);
+        } catch (err) {
+            console.error('Failed to load evidence', err);
+        } finally {
+            setLoadingEvs(false);
+        }
+    };
+
+    const loadMoreRecords = async () => {
+        if (!recordsNext) return;
+        setLoadingRecs(true);
+        try {
+            const page = await fetchPage<ComplianceRecord>(recordsNext);
+            setRecords(prev => [...prev, ...page.results]);
+            setRecordsNext(page.next);
+        } catch (err) {
+            console.error('Failed to load records', err);
+        } finally {
+            setLoadingRecs(false);
+        }
+    };
+
+    const loadMoreEvidence = async () => {
+        if (!evidenceNext) return;
+        setLoadingEvs(true);
+        try {
+            const page = await fetchPage<EvidenceItem>(evidenceNext);
+            setEvidence(prev => [...prev, ...page.results]);
+            setEvidenceNext(page.next);
         } catch (err) {
             console.error('Failed to load evidence', err);
         } finally {
@@ -300,6 +332,18 @@ export default function IndicatorDetail() {
                                     )}
                                 </div>
                             ))}
+                            {recordsNext && (
+                                <button
+                                    onClick={loadMoreRecords}
+                                    disabled={loadingRecs}
+                                    style={{
+                                        padding: '8px 16px', background: 'white', border: '1px solid #d1d5db',
+                                        borderRadius: 6, cursor: loadingRecs ? 'default' : 'pointer', color: '#374151'
+                                    }}
+                                >
+                                    {loadingRecs ? 'Loading...' : 'Load more'}
+                                </button>
+                            )}
                         </div>
                     )}
                 </section>
@@ -330,9 +374,20 @@ export default function IndicatorDetail() {
                                     background: 'white'
                                 }}>
                                     <div style={{ display: 'flex', gap: 12, alignItems: 'flex-start' }}>
-                                        <div style={{ fontSize: '1.5rem' }}>
-                                            {e.type === 'FILE' ? '📄' : e.type === 'NOTE' ? '📝' : e.type === 'LINK' ? '🔗' : '🖼️'}
-                                        </div>
+                                        {e.thumbnail_url ? (
+                                            <a href={e.preview_url || e.thumbnail_url} target="_blank" rel="noopener noreferrer">
+                                                <img
+                                                    src={e.thumbnail_url}
+                                                    alt={e.file ? e.file.split('/').pop() : 'Evidence'}
+                                                    loading="lazy"
+                                                    style={{ width: 64, height: 64, objectFit: 'cover', borderRadius: 4, border: '1px solid #e5e7eb' }}
+                                                />
+                                            </a>
+                                        ) : (
+                                            <div style={{ fontSize: '1.5rem' }}>
+                                                {e.type === 'FILE' ? '📄' : e.type === 'NOTE' ? '📝' : e.type === 'LINK' ? '🔗' : '🖼️'}
+                                            </div>
+                                        )}
                                         <div style={{ flex: 1 }}>
                                             <div style={{ display: 'flex', justifyContent: 'space-between' }}>
                                                 <div style={{ fontWeight: 500 }}>
@@ -379,6 +434,18 @@ export default function IndicatorDetail() {
                                     </div>
                                 </div>
                             ))}
+                            {evidenceNext && (
+                                <button
+                                    onClick={loadMoreEvidence}
+                                    disabled={loadingEvs}
+                                    style={{
+                                        padding: '8px 16px', background: 'white', border: '1px solid #d1d5db',
+                                        borderRadius: 6, cursor: loadingEvs ? 'default' : 'pointer', color: '#374151'
+                                    }}
+                                >
+                                    {loadingEvs ? 'Loading...' : 'Load more'}
+                                </button>
+                            )}
                         </div>
                     )}
                 </section>
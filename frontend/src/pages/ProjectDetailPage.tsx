@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { Link, useParams } from "react-router-dom";
-import { fetchProject, fetchIndicators, Indicator, Project } from "../api";
+import { fetchProject, fetchIndicators, fetchPage, Indicator, Project } from "../api";
 import { useAuth } from "../auth";
 
 export default function ProjectDetailPage() {
@@ -8,6 +8,8 @@ export default function ProjectDetailPage() {
     const { canMutate } = useAuth();
     const [project, setProject] = useState<Project | null>(null);
     const [indicators, setIndicators] = useState<Indicator[]>([]);
+    const [nextUrl, setNextUrl] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [loadingProject, setLoadingProject] = useState(true);
     const [loadingIndicators, setLoadingIndicators] = useState(true);
 
@@ -32,8 +34,9 @@ export default function ProjectDetailPage() {
     async function loadIndicators(projectId: string) {
         setLoadingIndicators(true);
         try {
-            const data = await fetchIndicators(undefined, undefined, projectId);
-            setIndicators(data);
+            const page = await fetchIndicators(undefined, undefined, projectId);
+            setIndicators(page.results);
+            setNextUrl(page.next);
         } catch (err) {
             console.error(err);
         } finally {
@@ -41,6 +44,20 @@ export default function ProjectDetailPage() {
         }
     }
 
+    async function loadMoreIndicators() {
+        if (!nextUrl) return;
+        setLoadingMore(true);
+        try {
+            const page = await fetchPage<Indicator>(nextUrl);
+            setIndicators(prev => [...prev, ...page.results]);
+            setNextUrl(page.next);
+        } catch (err) {
+            console.error(err);
+        } finally {
+            setLoadingMore(false);
+        }
+    }
+
     if (loadingProject) {
         return <div style={{ padding: 40, textAlign: "center" }}>Loading project...</div>;
     }
@@ -151,6 +168,20 @@ export default function ProjectDetailPage() {
                             )}
                         </tbody>
                     </table>
+                    {nextUrl && (
+                        <div style={{ padding: 12, textAlign: "center", borderTop: "1px solid #f3f4f6" }}>
+                            <button
+                                onClick={loadMoreIndicators}
+                                disabled={loadingMore}
+                                style={{
+                                    padding: "6px 16px", background: "white", border: "1px solid #d1d5db",
+                                    borderRadius: 6, cursor: loadingMore ? "default" : "pointer", color: "#374151",
+                                }}
+                            >
+                                {loadingMore ? "Loading..." : "Load more"}
+                            </button>
+                        </div>
+                    )}
                 </div>
             )}
         </div>